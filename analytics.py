@@ -0,0 +1,429 @@
+import json
+import logging
+import time
+import uuid
+
+import pandas as pd
+
+from renderer import MONTH_NAMES, MONTHS
+
+# Groups the aggregates are kept by. `party` is the party that cast the
+# most Yea votes, or "split" on a tie.
+DIMENSIONS = ["chamber", "congress", "session", "month", "question", "party"]
+# Summed for each group
+MEASURES = [
+    "votes",
+    "passed",
+    "minority_passed",
+    "Yea",
+    "Nay",
+    "Abstain",
+    "yea_vote_total",
+    "nay_vote_total",
+    "abstain_vote_total",
+]
+# Results, lowercased, of votes that didn't pass, e.g. "Cloture Motion
+# Rejected" or "Veto Sustained". Anything else, e.g. "Agreed to",
+# "Confirmed" or "Veto Overridden", passed.
+FAILED_RESULTS = ["rejected", "failed", "not ", "veto sustained"]
+
+
+def session_year(congress, session):
+    """Calendar year of a congress and session"""
+    return 1789 + 2 * (int(congress) - 1) + int(session) - 1
+
+
+def vote_month(date, congress, session):
+    """Month of a vote_menu date like "28-Jan", e.g. "2021-01" """
+    name = MONTH_NAMES.get(str(date).rpartition("-")[2].lower())
+    if name is None:
+        return "unknown"
+    return f"{session_year(congress, session)}-{MONTHS.index(name) + 1:02d}"
+
+
+def vote_passed(result):
+    """Whether a vote_menu result means the question passed"""
+    result = result.lower()
+    return not any(failed in result for failed in FAILED_RESULTS)
+
+
+# Partitions the aggregates are kept in, whose votes are counted once
+PARTITION = DIMENSIONS[:3]
+# Groups of a partition's votes
+GROUP = DIMENSIONS[3:]
+
+
+class Partition:
+    """Totals of a (chamber, congress, session) partition's votes by
+    GROUP. `counted` has the vote numbers counted. Aggregates built from
+    history rows also keep each vote's group and measures in `votes`, so
+    aggregates counting some of the same votes can be merged exactly.
+    """
+
+    def __init__(self, counted=None, groups=None, votes=None):
+        self.counted = counted or set()
+        # GROUP values tuple to summed MEASURES
+        self.groups = groups or {}
+        # Vote number to its GROUP values and MEASURES
+        self.votes = votes or {}
+
+    def add(self, vote, values):
+        """Counts a vote unless it was already. Returns True if counted."""
+        if vote in self.counted:
+            return False
+        self.counted.add(vote)
+        group = tuple(values[: len(GROUP)])
+        measures = values[len(GROUP) :]
+        current = self.groups.get(group)
+        self.groups[group] = (
+            measures
+            if current is None
+            else [a + b for a, b in zip(current, measures)]
+        )
+        return True
+
+    def merge(self, other):
+        """Adds another partition's votes that aren't counted yet, and
+        returns the merged partition. Totals without votes can only be
+        merged if they count all of this partition's votes, or none it
+        doesn't count, as they are when written in order.
+        """
+        if other.votes:
+            for vote, values in other.votes.items():
+                if self.add(vote, values):
+                    self.votes[vote] = values
+            return self
+        if other.counted <= self.counted:
+            return self
+        missing = self.counted - other.counted
+        if missing - set(self.votes):
+            logging.warning("Merging partition totals that overlap")
+            return self if len(self.counted) > len(other.counted) else other
+        merged = Partition(set(other.counted), dict(other.groups))
+        for vote in missing:
+            merged.add(vote, self.votes[vote])
+        return merged
+
+    def totals(self):
+        """The partition without each vote's measures"""
+        return Partition(self.counted, self.groups)
+
+
+class Aggregates:
+    """Totals of the tweet history for each group of DIMENSIONS, kept by
+    (chamber, congress, session) partition.
+
+    A vote passed with a minority (`minority_passed`) if the members
+    voting Yea represent less than half of the country. Rows saved before
+    the history had a result column count as passed when there were more
+    Yeas than Nays. Each partition records the votes it counted, so a
+    vote is counted once however many times its row is saved or
+    aggregates counting it are merged, and `report` sums the group totals.
+    """
+
+    def __init__(self, partitions=None, replaced=None):
+        # (chamber, congress, session) to its Partition
+        self.partitions = partitions or {}
+        # Partitions whose totals in earlier aggregates these replace, see
+        # `merge`
+        self.replaced = replaced or set()
+
+    @classmethod
+    def loads(cls, body):
+        state = json.loads(body)
+        width = len(GROUP)
+        partitions = {}
+        for p in state["partitions"]:
+            partitions[tuple(p["partition"])] = Partition(
+                set(p["counted"]),
+                {tuple(g[:width]): g[width:] for g in p["groups"]},
+                {v[0]: v[1:] for v in p["votes"]},
+            )
+        return cls(partitions, {tuple(p) for p in state["replaced"]})
+
+    def dumps(self):
+        return json.dumps(
+            {
+                "dimensions": DIMENSIONS,
+                "measures": MEASURES,
+                "replaced": sorted(self.replaced),
+                "partitions": [
+                    {
+                        "partition": list(key),
+                        "counted": sorted(p.counted),
+                        "groups": [
+                            list(group) + measures
+                            for group, measures in sorted(p.groups.items())
+                        ],
+                        "votes": [
+                            [vote] + values
+                            for vote, values in sorted(p.votes.items())
+                        ],
+                    }
+                    for key, p in sorted(self.partitions.items())
+                ],
+            }
+        ).encode("utf-8")
+
+    def groups_of(self, rows):
+        """Computes each row's group and measures. Returns a DataFrame
+        with a column for each of DIMENSIONS and MEASURES.
+        """
+        rows = rows.reset_index(drop=True)
+
+        def column(name, default):
+            if name in rows:
+                return rows[name].astype(object).where(rows[name].notna())
+            return pd.Series(default, index=rows.index, dtype=object)
+
+        chambers = column("chamber", "senate").fillna("senate")
+        groups = pd.DataFrame(
+            {
+                "chamber": chambers,
+                "congress": rows["congress"].astype(str),
+                "session": rows["session"].astype(str),
+                "month": [
+                    vote_month(date, congress, session)
+                    for date, congress, session in zip(
+                        rows["date"], rows["congress"], rows["session"]
+                    )
+                ],
+                "question": column("question", None).fillna("unknown"),
+            }
+        )
+        counts = {
+            name: pd.to_numeric(column(name, 0), errors="coerce").fillna(0)
+            for name in [
+                "Yea",
+                "Nay",
+                "Abstain",
+                "yea_vote_total",
+                "yea_vote_D",
+                "yea_vote_R",
+                "nay_vote_total",
+                "abstain_vote_total",
+            ]
+        }
+        yea_i = (
+            counts["yea_vote_total"]
+            - counts["yea_vote_D"]
+            - counts["yea_vote_R"]
+        )
+        party = pd.Series("split", index=rows.index)
+        for name, yeas, others in [
+            ("D", counts["yea_vote_D"], [counts["yea_vote_R"], yea_i]),
+            ("R", counts["yea_vote_R"], [counts["yea_vote_D"], yea_i]),
+            ("I", yea_i, [counts["yea_vote_D"], counts["yea_vote_R"]]),
+        ]:
+            party[(yeas > others[0]) & (yeas > others[1])] = name
+        groups["party"] = party
+
+        results = column("result", None)
+        passed = counts["yea_vote_total"] > counts["nay_vote_total"]
+        known = results.notna()
+        passed[known] = [vote_passed(r) for r in results[known]]
+        groups["votes"] = 1
+        groups["passed"] = passed.astype(int)
+        groups["minority_passed"] = (passed & (counts["Yea"] < 0.5)).astype(
+            int
+        )
+        for name in MEASURES[3:]:
+            groups[name] = counts[name]
+        return groups
+
+    def add(self, rows):
+        """Adds the votes in history rows that haven't been counted yet.
+        Returns the number of votes added.
+        """
+        if rows.empty:
+            return 0
+        groups = self.groups_of(rows)
+        width = len(PARTITION)
+        added = 0
+        for vote, values in zip(
+            rows["vote"].astype(str), groups.values.tolist()
+        ):
+            partition = self.partitions.setdefault(
+                tuple(values[:width]), Partition()
+            )
+            # Vote counts stay integers in the stored aggregates
+            values = (
+                values[width : len(DIMENSIONS)]
+                + [int(n) for n in values[len(DIMENSIONS) :][:3]]
+                + values[len(DIMENSIONS) + 3 :]
+            )
+            # A vote saved twice in the same rows is counted once
+            if partition.add(vote, values):
+                partition.votes[vote] = values
+                added += 1
+        return added
+
+    def drop(self, chamber, congress, session):
+        """Removes a partition's totals, e.g. before recounting it"""
+        partition = (chamber, str(congress), str(session))
+        self.partitions.pop(partition, None)
+        self.replaced.add(partition)
+
+    def merge(self, other):
+        """Adds the votes of aggregates saved after these. Partitions the
+        other aggregates replace are dropped first.
+        """
+        for partition in other.replaced:
+            self.drop(*partition)
+        for key, partition in other.partitions.items():
+            current = self.partitions.get(key, Partition())
+            self.partitions[key] = current.merge(partition)
+
+    def totals(self):
+        """The aggregates without each vote's measures, which is all that
+        reports need
+        """
+        return Aggregates(
+            {key: p.totals() for key, p in self.partitions.items()},
+            set(self.replaced),
+        )
+
+    def frame(self):
+        """The group totals, a row per group of DIMENSIONS"""
+        return pd.DataFrame(
+            [
+                list(key) + list(group) + measures
+                for key, partition in self.partitions.items()
+                for group, measures in partition.groups.items()
+            ],
+            columns=DIMENSIONS + MEASURES,
+        )
+
+    def report(self, by=("congress",), **filters):
+        """Rolls the aggregates up to the `by` dimensions, for groups whose
+        dimensions match `filters` (a value or a list of values each).
+        Returns a DataFrame with the vote and pass counts, the share of
+        passed votes that passed with a minority, and the mean share of
+        the country represented by Yeas, Nays and no votes.
+        """
+        by = list(by)
+        unknown = [d for d in by + list(filters) if d not in DIMENSIONS]
+        if unknown:
+            raise ValueError(f"Unknown dimensions {unknown}")
+        groups = self.frame()
+        for dimension, values in filters.items():
+            if values is None:
+                continue
+            if isinstance(values, (str, int)):
+                values = [values]
+            groups = groups[groups[dimension].isin([str(v) for v in values])]
+        if by:
+            totals = groups.groupby(by, sort=True)[MEASURES].sum()
+        else:
+            totals = groups[MEASURES].sum().to_frame().T
+        totals = totals.reset_index(drop=not by)
+        votes = totals["votes"].where(totals["votes"] > 0)
+        passed = totals["passed"].where(totals["passed"] > 0)
+        report = totals[by + ["votes", "passed", "minority_passed"]].copy()
+        report["minority_share"] = totals["minority_passed"] / passed
+        for name in ["Yea", "Nay", "Abstain"]:
+            report[f"mean_{name.lower()}"] = totals[name] / votes
+        for column in ["votes", "passed", "minority_passed"]:
+            report[column] = report[column].astype(int)
+        return report
+
+
+class Analytics:
+    """Aggregates of the tweet history kept as objects under a prefix of
+    the history store, so that reports don't read the history.
+
+    Like history segments, every update writes the aggregates of the
+    saved rows as a new object, so concurrent runs never overwrite each
+    other's counts, and `load` merges the objects in the order they were
+    written. Once there are `compact_objects` of them, they are merged
+    into one.
+    """
+
+    def __init__(self, store, name="analytics", compact_objects=20):
+        self.store = store
+        self.prefix = f"{name}/"
+        self.compact_objects = compact_objects
+
+    def __merge(self, names):
+        """Merges the objects `names`. Returns None if one of them was
+        removed, by another run compacting them.
+        """
+        aggregates = Aggregates()
+        for name in names:
+            body = self.store.get(name)
+            if not body:
+                return None
+            aggregates.merge(Aggregates.loads(body))
+        return aggregates
+
+    def load(self):
+        for _ in range(3):
+            aggregates = self.__merge(self.store.list(self.prefix))
+            if aggregates is not None:
+                return aggregates
+        raise RuntimeError("The vote aggregates keep being compacted")
+
+    def __write(self, aggregates):
+        # Names sort in the order the aggregates were written
+        name = (
+            f"{self.prefix}{time.time_ns():020d}-{uuid.uuid4().hex[:8]}.json"
+        )
+        self.store.put(name, aggregates.dumps())
+
+    def compact(self, min_objects=2):
+        """Merges the aggregates objects into one if there are at least
+        `min_objects`. Returns True if they were merged.
+        """
+        names = self.store.list(self.prefix)
+        if len(names) < max(min_objects, 2):
+            return False
+        # Named to sort right after the last object merged and before any
+        # written since, so compacting twice at once writes the same object
+        merged = names[-1].rpartition(".")[0].partition("~")[0]
+        merged = f"{merged}~compacted.json"
+        aggregates = self.__merge(names)
+        if aggregates is None:
+            # Being compacted by another run
+            return False
+        # Only the totals are kept. Objects are merged in name order, and
+        # each compacted object counts every vote of the ones before it.
+        self.store.put(merged, aggregates.totals().dumps())
+        for name in names:
+            if name != merged:
+                self.store.delete(name)
+        return True
+
+    def update(self, rows):
+        """Counts the votes in saved history rows. Returns the number of
+        votes written.
+        """
+        aggregates = Aggregates()
+        added = aggregates.add(rows)
+        if added:
+            self.__write(aggregates)
+            self.compact(self.compact_objects)
+        return added
+
+    def rebuild(self, partitions):
+        """Recounts (chamber, congress, session) partitions from the full
+        history. Returns the number of votes counted.
+        """
+        aggregates = Aggregates()
+        counted = 0
+        for chamber, congress, session in partitions:
+            aggregates.drop(chamber, congress, session)
+            rows = self.store.read(congress, session, chamber=chamber)
+            # Votes recomputed under a new methodology version have a row
+            # for each version, the newest written last
+            rows = rows.drop_duplicates(subset="vote", keep="last")
+            if "chamber" in rows:
+                rows["chamber"] = rows["chamber"].fillna(chamber)
+            else:
+                rows["chamber"] = chamber
+            counted += aggregates.add(rows)
+            logging.info(f"Counted {chamber} votes for {congress}-{session}")
+        self.__write(aggregates)
+        return counted
+
+    def report(self, by=("congress",), **filters):
+        return self.load().report(by, **filters)
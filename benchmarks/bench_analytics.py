@@ -0,0 +1,122 @@
+"""Compares answering a report (minority-rule counts by congress) by
+scanning the whole tweet history with pandas, as was done ad hoc, with
+reading the vote aggregates that are updated as rows are saved. The
+history is synthetic and kept in a local history store.
+
+Usage: python benchmarks/bench_analytics.py [--congresses 20] [--votes 300]
+"""
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import analytics  # noqa: E402
+
+from bot import Representabot, VoteRecord  # noqa: E402
+from store import LocalHistoryStore  # noqa: E402
+
+RESULTS = ["Agreed to", "Passed", "Rejected", "Confirmed"]
+QUESTIONS = ["motion", "bill", "amendment", "nomination"]
+
+
+def make_rows(congress, session, votes, rng):
+    records = []
+    for n in range(1, votes + 1):
+        yeas = rng.randint(30, 70)
+        yea_d = rng.randint(0, yeas)
+        share = rng.uniform(0.3, 0.7)
+        records.append(
+            VoteRecord(
+                congress=str(congress),
+                session=str(session),
+                date=f"{rng.randint(1, 28):02d}-Mar",
+                vote=f"{n:05d}",
+                question=rng.choice(QUESTIONS),
+                result=rng.choice(RESULTS),
+                yea_vote_total=yeas,
+                yea_vote_D=yea_d,
+                yea_vote_R=yeas - yea_d,
+                nay_vote_total=100 - yeas,
+                Yea=share,
+                Nay=1 - share,
+                Abstain=0.0,
+            )
+        )
+    return VoteRecord.frame(records)
+
+
+def scan_report(store, partitions):
+    """The report computed from the full history"""
+    tweets = pd.concat(
+        [store.read(congress, session) for congress, session in partitions],
+        ignore_index=True,
+    )
+    passed = tweets["result"].map(analytics.vote_passed)
+    tweets["passed"] = passed.astype(int)
+    tweets["minority_passed"] = (passed & (tweets["Yea"] < 0.5)).astype(int)
+    return (
+        tweets.groupby("congress")[["passed", "minority_passed"]]
+        .sum()
+        .reset_index()
+    )
+
+
+def timed(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--congresses",
+        type=int,
+        default=20,
+        help="Congresses of history, two sessions each",
+    )
+    parser.add_argument(
+        "--votes", type=int, default=300, help="Votes per session"
+    )
+    args = parser.parse_args()
+    rng = random.Random(0)
+    partitions = [
+        (str(congress), str(session))
+        for congress in range(118 - args.congresses, 118)
+        for session in [1, 2]
+    ]
+
+    with tempfile.TemporaryDirectory() as directory:
+        store = LocalHistoryStore(directory, dtypes=Representabot.DTYPES)
+        stats = analytics.Analytics(store)
+        update = 0.0
+        for congress, session in partitions:
+            rows = make_rows(congress, session, args.votes, rng)
+            store.append(rows)
+            _, elapsed = timed(stats.update, rows)
+            update += elapsed
+
+        expected, scan = timed(scan_report, store, partitions)
+        report, elapsed = timed(stats.report, ["congress"])
+        assert report["passed"].tolist() == expected["passed"].tolist()
+        assert (
+            report["minority_passed"].tolist()
+            == expected["minority_passed"].tolist()
+        )
+
+    votes = len(partitions) * args.votes
+    print(f"{votes} votes in {len(partitions)} sessions")
+    print(f"{'report':>10} {'time (ms)':>10} {'speedup':>8}")
+    for name, seconds in [("scan", scan), ("aggregates", elapsed)]:
+        print(f"{name:>10} {seconds * 1000:>10.1f} {scan / seconds:>7.1f}x")
+    print(
+        f"Updating the aggregates took {update / len(partitions) * 1000:.1f} "
+        "ms per session saved"
+    )
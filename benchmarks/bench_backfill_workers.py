@@ -0,0 +1,100 @@
+"""Times a backfill of many congresses and sessions with 1, 2, 4 and 8
+worker processes, and checks that every run stores the same history
+rows in the same order as the serial one.
+
+senate.gov is replayed by a local HTTP server from fixtures built like
+bench_suite's, one set per (congress, session) shard. The history is
+kept in memory and nothing is tweeted. Workers only speed the backfill
+up with as many CPU cores, and the server shares the parent's.
+
+Usage: python benchmarks/bench_backfill_workers.py [--congresses 8]
+    [--votes 60] [--workers 1,2,4,8]
+"""
+
+import argparse
+import logging
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import bench_suite  # noqa: E402
+
+from bench_suite import FakeTwitter, MemoryHistoryStore, bot, cd  # noqa: E402
+
+
+def backfill(congresses, workers):
+    """Backfills the congresses' two sessions. Returns the history rows
+    and the time taken.
+    """
+    bot.RUNTIME.clear()
+    bot.RUNTIME.put("twitter_api", FakeTwitter())
+    store = MemoryHistoryStore(dtypes=bot.Representabot.DTYPES)
+    bot.RUNTIME.put("store", store)
+    repbot = bot.Representabot(congresses[0], "1")
+    start = time.perf_counter()
+    repbot.backfill(congresses, ["1", "2"], workers=workers)
+    elapsed = time.perf_counter() - start
+    rows = pd.concat(
+        [
+            store.read(congress, session)
+            for congress in congresses
+            for session in ["1", "2"]
+        ],
+        ignore_index=True,
+    )
+    return rows, elapsed
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--congresses",
+        type=int,
+        default=8,
+        help="Congresses to backfill, two sessions each",
+    )
+    parser.add_argument(
+        "--votes", type=int, default=60, help="Votes per session"
+    )
+    parser.add_argument(
+        "--workers",
+        default="1,2,4,8",
+        help="Comma-separated worker counts to time",
+    )
+    args = parser.parse_args()
+    logging.getLogger().setLevel(logging.WARNING)
+    cd.SenateData.CACHE_DIR = None
+    congresses = [str(c) for c in range(118 - args.congresses, 118)]
+    shards = [(c, s) for c in congresses for s in ["1", "2"]]
+
+    directory = tempfile.mkdtemp()
+    try:
+        bench_suite.build_synthetic_fixtures(
+            directory, args.votes, shards=shards
+        )
+        server = bench_suite.serve(directory)
+        results = {}
+        expected = None
+        for workers in [int(w) for w in args.workers.split(",")]:
+            rows, results[workers] = backfill(congresses, workers)
+            if expected is None:
+                expected = rows
+            pd.testing.assert_frame_equal(rows, expected)
+        server.shutdown()
+    finally:
+        shutil.rmtree(directory)
+
+    serial = next(iter(results.values()))
+    print(
+        f"{len(expected)} synthetic votes in {len(shards)} shards, "
+        f"{os.cpu_count()} CPUs"
+    )
+    print(f"{'workers':>8} {'time (s)':>10} {'speedup':>8}")
+    for workers, elapsed in results.items():
+        print(f"{workers:>8} {elapsed:>10.2f} {serial / elapsed:>7.1f}x")
@@ -0,0 +1,90 @@
+"""Compares the per-vote DataFrame.query dedup check in Representabot.run
+with the hash index lookup, across tweet history sizes.
+
+Usage: python benchmarks/bench_dedup.py [--votes 400]
+"""
+
+import argparse
+import time
+
+import pandas as pd
+
+
+def make_history(rows):
+    """Builds a fake tweet history spread over several congresses"""
+    return pd.DataFrame(
+        {
+            "tweet_id": [str(i) for i in range(rows)],
+            "congress": [str(100 + (i // 1000) % 20) for i in range(rows)],
+            "session": [str(1 + (i // 500) % 2) for i in range(rows)],
+            "date": ["03-Jan"] * rows,
+            "vote": [f"{i % 500 + 1:05d}" for i in range(rows)],
+        }
+    )
+
+
+def make_menu(votes):
+    return [
+        {"vote_number": f"{n:05d}", "vote_date": "03-Jan"}
+        for n in range(1, votes + 1)
+    ]
+
+
+def query_dedup(tweets, menu, congress, session):
+    pending = 0
+    for item in menu:
+        query = (
+            "congress == @congress "
+            "and session == @session "
+            "and date == @item['vote_date'] "
+            "and vote == @item['vote_number']"
+        )
+        if tweets.query(query).empty:
+            pending += 1
+    return pending
+
+
+def index_dedup(tweets, menu, congress, session):
+    tweeted = set(
+        zip(
+            tweets["congress"],
+            tweets["session"],
+            tweets["date"],
+            tweets["vote"],
+        )
+    )
+    pending = 0
+    for item in menu:
+        key = (congress, session, item["vote_date"], item["vote_number"])
+        if key not in tweeted:
+            pending += 1
+    return pending
+
+
+def timed(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--votes",
+        type=int,
+        default=400,
+        help="Number of votes in the vote menu",
+    )
+    args = parser.parse_args()
+    menu = make_menu(args.votes)
+
+    print(f"{'history':>8} {'query (s)':>10} {'index (s)':>10} {'speedup':>8}")
+    for rows in [1_000, 10_000, 100_000]:
+        tweets = make_history(rows)
+        expected, query_time = timed(query_dedup, tweets, menu, "117", "1")
+        result, index_time = timed(index_dedup, tweets, menu, "117", "1")
+        assert result == expected
+        print(
+            f"{rows:>8} {query_time:>10.4f} {index_time:>10.4f} "
+            f"{query_time / index_time:>7.0f}x"
+        )
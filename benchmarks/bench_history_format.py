@@ -0,0 +1,82 @@
+"""Compares CSV and Parquet history segments: object size, full load time,
+and load time for the vote key columns used to find new votes.
+
+Usage: python benchmarks/bench_history_format.py
+"""
+
+import os
+import random
+import sys
+import time
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from store import HistoryStore, FORMATS  # noqa: E402
+
+# Same schema as Representabot.DTYPES, without importing the bot
+DTYPES = {
+    "tweet_id": str,
+    "congress": str,
+    "session": str,
+    "date": str,
+    "vote": str,
+    **{
+        f"{v}_vote_{p}": "Int64"
+        for v in ["yea", "nay", "abstain"]
+        for p in ["total", "D", "R"]
+    },
+    "Nay": float,
+    "Yea": float,
+    "Abstain": float,
+}
+
+
+def make_history(rows, seed=0):
+    rng = random.Random(seed)
+    history = {
+        "tweet_id": [str(1400000000000000000 + i) for i in range(rows)],
+        "congress": ["117"] * rows,
+        "session": ["1"] * rows,
+        "date": [f"{rng.randint(1, 28):02d}-Jan" for _ in range(rows)],
+        "vote": [f"{i + 1:05d}" for i in range(rows)],
+    }
+    for column, dtype in DTYPES.items():
+        if dtype == "Int64":
+            history[column] = [rng.randint(0, 60) for _ in range(rows)]
+        elif dtype is float:
+            history[column] = [rng.random() for _ in range(rows)]
+    return pd.DataFrame(history)
+
+
+def timed(func, *args, repeat=3):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(*args)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+if __name__ == "__main__":
+    print(
+        f"{'rows':>7} {'format':>8} {'size (KB)':>10} "
+        f"{'load (ms)':>10} {'keys (ms)':>10}"
+    )
+    for rows in [1_000, 10_000, 100_000]:
+        history = make_history(rows)
+        for extension, format_class in FORMATS.items():
+            try:
+                serializer = format_class(DTYPES)
+            except ImportError:
+                print(f"{rows:>7} {extension:>8} (pyarrow not installed)")
+                continue
+            body = serializer.dumps(history)
+            load = timed(serializer.loads, body)
+            keys = timed(serializer.loads, body, HistoryStore.KEY)
+            print(
+                f"{rows:>7} {extension:>8} {len(body) / 1024:>10.1f} "
+                f"{load * 1000:>10.1f} {keys * 1000:>10.1f}"
+            )
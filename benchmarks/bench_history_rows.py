@@ -0,0 +1,106 @@
+"""Compares gathering a run's new history rows with DataFrame.append, one
+row at a time as Representabot.run used to, with VoteRecord records turned
+into a DataFrame once.
+
+Usage: python benchmarks/bench_history_rows.py [--votes 4 100 1000]
+"""
+
+import argparse
+import os
+import sys
+import time
+import warnings
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bot import VoteRecord  # noqa: E402
+
+
+def make_results(votes):
+    """Builds (item, party_data, vote_data) like process_vote returns"""
+    results = []
+    for n in range(1, votes + 1):
+        party_data = {
+            f"{v}_vote_{p}": (n + i) % 50
+            for i, (v, p) in enumerate(
+                (v, p)
+                for v in ["yea", "nay", "abstain"]
+                for p in ["total", "D", "R"]
+            )
+        }
+        vote_data = {"Nay": 0.4, "Yea": 0.55, "Abstain": 0.05}
+        item = {"vote_number": f"{n:05d}", "vote_date": "03-Jan"}
+        results.append((item, party_data, vote_data))
+    return results
+
+
+def append_rows(results):
+    new_tweets = pd.DataFrame(
+        columns=["tweet_id", "congress", "session", "date", "vote"],
+        dtype=str,
+    )
+    for item, party_data, vote_data in results:
+        new_tweets = new_tweets.append(
+            {
+                "tweet_id": None,
+                "congress": "117",
+                "session": "1",
+                "date": item["vote_date"],
+                "vote": item["vote_number"],
+                **party_data,
+                **vote_data,
+            },
+            ignore_index=True,
+        )
+    return new_tweets
+
+
+def record_rows(results):
+    return VoteRecord.frame(
+        [
+            VoteRecord(
+                congress="117",
+                session="1",
+                date=item["vote_date"],
+                vote=item["vote_number"],
+                **party_data,
+                **vote_data,
+            )
+            for item, party_data, vote_data in results
+        ]
+    )
+
+
+def timed(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--votes",
+        type=int,
+        nargs="+",
+        default=[4, 100, 1000],
+        help="Numbers of new votes in a run",
+    )
+    args = parser.parse_args()
+    # DataFrame.append is deprecated, which is the point
+    warnings.simplefilter("ignore", FutureWarning)
+
+    print(
+        f"{'votes':>6} {'append (s)':>11} {'records (s)':>12} {'speedup':>8}"
+    )
+    for votes in args.votes:
+        results = make_results(votes)
+        appended, baseline = timed(append_rows, results)
+        records, elapsed = timed(record_rows, results)
+        assert appended["vote"].tolist() == records["vote"].tolist()
+        print(
+            f"{votes:>6} {baseline:>11.4f} {elapsed:>12.4f} "
+            f"{baseline / elapsed:>7.1f}x"
+        )
@@ -0,0 +1,185 @@
+"""Compares rendering tweet text with the renderer module against the
+previous per-call implementation (closures, a linear scan of QUESTIONS,
+string += and pd.to_datetime), over the tweet corpus in tests/fixtures.
+Both must produce the same text.
+
+Usage: python benchmarks/bench_renderer.py [--rounds 20]
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import data as cd  # noqa: E402
+import renderer  # noqa: E402
+
+CORPUS = os.path.join(ROOT, "tests", "fixtures", "tweet_corpus.json")
+QUESTIONS = cd.SenateData.QUESTIONS
+
+
+def legacy_detail_text(vote_rep, party_rep):
+    text = ""
+    for v in ["yea", "nay", "abstain"]:
+        p = "{0:.1%}".format(vote_rep[v.title()])
+        total_vote = party_rep[f"{v}_vote"]["total"]
+        d_vote = party_rep[f"{v}_vote"]["D"]
+        r_vote = party_rep[f"{v}_vote"]["R"]
+        i_vote = total_vote - (d_vote + r_vote)
+        votes = "vote" if total_vote == 1 else "votes"
+        if v == "abstain":
+            li = f"😶 No vote: {p} ... {total_vote} {votes} ({d_vote}-D, {r_vote}-R, {i_vote}-I)"
+        elif v == "nay":
+            li = f"❎ {v.title()}s: {p} ... {total_vote} {votes} ({d_vote}-D, {r_vote}-R, {i_vote}-I)"
+        else:
+            li = f"✅ {v.title()}s: {p} of the country represented by {total_vote} {votes} ({d_vote}-D, {r_vote}-R, {i_vote}-I)"
+        text += f"{li}\n\n"
+    return text
+
+
+def legacy_vote_text(question, vote_question, vote, vote_detail):
+    def process_name(name):
+        name = name[: name.find(",")]
+        name = name.split()
+        return name[0][0] + ". " + name[-1]
+
+    def process_measure():
+        text = ""
+        detail = vote_detail["roll_call_vote"]
+        if question == "motion":
+            if len(vote_question.split()) > 3:
+                if "PN" in vote_issue:
+                    nominee = process_name(detail["vote_document_text"])
+                    text += f"{vote_question.capitalize()} the {nominee} nomination was {vote_result}"
+                elif "amdt" in detail["vote_title"].lower():
+                    text += f"{vote_question.capitalize()} (an amendment to {vote_issue}) was {vote_result}"
+                else:
+                    text += f"{vote_question.capitalize()} ({vote_issue}) was {vote_result}"
+            else:
+                text += f"{vote_question.capitalize()}"
+                if "PN" in vote_issue:
+                    nominee = process_name(detail["vote_document_text"])
+                    text += f" on nominating {nominee} "
+                elif "waive" in detail["vote_title"].lower():
+                    text += " to waive "
+                    if "amdt" in detail["vote_title"].lower():
+                        text += f"re: an Amdt. to {vote_issue} "
+                else:
+                    text += f" for {vote_issue} "
+                text += f"was {vote_result}"
+        elif question == "bill":
+            text += f"The bill {vote_issue} was {vote_result}"
+        elif question == "amendment":
+            amend = vote["question"]["measure"]
+            text += f"The amendment {amend} for {vote_issue} was {vote_result}"
+        elif question == "resolution":
+            text += f"{vote_question.capitalize()} for {vote_issue} was {vote_result}"
+        elif question == "nomination":
+            nominee = process_name(detail["vote_document_text"])
+            text += f"The nomination for {nominee} was {vote_result}"
+        elif question == "veto":
+            text += f"The veto on {vote_issue} was {vote_result[5:]}"
+        return text
+
+    vote_issue = vote["issue"]
+    vote_result = vote["result"].lower()
+    return process_measure()
+
+
+def legacy_render(vote, vote_detail, party_rep, vote_rep):
+    date = pd.to_datetime(vote_detail["roll_call_vote"]["vote_date"])
+    date.strftime("%B %d, %Y")
+    vote_question = vote["question"]
+    if isinstance(vote_question, dict):
+        vote_question = vote_question["#text"]
+    vote_question = vote_question.lower()[3:]
+    vote_question = (
+        vote_question[: vote_question.find("(") - 1]
+        if vote_question.find("(") > 0
+        else vote_question
+    )
+    vote_question = (
+        "the " + vote_question if vote_question[:3] != "the" else vote_question
+    )
+    q = [question for question in QUESTIONS if question in vote_question]
+    text = legacy_vote_text(q[0], vote_question, vote, vote_detail)
+    text += ".\n\n"
+    text += legacy_detail_text(vote_rep, party_rep)
+    link = (
+        "https://www.senate.gov/legislative/LIS/roll_call_lists/roll_call_vote_cfm.cfm?"
+        f"congress=117&session=1&vote={vote['vote_number']}"
+    )
+    text += f"src: {link}"
+    return text
+
+
+def render(r, vote, vote_detail, party_rep, vote_rep):
+    vote_question = vote["question"]
+    if isinstance(vote_question, dict):
+        vote_question = vote_question["#text"]
+    question, vote_question = r.classify(vote_question)
+    return "".join(
+        [
+            r.vote_text(question, vote_question, vote, vote_detail),
+            ".\n\n",
+            r.detail_text(vote_rep, party_rep),
+            "src: ",
+            r.link("117", "1", vote["vote_number"]),
+        ]
+    )
+
+
+def load_cases(senate_obj):
+    """Tweetable corpus votes with their representation results"""
+    with open(CORPUS) as f:
+        corpus = json.load(f)
+    cases = []
+    for case in corpus["cases"]:
+        if case["expected"] is None:
+            continue
+        members = corpus["members"][
+            : case["vote_detail"]["roll_call_vote"]["members"]["member"]
+        ]
+        party_rep, vote_rep = senate_obj.engine.compute(members)
+        cases.append((case["vote"], case["vote_detail"], party_rep, vote_rep))
+    return cases
+
+
+def timed(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--rounds",
+        type=int,
+        default=20,
+        help="Times to render the whole corpus",
+    )
+    args = parser.parse_args()
+    senate_obj = cd.SenateData("117", "1")
+    cases = load_cases(senate_obj) * args.rounds
+    r = renderer.Renderer(QUESTIONS)
+
+    expected, baseline = timed(
+        lambda: [legacy_render(*case) for case in cases]
+    )
+    result, elapsed = timed(lambda: [render(r, *case) for case in cases])
+    assert result == expected
+    print(
+        f"{'path':>9} {'total (s)':>10} {'per vote (us)':>14} {'speedup':>8}"
+    )
+    for name, seconds in [("legacy", baseline), ("renderer", elapsed)]:
+        print(
+            f"{name:>9} {seconds:>10.4f} {seconds / len(cases) * 1e6:>14.1f} "
+            f"{baseline / seconds:>7.1f}x"
+        )
@@ -0,0 +1,97 @@
+"""Compares the pandas representation path (get_voters, get_vote_rep and
+get_party_rep) with RepresentationEngine on synthetic 100-member votes.
+
+Usage: python benchmarks/bench_representation.py [--votes 400]
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import data as cd  # noqa: E402
+from population import get_state_population  # noqa: E402
+
+
+def make_votes(state_pop_data, votes, seed=0):
+    """Builds member lists shaped like roll_call_vote members"""
+    rng = random.Random(seed)
+    states = [s for s in state_pop_data["state"] if s not in ("DC", "PR")]
+    parties = [rng.choice(["D", "R", "I"]) for j in range(100)]
+    members = []
+    for i in range(votes):
+        members.append(
+            [
+                {
+                    "lis_member_id": f"S{j:03d}",
+                    "state": states[j // 2],
+                    "party": parties[j],
+                    "vote_cast": rng.choice(
+                        ["Yea", "Nay", "Not Voting", "Present"]
+                    ),
+                }
+                for j in range(100)
+            ]
+        )
+    return members
+
+
+def pandas_path(senate_obj, members):
+    results = []
+    for vote_members in members:
+        voters = senate_obj.get_voters({"member": vote_members})
+        voters.loc[
+            lambda x: ~x["vote_cast"].isin(["Yea", "Nay"]), "vote_cast"
+        ] = "Abstain"
+        results.append(
+            (senate_obj.get_party_rep(voters), senate_obj.get_vote_rep(voters))
+        )
+    return results
+
+
+def engine_path(senate_obj, members):
+    return [
+        senate_obj.engine.compute(vote_members) for vote_members in members
+    ]
+
+
+def engine_batch_path(senate_obj, members):
+    return senate_obj.engine.compute_batch(members)
+
+
+def timed(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--votes",
+        type=int,
+        default=400,
+        help="Number of votes to compute",
+    )
+    args = parser.parse_args()
+    senate_obj = cd.SenateData("117", "1")
+    members = make_votes(get_state_population(), args.votes)
+
+    expected, baseline = timed(pandas_path, senate_obj, members)
+    print(
+        f"{'path':>14} {'total (s)':>10} {'per vote (ms)':>14} {'speedup':>8}"
+    )
+    for name, func in [
+        ("pandas", pandas_path),
+        ("engine", engine_path),
+        ("engine batch", engine_batch_path),
+    ]:
+        result, elapsed = timed(func, senate_obj, members)
+        assert result == expected
+        print(
+            f"{name:>14} {elapsed:>10.4f} {elapsed / args.votes * 1000:>14.3f} "
+            f"{baseline / elapsed:>7.1f}x"
+        )
@@ -0,0 +1,399 @@
+"""Offline benchmark suite for the senate.gov fetch, vote processing and
+end-to-end bot run, compared against stored baseline results.
+
+senate.gov is replayed by a local HTTP server from synthetic fixtures.
+Only the 117th Congress, 1st session is recorded (in tests/fixtures). Its
+documents are templates for every benchmarked congress and session,
+117-1 included, with renumbered votes and each senator's vote drawn at
+random (seeded, so every run serves the same XML). The vote totals and
+results in these documents no longer match the member votes, and they
+are not real votes, so the timings say nothing about real sessions whose
+size, questions or senators differ.
+State populations come from the bundled ACS table, so nothing touches the
+network. Bot runs use an in-memory history store and a fake Twitter API.
+
+Usage:
+    python benchmarks/bench_suite.py                   # compare to baseline
+    python benchmarks/bench_suite.py --save-baseline   # record a baseline
+
+Exits with status 1 if any benchmark is more than --tolerance slower than
+its baseline. Baselines are only comparable on the same machine, so record
+one where the suite is run (e.g. in CI) before relying on the check.
+"""
+
+import argparse
+import functools
+import json
+import logging
+import os
+import random
+import re
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import types
+
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import bot  # noqa: E402
+import data as cd  # noqa: E402
+import population  # noqa: E402
+import warehouse  # noqa: E402
+
+from store import HistoryStore  # noqa: E402
+
+RECORDED = os.path.join(ROOT, "tests", "fixtures", "senate")
+LIS = os.path.join("legislative", "LIS")
+BASELINE = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "baseline.json"
+)
+SHARDS = [("115", "1"), ("116", "2"), ("117", "1")]
+
+
+class MemoryHistoryStore(HistoryStore):
+    """History store kept in a dict"""
+
+    def __init__(self, dtypes=None, format="csv"):
+        super().__init__(dtypes, format)
+        self.objects = {}
+
+    def list(self, prefix):
+        return sorted(name for name in self.objects if name.startswith(prefix))
+
+    def get(self, name):
+        return self.objects.get(name)
+
+    def put(self, name, body):
+        self.objects[name] = body
+
+    def delete(self, name):
+        self.objects.pop(name, None)
+
+
+class FakeTwitter:
+    def __init__(self):
+        self.posted = 0
+
+    def update_status(self, text):
+        self.posted += 1
+        return types.SimpleNamespace(id_str=str(self.posted))
+
+
+class Server(ThreadingHTTPServer):
+    # Room for every concurrent fetch, so connections aren't dropped
+    request_queue_size = 64
+    daemon_threads = True
+
+
+class QuietHandler(SimpleHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+
+def read(path):
+    with open(path) as f:
+        return f.read()
+
+
+def write(path, text):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as f:
+        f.write(text)
+
+
+def build_synthetic_fixtures(directory, votes, seed=0, shards=SHARDS):
+    """Writes a synthetic senate.gov tree for each (congress, session) of
+    `shards` with `votes` votes. They are copies of the recorded 117-1 vote
+    menu and roll call votes with random member votes, not recorded data.
+    """
+    rng = random.Random(seed)
+    menu = read(
+        os.path.join(RECORDED, LIS, "roll_call_lists", "vote_menu_117_1.xml")
+    )
+    head, _, rest = menu.partition("<vote>")
+    entries = ["<vote>" + v for v in rest.split("<vote>")]
+    entries[-1], _, tail = entries[-1].partition("</votes>")
+    tail = "</votes>" + tail
+    details = {}
+    for entry in entries:
+        number = re.search(r"<vote_number>(\d+)</vote_number>", entry).group(1)
+        details[number] = read(
+            os.path.join(
+                RECORDED,
+                LIS,
+                "roll_call_votes",
+                "vote1171",
+                f"vote_117_1_{number}.xml",
+            )
+        )
+
+    for congress, session in shards:
+        menu_entries = []
+        for n in range(votes, 0, -1):
+            entry = entries[n % len(entries)]
+            template = re.search(
+                r"<vote_number>(\d+)</vote_number>", entry
+            ).group(1)
+            menu_entries.append(
+                re.sub(
+                    r"<vote_number>\d+</vote_number>",
+                    f"<vote_number>{n:05d}</vote_number>",
+                    entry,
+                )
+            )
+            detail = details[template]
+            detail = detail.replace(
+                "<congress>117</congress>", f"<congress>{congress}</congress>"
+            )
+            detail = detail.replace(
+                "<session>1</session>", f"<session>{session}</session>"
+            )
+            detail = re.sub(
+                r"<vote_cast>[^<]*</vote_cast>",
+                lambda m: "<vote_cast>"
+                + rng.choice(["Yea", "Yea", "Nay", "Nay", "Not Voting"])
+                + "</vote_cast>",
+                detail,
+            )
+            write(
+                os.path.join(
+                    directory,
+                    LIS,
+                    "roll_call_votes",
+                    f"vote{congress}{session}",
+                    f"vote_{congress}_{session}_{n:05d}.xml",
+                ),
+                detail,
+            )
+        write(
+            os.path.join(
+                directory,
+                LIS,
+                "roll_call_lists",
+                f"vote_menu_{congress}_{session}.xml",
+            ),
+            head + "".join(menu_entries) + tail,
+        )
+
+
+def serve(directory):
+    handler = functools.partial(QuietHandler, directory=directory)
+    server = Server(("127.0.0.1", 0), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    cd.SenateData.BASE_URL = (
+        f"http://127.0.0.1:{server.server_port}/legislative/LIS"
+    )
+    return server
+
+
+def timed(func, repeat):
+    """Fastest of `repeat` calls of func, in seconds. The minimum is the
+    least affected by other load on the machine.
+    """
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def run_bot(congress, session, votes):
+    bot.RUNTIME.clear()
+    bot.RUNTIME.put("twitter_api", FakeTwitter())
+    bot.RUNTIME.put(
+        "store", MemoryHistoryStore(dtypes=bot.Representabot.DTYPES)
+    )
+    bot.Representabot.POST_INTERVAL = 0
+    bot.Representabot.MAX_TWEETS = votes
+    bot.Representabot(congress, session).run()
+
+
+def import_bot():
+    """Imports the bot in a new interpreter, as on a cold start"""
+    subprocess.run([sys.executable, "-c", "import bot"], cwd=ROOT, check=True)
+
+
+def cold_start(congress, session, store):
+    """A run with nothing new to tweet, starting without the cached
+    clients, chambers and population table
+    """
+    bot.RUNTIME.clear()
+    bot.RUNTIME.put("twitter_api", FakeTwitter())
+    bot.RUNTIME.put("store", store)
+    population._tables.clear()
+    bot.Representabot(congress, session).run()
+
+
+def benchmarks(votes, directory):
+    """Returns {name: function} for each benchmark. The vote warehouse is
+    kept in `directory`.
+    """
+    shards = [cd.SenateData(congress, session) for congress, session in SHARDS]
+    menus = {
+        s: s.get_senate_list()["vote_summary"]["votes"]["vote"] for s in shards
+    }
+    details = {s: list(s.iter_vote_details(menus[s])) for s in shards}
+    members = [
+        detail["roll_call_vote"]["members"]
+        for s in shards
+        for _, detail in details[s]
+    ]
+    senate_obj = shards[0]
+
+    def process_votes():
+        for s in shards:
+            for item, detail in details[s]:
+                try:
+                    s.process_vote(item, detail)
+                except cd.DoNotTweetException:
+                    pass
+
+    def pandas_representation():
+        for vote_members in members:
+            voters = senate_obj.get_voters(vote_members)
+            senate_obj.get_vote_rep(voters)
+            senate_obj.get_party_rep(voters)
+
+    party_reps = [senate_obj.engine.compute(m["member"])[0] for m in members]
+
+    warehouse_dir = os.path.join(directory, "warehouse")
+    for s in shards:
+        warehouse.VoteWarehouse(warehouse_dir).ingest(s)
+
+    def reprocess_network():
+        for s in shards:
+            s.process_batch(list(s.iter_vote_details(menus[s])))
+
+    # History with every vote of the first shard tweeted
+    tweeted = MemoryHistoryStore(dtypes=bot.Representabot.DTYPES)
+    bot.RUNTIME.clear()
+    bot.RUNTIME.put("twitter_api", FakeTwitter())
+    bot.RUNTIME.put("store", tweeted)
+    bot.Representabot.POST_INTERVAL = 0
+    bot.Representabot.MAX_TWEETS = votes
+    bot.Representabot(*SHARDS[0]).run()
+
+    def reprocess_warehouse():
+        # Read from disk on every run
+        stored = warehouse.VoteWarehouse(warehouse_dir)
+        for s in shards:
+            pairs = stored.details(s.name, s.congress_num, s.session_num)
+            s.process_batch(list(pairs.values()))
+
+    return {
+        "get_senate_list": lambda: [s.get_senate_list() for s in shards],
+        "fetch_votes": lambda: [
+            s.fetch_votes(v["vote_number"] for v in menus[s]) for s in shards
+        ],
+        "process_vote": process_votes,
+        "get_voters": lambda: [senate_obj.get_voters(m) for m in members],
+        "pandas_representation": pandas_representation,
+        "engine_representation": lambda: [
+            senate_obj.engine.compute(m["member"]) for m in members
+        ],
+        "flatten": lambda: [cd.flatten(p, result={}) for p in party_reps],
+        "bot_run": lambda: [run_bot(c, s, votes) for c, s in SHARDS],
+        "reprocess_network": reprocess_network,
+        "reprocess_warehouse": reprocess_warehouse,
+        "import_bot": import_bot,
+        "cold_start_noop": lambda: cold_start(*SHARDS[0], tweeted),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--votes",
+        type=int,
+        default=60,
+        help="Number of votes in each congress and session",
+    )
+    parser.add_argument(
+        "--repeat",
+        type=int,
+        default=5,
+        help="Runs of each benchmark, the fastest is reported",
+    )
+    parser.add_argument(
+        "--baseline",
+        default=BASELINE,
+        help="Baseline results file",
+    )
+    parser.add_argument(
+        "--save-baseline",
+        action="store_true",
+        help="Record the results as the new baseline",
+    )
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=0.5,
+        help="Allowed slowdown over the baseline, e.g. 0.5 for 50%%",
+    )
+    args = parser.parse_args()
+    logging.getLogger().setLevel(logging.WARNING)
+    cd.SenateData.CACHE_DIR = None
+
+    directory = tempfile.mkdtemp()
+    try:
+        build_synthetic_fixtures(directory, args.votes)
+        server = serve(directory)
+        results = {
+            name: timed(func, args.repeat)
+            for name, func in benchmarks(args.votes, directory).items()
+        }
+        server.shutdown()
+    finally:
+        shutil.rmtree(directory)
+
+    baseline = {}
+    if os.path.exists(args.baseline) and not args.save_baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if baseline.get("votes") != args.votes:
+            sys.exit(
+                f"Baseline was recorded with --votes {baseline.get('votes')}"
+            )
+
+    slower = []
+    print(
+        f"Synthetic fixtures: {args.votes} votes per session in "
+        f"{', '.join('-'.join(shard) for shard in SHARDS)}, "
+        "from the recorded 117-1 votes"
+    )
+    print(
+        f"{'benchmark':>22} {'best (ms)':>12} {'baseline (ms)':>14} {'ratio':>6}"
+    )
+    for name, elapsed in results.items():
+        expected = baseline.get("results", {}).get(name)
+        ratio = elapsed / expected if expected else None
+        if ratio is not None and ratio > 1 + args.tolerance:
+            slower.append(name)
+        print(
+            f"{name:>22} {elapsed * 1000:>12.2f} "
+            f"{expected * 1000 if expected else float('nan'):>14.2f} "
+            f"{ratio if ratio else float('nan'):>6.2f}"
+        )
+
+    if args.save_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump(
+                {
+                    "fixtures": "synthetic",
+                    "votes": args.votes,
+                    "results": results,
+                },
+                f,
+                indent=2,
+            )
+            f.write("\n")
+        print(f"Saved baseline to {args.baseline}")
+    elif slower:
+        sys.exit(f"Slower than baseline: {', '.join(slower)}")
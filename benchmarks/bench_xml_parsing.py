@@ -0,0 +1,89 @@
+"""Compares xmltodict.parse (plus json_normalize for members) with the
+streaming parsers in data.py on the recorded senate.gov fixtures: time per
+document and peak memory.
+
+Usage: python benchmarks/bench_xml_parsing.py [--repeat 50]
+"""
+
+import argparse
+import glob
+import io
+import os
+import sys
+import time
+import tracemalloc
+
+import pandas as pd
+import xmltodict
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import data as cd  # noqa: E402
+
+LIS = os.path.join(ROOT, "tests", "fixtures", "senate", "legislative", "LIS")
+
+
+def xmltodict_menu(body):
+    return xmltodict.parse(body)
+
+
+def xmltodict_vote(body):
+    vote = xmltodict.parse(body)
+    return pd.json_normalize(vote["roll_call_vote"]["members"], "member")
+
+
+def streaming_menu(body):
+    return cd.parse_vote_menu(io.BytesIO(body))
+
+
+def streaming_vote(body):
+    return cd.parse_roll_call_vote(io.BytesIO(body))
+
+
+def measure(func, bodies, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for body in bodies:
+            func(body)
+    elapsed = (time.perf_counter() - start) / (repeat * len(bodies))
+
+    tracemalloc.start()
+    for body in bodies:
+        func(body)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--repeat",
+        type=int,
+        default=50,
+        help="Number of times to parse each document",
+    )
+    args = parser.parse_args()
+
+    documents = {}
+    for kind, pattern in [
+        ("vote_menu", "roll_call_lists/*.xml"),
+        ("roll_call_vote", "roll_call_votes/*/*.xml"),
+    ]:
+        documents[kind] = []
+        for path in sorted(glob.glob(os.path.join(LIS, pattern))):
+            with open(path, "rb") as f:
+                documents[kind].append(f.read())
+
+    print(f"{'document':>15} {'parser':>10} {'ms/doc':>8} {'peak (KB)':>10}")
+    for kind, baseline, streaming in [
+        ("vote_menu", xmltodict_menu, streaming_menu),
+        ("roll_call_vote", xmltodict_vote, streaming_vote),
+    ]:
+        for name, func in [("xmltodict", baseline), ("streaming", streaming)]:
+            elapsed, peak = measure(func, documents[kind], args.repeat)
+            print(
+                f"{kind:>15} {name:>10} {elapsed * 1000:>8.3f} "
+                f"{peak / 1024:>10.1f}"
+            )
@@ -1,15 +1,28 @@
 import argparse
-import io
+import functools
+import itertools
 import json
 import logging
+import multiprocessing
 import os
+import signal
+import threading
+import time
+
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 
-import boto3
 import dotenv
 import pandas as pd
-import tweepy
 
+import analytics
 import data as cd
+import metrics
+import posting
+import sinks
+import warehouse
+
+from metrics import METRICS
+from store import HistoryStore, LocalHistoryStore, S3HistoryStore
 
 
 # Load all environment variables from `.env` file
@@ -17,19 +30,112 @@ dotenv.load_dotenv()
 logging.basicConfig(level=logging.INFO)
 
 
+class RuntimeContext:
+    """Objects kept at module level so that warm Lambda invocations can
+    reuse them instead of rebuilding them. An entry is rebuilt once it is
+    older than its TTL, or when the validator passed to `get` differs from
+    the one it was stored with.
+    """
+
+    def __init__(self):
+        self.entries = {}
+        self.invocations = 0
+        self.lock = threading.Lock()
+
+    def get(self, key, factory, ttl=None, validator=None):
+        with self.lock:
+            entry = self.entries.get(key)
+        if entry is not None:
+            created, stored_validator, value = entry
+            fresh = ttl is None or time.monotonic() - created < ttl
+            if fresh and stored_validator == validator:
+                return value
+        value = factory()
+        self.put(key, value, validator)
+        return value
+
+    def put(self, key, value, validator=None):
+        with self.lock:
+            self.entries[key] = (time.monotonic(), validator, value)
+
+    def validator(self, key):
+        """Returns the validator an entry was stored with, or None"""
+        with self.lock:
+            entry = self.entries.get(key)
+        return entry[1] if entry is not None else None
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+
+RUNTIME = RuntimeContext()
+
+
 class Representabot:
     AWS_ACCESS_KEY = os.environ.get("AWS_ACCESS_KEY")
     AWS_BUCKET_NAME = os.environ.get("AWS_BUCKET_NAME")
     AWS_SECRET_ACCESS_KEY = os.environ.get("AWS_SECRET_ACCESS_KEY")
-    MAX_TWEETS = os.environ.get("MAX_TWEETS", 4)
+    MAX_TWEETS = int(os.environ.get("MAX_TWEETS", 4))
     OBJ_FILENAME = os.environ.get("OBJ_FILENAME")
+    # Tweet history is kept in segment files under this S3 prefix, or in
+    # a local directory if HISTORY_DIR is set
+    HISTORY_PREFIX = os.environ.get("HISTORY_PREFIX", "history")
+    HISTORY_DIR = os.environ.get("HISTORY_DIR")
+    # Format of new history segments, "csv" or "parquet" (needs pyarrow)
+    HISTORY_FORMAT = os.environ.get("HISTORY_FORMAT", "csv")
+    # Merge a congress/session's segments once it has this many
+    COMPACT_SEGMENTS = int(os.environ.get("COMPACT_SEGMENTS", 20))
+    # Minimum seconds between tweets
+    POST_INTERVAL = float(os.environ.get("POST_INTERVAL", 1))
+    # Retries of a failed tweet, with backoff doubling from POST_BACKOFF
+    POST_RETRIES = int(os.environ.get("POST_RETRIES", 2))
+    POST_BACKOFF = float(os.environ.get("POST_BACKOFF", 1))
+    # Longest rate-limit wait before leaving the queue for the next run
+    POST_MAX_WAIT = float(os.environ.get("POST_MAX_WAIT", 60))
+    # Runs a queued tweet is tried in before it is moved to queue-failed/
+    POST_MAX_ATTEMPTS = int(os.environ.get("POST_MAX_ATTEMPTS", 5))
+    # Destinations for vote summaries besides Twitter: a local JSON lines
+    # file, a webhook and a JSON Feed object in the history store
+    OUTPUT_FILE = os.environ.get("OUTPUT_FILE")
+    WEBHOOK_URL = os.environ.get("WEBHOOK_URL")
+    FEED_NAME = os.environ.get("FEED_NAME")
+    # Prefix of the vote aggregates for reports in the history store,
+    # written as rows are saved. Disabled if set to an empty string.
+    ANALYTICS_NAME = os.environ.get("ANALYTICS_NAME", "analytics")
+    # Also write each run's timing summary to this JSON file
+    METRICS_FILE = os.environ.get("METRICS_FILE")
+    # Seconds that API clients and chambers are reused across warm starts
+    CLIENT_TTL = float(os.environ.get("CLIENT_TTL", 3600))
+    # Seconds between polls of the vote lists with --watch
+    POLL_INTERVAL = float(os.environ.get("POLL_INTERVAL", 60))
+    # Local warehouse of member-level roll call votes filled by --ingest,
+    # in "csv" or "parquet" (needs pyarrow), written every
+    # WAREHOUSE_CHECKPOINT votes
+    WAREHOUSE_DIR = os.environ.get("WAREHOUSE_DIR")
+    WAREHOUSE_FORMAT = os.environ.get("WAREHOUSE_FORMAT", "csv")
+    WAREHOUSE_CHECKPOINT = int(os.environ.get("WAREHOUSE_CHECKPOINT", 100))
+    # Worker processes that backfill shards (chamber, congress and
+    # session), 1 to backfill in this process. Ignored on Lambda.
+    BACKFILL_WORKERS = int(os.environ.get("BACKFILL_WORKERS", 1))
+    # Journal of the votes a run is computing, tweeting and saving, kept
+    # in this directory, or next to the history if not set
+    JOURNAL_DIR = os.environ.get("JOURNAL_DIR")
+    # Votes whose representation is recomputed at once by --recompute
+    RECOMPUTE_BATCH = 500
+    # Chambers whose votes are tweeted, processed concurrently
+    CHAMBERS = os.environ.get("CHAMBERS", "senate").split(",")
 
     DTYPES = {
         "tweet_id": str,
+        "chamber": str,
         "congress": str,
         "session": str,
         "date": str,
         "vote": str,
+        "question": str,
+        "result": str,
+        "methodology": str,
         "yea_vote_total": "Int64",
         "yea_vote_D": "Int64",
         "yea_vote_R": "Int64",
@@ -47,14 +153,84 @@ class Representabot:
     def __init__(self, congress, session):
         self.congress = congress
         self.session = session
-        self.twitter_api = self.__create_api()
-        self.s3_client = self.__get_s3_client()
-        self.tweets = self.__load()
-        self.senate_obj = cd.SenateData(congress, session)
-        self.senate_data = self.senate_obj.get_senate_list()
+        self.store = RUNTIME.get(
+            "store", self.__create_store, ttl=self.CLIENT_TTL
+        )
+        # The Twitter client and tweeted votes indexes are created when
+        # first used, so runs that don't need them skip their requests
+        self.__publisher = None
+        self.__tweeted = None
+        # Chamber threads first use the index at the same time, and must
+        # all update the same sets
+        self.__tweeted_lock = threading.Lock()
+        self.queue = posting.MessageQueue(self.store)
+        self.journal = posting.RunJournal(
+            LocalHistoryStore(self.JOURNAL_DIR)
+            if self.JOURNAL_DIR
+            else self.store
+        )
+        self.__resumed = False
+        self.analytics = (
+            analytics.Analytics(
+                self.store,
+                self.ANALYTICS_NAME,
+                compact_objects=self.COMPACT_SEGMENTS,
+            )
+            if self.ANALYTICS_NAME
+            else None
+        )
+        # Sinks other than Twitter, which have their own queues
+        self.fanout = sinks.Fanout(
+            self.__create_sinks(),
+            self.store,
+            max_attempts=self.POST_MAX_ATTEMPTS,
+        )
+        # Kept across warm starts, so rate limits carry over
+        self.bucket = RUNTIME.get("bucket", self.__create_bucket)
+        self.chambers = [
+            RUNTIME.get(
+                (chamber, congress, session),
+                functools.partial(create_chamber, chamber, congress, session),
+                ttl=self.CLIENT_TTL,
+            )
+            for chamber in self.CHAMBERS
+        ]
+        # Highest vote number polled in each chamber and the vote list's
+        # validators, while watching
+        self.watermarks = {}
+
+    @property
+    def twitter_api(self):
+        return RUNTIME.get(
+            "twitter_api", self.__create_api, ttl=self.CLIENT_TTL
+        )
+
+    @property
+    def publisher(self):
+        """Publishes to Twitter"""
+        if self.__publisher is None:
+            self.__publisher = posting.TwitterPublisher(self.twitter_api)
+        return self.__publisher
+
+    @property
+    def tweeted(self):
+        """Index of the votes in the history for each chamber, for the
+        bot's congress and session
+        """
+        with self.__tweeted_lock:
+            if self.__tweeted is None:
+                self.__tweeted = {
+                    chamber: self.__load_index(
+                        self.congress, self.session, chamber
+                    )
+                    for chamber in self.CHAMBERS
+                }
+        return self.__tweeted
 
     def __create_api(self):
         """Creates Tweepy API object for use later"""
+        import tweepy
+
         consumer_key = os.environ.get("CONSUMER_KEY")
         consumer_secret = os.environ.get("CONSUMER_SECRET")
         access_token = os.getenv("ACCESS_TOKEN")
@@ -65,8 +241,8 @@ class Representabot:
         api = tweepy.API(
             auth,
             compression=True,
-            wait_on_rate_limit=True,
-            wait_on_rate_limit_notify=True,
+            # Rate limits are handled by the posting scheduler
+            wait_on_rate_limit=False,
         )
         try:
             api.verify_credentials()
@@ -75,8 +251,25 @@ class Representabot:
             raise e
         return api
 
+    def __create_sinks(self):
+        """Creates the configured sinks other than Twitter"""
+        outputs = []
+        if self.OUTPUT_FILE:
+            outputs.append(sinks.FileSink(self.OUTPUT_FILE))
+        if self.WEBHOOK_URL:
+            outputs.append(sinks.WebhookSink(self.WEBHOOK_URL))
+        if self.FEED_NAME:
+            outputs.append(sinks.JSONFeedSink(self.store, self.FEED_NAME))
+        return outputs
+
+    def __create_bucket(self):
+        rate = 1 / self.POST_INTERVAL if self.POST_INTERVAL > 0 else 0
+        return posting.TokenBucket(rate)
+
     def __get_s3_client(self):
         """Gets an S3 client from boto3"""
+        import boto3
+
         if self.AWS_ACCESS_KEY:
             s3_client = boto3.client(
                 "s3",
@@ -87,22 +280,41 @@ class Representabot:
             s3_client = boto3.client("s3")
         return s3_client
 
+    def __create_store(self):
+        """Creates the tweet history store, on S3 unless HISTORY_DIR is set"""
+        if self.HISTORY_DIR:
+            return LocalHistoryStore(
+                self.HISTORY_DIR,
+                dtypes=self.DTYPES,
+                format=self.HISTORY_FORMAT,
+            )
+        self.s3_client = self.__get_s3_client()
+        return S3HistoryStore(
+            self.s3_client,
+            self.AWS_BUCKET_NAME,
+            prefix=self.HISTORY_PREFIX,
+            dtypes=self.DTYPES,
+            format=self.HISTORY_FORMAT,
+        )
+
     def __load(self):
-        """Load previous tweet data file from Google Cloud"""
+        """Load the single-file tweet history used before the history
+        store, for migrating it
+        """
         try:
             response = self.s3_client.get_object(
-                Bucket=self.AWS_BUCKET_NAME, Key="tweets.csv"
+                Bucket=self.AWS_BUCKET_NAME, Key=self.OBJ_FILENAME
             )
         except self.s3_client.exceptions.NoSuchKey as e:
             logging.error(
                 "No Such Key: S3 bucket "
-                f"{self.AWS_BUCKET}/{self.OBJ_FILENAME}"
+                f"{self.AWS_BUCKET_NAME}/{self.OBJ_FILENAME}"
             )
             raise e
         except self.s3_client.exceptions.InvalidObjectState as e:
             logging.error(
                 "Invalid Object State: S3 bucket "
-                f"{self.AWS_BUCKET}/{self.OBJ_FILENAME}"
+                f"{self.AWS_BUCKET_NAME}/{self.OBJ_FILENAME}"
             )
             raise e
 
@@ -113,13 +325,13 @@ class Representabot:
         elif status == 403:
             logging.error(
                 "Access Denied: S3 bucket "
-                f"{self.AWS_BUCKET}/{self.OBJ_FILENAME}"
+                f"{self.AWS_BUCKET_NAME}/{self.OBJ_FILENAME}"
             )
             raise PermissionError("Access Denied")
         elif status == 404:
             logging.error(
                 "No Such Key: S3 bucket "
-                f"{self.AWS_BUCKET}/{self.OBJ_FILENAME}"
+                f"{self.AWS_BUCKET_NAME}/{self.OBJ_FILENAME}"
             )
             raise self.s3_client.exceptions.NoSuchKey("No Such Key")
         else:
@@ -127,96 +339,942 @@ class Representabot:
             raise RuntimeError("Unable to open resource")
         return tweets
 
-    def __save(self, df):
-        """Write tweet data back to Google Cloud"""
-        try:
-            with io.StringIO() as csv_buffer:
-                df.sort_values(
-                    by=["congress", "session", "vote"], inplace=True
-                )
-                df.to_csv(csv_buffer, index=False)
-                response = self.s3_client.put_object(
-                    Bucket=self.AWS_BUCKET_NAME,
-                    Key=self.OBJ_FILENAME,
-                    Body=csv_buffer.getvalue(),
-                )
+    def __index(self, tweets):
+        """Builds a set of (congress, session, date, vote) keys for every
+        vote already in the tweet history, so lookups take constant time
+        """
+        return set(
+            zip(
+                tweets["congress"],
+                tweets["session"],
+                tweets["date"],
+                tweets["vote"],
+            )
+        )
 
-                status = response.get("ResponseMetadata", {}).get(
-                    "HTTPStatusCode"
+    def __load_index(self, congress, session, chamber="senate"):
+        """Gets the tweeted votes index for a chamber, congress and
+        session. The index is kept across warm starts for as long as the
+        partition's segments are unchanged.
+        """
+        segments = tuple(self.store.segments(congress, session, chamber))
+
+        def load():
+            # Only the vote keys are needed to find new votes
+            with METRICS.span("history_load"):
+                tweets = self.store.read(
+                    congress,
+                    session,
+                    columns=HistoryStore.KEY,
+                    chamber=chamber,
                 )
+            return self.__index(tweets)
 
-                if status != 200:
-                    raise Exception(
-                        f"Unable to save file {self.AWS_BUCKET_NAME}/{self.OBJ_FILENAME}"
+        return RUNTIME.get(
+            ("index", chamber, congress, session), load, validator=segments
+        )
+
+    def __refresh_index(self, chamber, congress, session, names):
+        """Keeps a cached index valid after appending segments `names` to
+        its partition, unless another writer has appended as well
+        """
+        key = ("index", chamber, congress, session)
+        validator = RUNTIME.validator(key)
+        if validator is None:
+            return
+        expected = tuple(sorted(validator + tuple(names)))
+        segments = self.store.segments(congress, session, chamber)
+        if tuple(segments) == expected:
+            index = RUNTIME.get(key, set, validator=validator)
+            RUNTIME.put(key, index, validator=expected)
+
+    def __save(self, rows):
+        """Append new or updated rows to the tweet history, compacting
+        partitions that have collected too many segments. Returns whether
+        the rows were saved.
+        """
+        try:
+            with METRICS.span("history_save"):
+                names = self.store.append(rows)
+            self.__update_analytics(rows)
+            chambers = rows["chamber"].fillna("senate")
+            for chamber, congress, session in set(
+                zip(chambers, rows["congress"], rows["session"])
+            ):
+                with METRICS.span("history_compact"):
+                    compacted = self.store.compact(
+                        congress,
+                        session,
+                        min_segments=self.COMPACT_SEGMENTS,
+                        chamber=chamber,
+                    )
+                if not compacted:
+                    partition = self.store.partition(
+                        congress, session, chamber
+                    )
+                    self.__refresh_index(
+                        chamber,
+                        congress,
+                        session,
+                        [n for n in names if n.startswith(partition)],
                     )
-                return status
         except Exception as e:
             logging.error("Cloud Storage not configured for writing data… ")
             logging.error(e)
-            # NOTE: Use this to fall back to local storage
-            # df.to_csv(self.OBJ_FILENAME, index=False)
+            return False
+        return True
+
+    def __update_analytics(self, rows):
+        """Counts saved rows' new votes in the vote aggregates"""
+        if self.analytics is None:
+            return
+        try:
+            with METRICS.span("analytics_update"):
+                self.analytics.update(rows)
+        except Exception as e:
+            logging.error("Unable to update the vote aggregates")
+            logging.error(e)
+
+    def __mark_name(self, chamber_obj):
+        partition = self.store.partition(
+            chamber_obj.congress_num, chamber_obj.session_num, chamber_obj.name
+        )
+        return f"{partition}mark.json"
+
+    def __load_mark(self, chamber_obj):
+        """Gets the newest vote of a chamber listed vote by vote below
+        which every vote is in the history or was skipped, 0 if none
+        """
+        if not chamber_obj.LIST_INCREMENTALLY:
+            return 0
+        try:
+            body = self.store.get(self.__mark_name(chamber_obj))
+        except Exception as e:
+            logging.error(f"Unable to read the {chamber_obj.name} mark")
+            logging.error(e)
+            return 0
+        return json.loads(body)["mark"] if body else 0
+
+    def __save_mark(self, chamber_obj, mark, saved, skipped):
+        """Moves a chamber's mark up past the votes `saved` in the history
+        or queue and the votes `skipped` as not to be tweeted, so they
+        aren't listed again. Votes computed by this run are only counted
+        by the next, once they're saved.
+        """
+        new_mark = first_vote(chamber_obj, saved | skipped, mark) - 1
+        if new_mark <= mark:
+            return
+        try:
+            self.store.put(
+                self.__mark_name(chamber_obj),
+                json.dumps({"mark": new_mark}).encode("utf-8"),
+            )
+        except Exception as e:
+            logging.error(f"Unable to save the {chamber_obj.name} mark")
+            logging.error(e)
+
+    def __process_chamber(self, chamber_obj):
+        """Lists and computes a chamber's new votes"""
+        tweeted = self.tweeted[chamber_obj.name]
+        mark = self.__load_mark(chamber_obj)
+        saved = set(tweeted)
+        # Revalidated against senate.gov when the XML cache is enabled
+        votes = chamber_obj.get_vote_list(
+            first_vote(chamber_obj, tweeted, mark)
+        )
+        failed = []
+        rows, messages = process_votes(chamber_obj, votes, tweeted, failed)
+        if chamber_obj.LIST_INCREMENTALLY:
+            congress = chamber_obj.congress_num
+            session = chamber_obj.session_num
+            skipped = {
+                vote_key(item, congress, session) for item in votes
+            } - set(tweeted)
+            skipped -= {vote_key(item, congress, session) for item in failed}
+            self.__save_mark(chamber_obj, mark, saved, skipped)
+        if chamber_obj.cache is not None:
+            chamber_obj.cache.log_stats()
+        return rows, messages
+
+    def __poll_chamber(self, chamber_obj):
+        """Gets and computes a chamber's votes above its high-water mark,
+        which then moves up to the newest vote polled. If any vote fails,
+        the mark stays below it, so it is polled again.
+        """
+        tweeted = self.tweeted[chamber_obj.name]
+        state = self.watermarks.setdefault(
+            chamber_obj.name,
+            {
+                "mark": first_vote(
+                    chamber_obj, tweeted, self.__load_mark(chamber_obj)
+                )
+                - 1,
+                "validators": None,
+            },
+        )
+        votes, validators = chamber_obj.poll_votes(
+            state["mark"], state["validators"]
+        )
+        failed = []
+        rows, messages = process_votes(chamber_obj, votes, tweeted, failed)
+        if failed:
+            # Keep the old validators, so the vote list isn't a 304
+            state["mark"] = min(int(v["vote_number"]) for v in failed) - 1
+        else:
+            state["validators"] = validators
+            state["mark"] = max(
+                [state["mark"]] + [int(v["vote_number"]) for v in votes]
+            )
+        return rows, messages
+
+    def __queue_chambers(self, process):
+        """Runs `process` on every chamber concurrently, and queues and
+        stores the new votes it returns. Returns the number queued.
+        """
+        self.resume()
+        with ThreadPoolExecutor(max_workers=len(self.chambers)) as executor:
+            results = list(executor.map(process, self.chambers))
+        rows = [row for chamber_rows, _ in results for row in chamber_rows]
+        messages = [
+            message
+            for _, chamber_messages in results
+            for message in chamber_messages
+        ]
+
+        logging.info(f"Queued {len(messages)} new votes")
+        self.__enqueue(rows, messages)
+        return len(messages)
+
+    def __enqueue(self, rows, messages):
+        """Queue messages for posting and add their rows to the history,
+        journaling them until the rows are saved
+        """
+        if not messages:
+            return
+        try:
+            with METRICS.span("queue_write"):
+                self.journal.computed(messages)
+                self.queue.put(messages)
+                self.fanout.put(messages)
+        except Exception as e:
+            logging.error("Cloud Storage not configured for writing queue… ")
+            logging.error(e)
+            return
+        if self.__save(VoteRecord.frame(rows)):
+            self.__persisted(messages)
+
+    def __persisted(self, messages):
+        """Takes votes whose history rows were saved off the journal"""
+        try:
+            self.journal.persisted(messages)
+        except Exception as e:
+            # Saved again by the next run, which is harmless
+            logging.error("Unable to update the run journal")
+            logging.error(e)
+
+    def resume(self):
+        """Finishes the work earlier runs left in the run journal. Votes
+        computed but not saved to the history are queued and saved, and
+        votes tweeted but not saved with their tweet ids are saved and
+        taken off the queue, so they're neither fetched nor tweeted again.
+        Done once per bot. Returns the number of votes resumed.
+        """
+        if self.__resumed:
+            return 0
+        self.__resumed = True
+        try:
+            entries = self.journal.entries()
+        except Exception as e:
+            logging.error("Unable to read the run journal")
+            logging.error(e)
+            return 0
+        if not entries:
+            return 0
+
+        computed = [
+            e["message"]
+            for e in entries
+            if e["state"] == posting.RunJournal.COMPUTED
+        ]
+        posted = [
+            (e["message"], e["tweet_id"])
+            for e in entries
+            if e["state"] == posting.RunJournal.POSTED
+        ]
+        messages = computed + [message for message, _ in posted]
+        # Keep this run from computing them again if they can't be saved
+        for message in messages:
+            chamber = message.get("chamber") or "senate"
+            if chamber in self.CHAMBERS and (
+                message["congress"],
+                message["session"],
+            ) == (self.congress, self.session):
+                self.tweeted[chamber].add(message_key(message))
+        try:
+            queued = set(self.queue.list()) | set(self.queue.failed())
+            self.queue.put(
+                [
+                    message
+                    for message in computed
+                    if self.queue.name(message) not in queued
+                    and self.queue.name(message, self.queue.failed_prefix)
+                    not in queued
+                ]
+            )
+            for message, _ in posted:
+                self.queue.ack(self.queue.name(message))
+        except Exception as e:
+            logging.error("Cloud Storage not configured for writing queue… ")
+            logging.error(e)
+        rows = [VoteRecord(**message["row"]) for message in computed] + [
+            VoteRecord(**{**message["row"], "tweet_id": tweet_id})
+            for message, tweet_id in posted
+        ]
+        if self.__save(VoteRecord.frame(rows)):
+            self.__persisted(messages)
+        logging.info(f"Resumed {len(entries)} votes from the run journal")
+        METRICS.count("votes_resumed", len(entries))
+        return len(entries)
 
     def run(self):
         """Read a list of previous tweets from Cloud Storage
-        and Senate roll call vote data. Tweets out any untweeted
-        votes based on the functions contained in data.py.
-        """
-        new_tweets = pd.DataFrame(
-            columns=["tweet_id", "congress", "session", "date", "vote"],
-            dtype=str,
-        )
-        for item in self.senate_data["vote_summary"]["votes"]["vote"]:
-            query = (
-                "congress == @self.congress "
-                "and session == @self.session "
-                "and date == @item['vote_date'] "
-                "and vote == @item['vote_number']"
-            )
-
-            # If the current vote isn't already processed, then process it
-            if self.tweets.query(query).empty:
-                try:
-                    text, party_data, vote_data = self.senate_obj.process_vote(
-                        item
+        and roll call vote data for each chamber, concurrently. Queues any
+        untweeted votes based on the functions contained in data.py, then
+        tweets up to MAX_TWEETS queued votes.
+        """
+        self.__queue_chambers(self.__process_chamber)
+        # Function needs to return something to work as a Cloud Function
+        return self.post_queued()
+
+    def poll(self):
+        """Queues the votes taken in each chamber since the last poll and
+        tweets up to MAX_TWEETS queued votes. The first poll checks every
+        vote in the vote lists against the history, like `run`; later
+        polls only read the votes above each chamber's high-water mark,
+        and an unchanged Senate vote menu costs a 304.
+        """
+        self.__queue_chambers(self.__poll_chamber)
+        return self.post_queued()
+
+    def watch(self, stop, interval=None):
+        """Polls for new votes every `interval` seconds (POLL_INTERVAL by
+        default) until the `stop` event is set. A poll in progress is
+        finished before stopping. Returns the number of polls.
+        """
+        interval = self.POLL_INTERVAL if interval is None else interval
+        polls = 0
+        logging.info(f"Watching for new votes every {interval}s")
+        while not stop.is_set():
+            METRICS.reset()
+            try:
+                self.poll()
+            except Exception as e:
+                logging.error("Poll failed")
+                logging.error(e)
+            polls += 1
+            counters = METRICS.summary()["counters"]
+            if counters.get("votes_processed") or counters.get(
+                "tweets_posted"
+            ):
+                METRICS.log(self.METRICS_FILE)
+            stop.wait(interval)
+        logging.info(f"Stopped watching after {polls} polls")
+        return polls
+
+    def __get_warehouse(self):
+        if not self.WAREHOUSE_DIR:
+            raise ValueError("WAREHOUSE_DIR is not set")
+        return RUNTIME.get(
+            "warehouse",
+            lambda: warehouse.VoteWarehouse(
+                self.WAREHOUSE_DIR,
+                format=self.WAREHOUSE_FORMAT,
+                checkpoint=self.WAREHOUSE_CHECKPOINT,
+            ),
+        )
+
+    def ingest(self, congresses, sessions):
+        """Copies every roll call vote of each of the chambers, congresses
+        and sessions into the warehouse, member by member, resuming where
+        an earlier ingest stopped
+        """
+        vote_warehouse = self.__get_warehouse()
+        ingested = 0
+        for chamber, congress, session in itertools.product(
+            self.CHAMBERS, congresses, sessions
+        ):
+            chamber_obj = create_chamber(chamber, congress, session)
+            try:
+                count = vote_warehouse.ingest(chamber_obj)
+            except Exception as e:
+                logging.error(
+                    f"Unable to ingest {chamber} votes for {congress}-{session}"
+                )
+                logging.error(e)
+                continue
+            logging.info(
+                f"Ingested {count} {chamber} votes for {congress}-{session}"
+            )
+            ingested += count
+        return json.dumps(ingested)
+
+    def __recompute_partition(self, chamber_obj):
+        """Recomputes the rows of a chamber's congress and session that
+        have no row for the current methodology version, from the
+        warehouse. Returns the new rows.
+        """
+        chamber = chamber_obj.name
+        congress = chamber_obj.congress_num
+        session = chamber_obj.session_num
+        tweets = self.store.read(congress, session, chamber=chamber)
+        if "methodology" not in tweets:
+            tweets["methodology"] = None
+        current = tweets["vote"][
+            tweets["methodology"] == chamber_obj.methodology
+        ]
+        stale = tweets[~tweets["vote"].isin(current)].drop_duplicates(
+            subset="vote", keep="last"
+        )
+        if stale.empty:
+            return []
+        stored = chamber_obj.warehouse.details(chamber, congress, session)
+        missing = ~stale["vote"].isin(stored)
+        if missing.any():
+            logging.warning(
+                f"{missing.sum()} {chamber} votes for {congress}-{session} "
+                "aren't in the warehouse and weren't recomputed, --ingest "
+                "them first"
+            )
+        stale = stale[~missing].astype(object).where(stale.notna(), None)
+        kept = ["tweet_id", "date", "vote", "question", "result"]
+        records = [
+            {column: row[column] for column in kept}
+            for row in stale.to_dict("records")
+        ]
+        rows = []
+        for start in range(0, len(records), self.RECOMPUTE_BATCH):
+            batch = records[start : start + self.RECOMPUTE_BATCH]
+            results = chamber_obj.process_batch(
+                [stored[record["vote"]] for record in batch]
+            )
+            for record, result in zip(batch, results):
+                if isinstance(result, Exception):
+                    logging.error(f"Unable to recompute {chamber} vote")
+                    logging.error(record)
+                    logging.error(result)
+                    continue
+                _, party_data, vote_data = result
+                rows.append(
+                    VoteRecord(
+                        **record,
+                        chamber=chamber,
+                        congress=congress,
+                        session=session,
+                        methodology=chamber_obj.methodology,
+                        **party_data,
+                        **vote_data,
                     )
-                    status = self.twitter_api.update_status(text)
-                    # Keep track of new tweets to be reconciled with old
-                    # tweets later
-                    new_tweets = new_tweets.append(
-                        {
-                            "tweet_id": status.id_str,
-                            "congress": self.congress,
-                            "session": self.session,
-                            "date": item["vote_date"],
-                            "vote": item["vote_number"],
-                            **party_data,
-                            **vote_data,
-                        },
-                        ignore_index=True,
+                )
+        return rows
+
+    def recompute(self, congresses, sessions):
+        """Recomputes the representation of history rows computed under
+        an older methodology version, for each of the chambers, congresses
+        and sessions, from the warehouse. The new rows are stored next to
+        the old ones with the current version, and the vote aggregates of
+        the partitions are recounted.
+        """
+        vote_warehouse = self.__get_warehouse()
+        rows = []
+        partitions = []
+        for chamber, congress, session in itertools.product(
+            self.CHAMBERS, congresses, sessions
+        ):
+            chamber_obj = create_chamber(chamber, congress, session)
+            chamber_obj.warehouse = vote_warehouse
+            with METRICS.span("recompute"):
+                partition_rows = self.__recompute_partition(chamber_obj)
+            if partition_rows:
+                rows.extend(partition_rows)
+                partitions.append((chamber, congress, session))
+            logging.info(
+                f"Recomputed {len(partition_rows)} {chamber} votes for "
+                f"{congress}-{session} as {chamber_obj.methodology}"
+            )
+        if rows:
+            self.__save(VoteRecord.frame(rows))
+            if self.analytics is not None:
+                self.analytics.rebuild(partitions)
+        return json.dumps(len(rows))
+
+    def __backfill_chambers(self, shards, offline):
+        """Creates the chambers of the shards. Shards of a chamber with the
+        same population and seats share one RepresentationEngine, and so
+        one population vector and member table. If `offline`, chambers
+        read votes from the warehouse, and the member tables are filled
+        with the warehouse's members up front.
+        """
+        chambers = [create_chamber(*shard) for shard in shards]
+        engines = {}
+        for chamber_obj in chambers:
+            seats = chamber_obj.get_seats()
+            key = (
+                chamber_obj.name,
+                chamber_obj.methodology,
+                tuple(sorted(seats.items())) if seats else None,
+            )
+            if key in engines:
+                chamber_obj.engine = engines[key]
+            else:
+                engines[key] = chamber_obj.engine
+        if offline:
+            vote_warehouse = self.__get_warehouse()
+            for chamber_obj in chambers:
+                chamber_obj.warehouse = vote_warehouse
+                members = vote_warehouse.members.read(
+                    chamber_obj.congress_num,
+                    chamber_obj.session_num,
+                    columns=["lis_member_id", "party", "state"],
+                    chamber=chamber_obj.name,
+                )
+                members = members.drop_duplicates("lis_member_id", keep="last")
+                if not members.empty:
+                    chamber_obj.engine.members.lookup(
+                        members.to_dict("records")
                     )
-                except Exception as e:
-                    # Tweet failed for some reason
-                    logging.error("Tweet failed")
-                    logging.error(item)
-                    logging.error(e)
-
-            # Only process a limited number of tweets in a single run
-            if len(new_tweets) == self.MAX_TWEETS:
-                break
-
-        if not new_tweets.empty:
-            logging.info(f"Tweeted {len(new_tweets)} new votes")
-            self.__save(self.tweets.append(new_tweets))
-            # Function needs to return something to work as a Cloud Function
-            return new_tweets["tweet_id"].to_json()
+        return chambers
+
+    def __backfill_serial(self, chambers, indexes, marks):
+        """Backfills shards in this process, fetching each vote list ahead
+        while the previous shard's votes are being processed
+        """
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            for chamber_obj, tweeted, votes in zip(
+                chambers,
+                indexes,
+                executor.map(list_backfill_votes, chambers, indexes, marks),
+            ):
+                yield process_votes(chamber_obj, votes, tweeted)
+
+    def __backfill_workers(self, chambers, indexes, marks, workers):
+        """Backfills shards in a pool of forked worker processes, which
+        inherit the chambers built here with their population tables and
+        member tables instead of building their own. Results come back in
+        the order of the shards, whichever worker finishes first.
+        """
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context("fork"),
+            # Not pickled, as the workers are forked
+            initializer=init_backfill_worker,
+            initargs=(chambers,),
+        ) as executor:
+            results = executor.map(
+                backfill_shard, range(len(chambers)), indexes, marks
+            )
+            for tweeted, (rows, messages, snapshot) in zip(indexes, results):
+                METRICS.merge(snapshot)
+                tweeted.update(message_key(m) for m in messages)
+                yield rows, messages
+
+    def backfill(self, congresses, sessions, offline=False, workers=None):
+        """Computes every vote not yet in the history for each of the
+        chambers, congresses and sessions, and stores them in the history
+        and the posting queue without tweeting. If `offline`, votes are
+        read from the warehouse instead.
+
+        Each (chamber, congress, session) is a shard. With more than one
+        of `workers` (BACKFILL_WORKERS by default), shards are computed in
+        worker processes. Either way, their rows are stored in the order
+        of the shards, so the history is the same.
+        """
+        workers = workers or self.BACKFILL_WORKERS
+        shards = list(itertools.product(self.CHAMBERS, congresses, sessions))
+        indexes = [
+            self.__load_index(congress, session, chamber)
+            for chamber, congress, session in shards
+        ]
+        chambers = self.__backfill_chambers(shards, offline)
+        marks = [self.__load_mark(chamber_obj) for chamber_obj in chambers]
+        if (
+            workers > 1
+            and "fork" not in multiprocessing.get_all_start_methods()
+        ):
+            logging.warning("Worker processes need fork, backfilling serially")
+            workers = 1
+        if workers > 1 and os.environ.get("AWS_LAMBDA_FUNCTION_NAME"):
+            logging.warning(
+                "Lambda can't run worker processes, backfilling serially"
+            )
+            workers = 1
+        if workers > 1:
+            results = self.__backfill_workers(
+                chambers, indexes, marks, workers
+            )
         else:
+            results = self.__backfill_serial(chambers, indexes, marks)
+
+        new_rows = []
+        queue = []
+        for rows, messages in results:
+            new_rows.extend(rows)
+            queue.extend(messages)
+
+        logging.info(f"Backfilled {len(new_rows)} votes")
+        self.__enqueue(new_rows, queue)
+        return json.dumps(len(new_rows))
+
+    def post_queued(self):
+        """Delivers queued vote summaries to the other sinks, then tweets
+        up to MAX_TWEETS queued votes, oldest first, at the rate allowed
+        by POST_INTERVAL and the Twitter rate-limit headers, and records
+        their tweet ids in the history
+        """
+        self.resume()
+        self.deliver_sinks()
+        # Nothing new was queued and nothing is left from earlier runs, so
+        # there's no need for the Twitter client
+        if not self.queue.list():
+            logging.info("Nothing to tweet")
             return "{}"  # Empty JSON object
+        poster = posting.Poster(
+            self.queue,
+            self.publisher,
+            self.bucket,
+            retries=self.POST_RETRIES,
+            backoff=self.POST_BACKOFF,
+            max_wait=self.POST_MAX_WAIT,
+            max_attempts=self.POST_MAX_ATTEMPTS,
+            journal=self.journal,
+        )
+        with METRICS.span("post"):
+            posted = poster.drain(self.MAX_TWEETS)
+        if not posted:
+            return "{}"  # Empty JSON object
+
+        logging.info(f"Tweeted {len(posted)} queued votes")
+        METRICS.count("tweets_posted", len(posted))
+        # Append the posted rows again with their tweet ids
+        rows = VoteRecord.frame(
+            [
+                VoteRecord(**{**message["row"], "tweet_id": tweet_id})
+                for message, tweet_id in posted
+            ]
+        )
+        if self.__save(rows):
+            self.__persisted([message for message, _ in posted])
+        return pd.Series(
+            [tweet_id for _, tweet_id in posted], dtype=str
+        ).to_json()
+
+    def deliver_sinks(self):
+        """Publishes the queued vote summaries to the sinks other than
+        Twitter, without waiting for the tweets
+        """
+        if not self.fanout.sinks:
+            return
+        with METRICS.span("sinks"):
+            delivered = self.fanout.deliver()
+        logging.info(f"Delivered to sinks: {json.dumps(delivered)}")
+        self.fanout.log_stats()
+
+    def compact(self, congresses, sessions):
+        """Merges the history segments of each chamber, congress and
+        session
+        """
+        for chamber, congress, session in itertools.product(
+            self.CHAMBERS, congresses, sessions
+        ):
+            if self.store.compact(congress, session, chamber=chamber):
+                logging.info(
+                    f"Compacted {chamber} history for {congress}-{session}"
+                )
+
+    def __get_analytics(self):
+        if self.analytics is None:
+            raise ValueError("Vote aggregates are disabled by ANALYTICS_NAME")
+        return self.analytics
+
+    def aggregate(self, congresses, sessions):
+        """Recounts the vote aggregates of each chamber, congress and
+        session from the full history, e.g. for history saved before the
+        aggregates were kept
+        """
+        counted = self.__get_analytics().rebuild(
+            itertools.product(self.CHAMBERS, congresses, sessions)
+        )
+        logging.info(f"Counted {counted} votes in the vote aggregates")
+        return counted
+
+    def report(self, congresses, sessions, by=("congress",)):
+        """Summarizes the votes of the chambers, congresses and sessions
+        from the vote aggregates, grouped by `by`, e.g. ["congress",
+        "party"]. See analytics.Aggregates.report.
+        """
+        return self.__get_analytics().report(
+            by, chamber=self.CHAMBERS, congress=congresses, session=sessions
+        )
+
+    def migrate(self):
+        """Imports the single-file tweet history (OBJ_FILENAME) used before
+        the history store. Reads it from HISTORY_DIR if set, or S3.
+        """
+        if self.HISTORY_DIR:
+            tweets = pd.read_csv(
+                os.path.join(self.HISTORY_DIR, self.OBJ_FILENAME),
+                dtype=self.DTYPES,
+            )
+        else:
+            tweets = self.__load()
+        self.store.append(tweets)
+        logging.info(f"Imported {len(tweets)} tweets from {self.OBJ_FILENAME}")
+
+
+class VoteRecord:
+    """One row of the tweet history, with a slot for each column in
+    `Representabot.DTYPES`. Rows are gathered as records and turned into
+    a DataFrame once with `frame`, rather than appended to one by one.
+    """
+
+    __slots__ = tuple(Representabot.DTYPES)
+
+    def __init__(self, **fields):
+        for column in self.__slots__:
+            setattr(self, column, fields.pop(column, None))
+        if fields:
+            raise TypeError(f"Unknown history columns: {list(fields)}")
+
+    def to_dict(self):
+        return {column: getattr(self, column) for column in self.__slots__}
+
+    @classmethod
+    def frame(cls, records):
+        """Builds a history DataFrame from records, column by column"""
+        columns = {
+            column: [getattr(record, column) for record in records]
+            for column in cls.__slots__
+        }
+        tweets = pd.DataFrame(columns)
+        return tweets.astype(
+            {
+                column: dtype
+                for column, dtype in Representabot.DTYPES.items()
+                if dtype is not str
+            }
+        )
+
+
+def create_chamber(chamber, congress, session):
+    """Creates the SenateData or HouseData for a chamber"""
+    chambers = {"senate": cd.SenateData, "house": cd.HouseData}
+    if chamber not in chambers:
+        raise ValueError(f"Unknown chamber {chamber}")
+    return chambers[chamber](congress, session)
+
+
+def check_congresses(chambers, congresses):
+    """Raises ValueError if the House is one of the chambers and one of
+    the congresses predates its bundled apportionments
+    """
+    if "house" in chambers:
+        for congress in congresses:
+            cd.HouseData.check_congress(congress)
+
+
+def vote_key(item, congress, session):
+    """Key of a vote_menu item in the tweeted votes index"""
+    return (congress, session, item["vote_date"], item["vote_number"])
+
+
+def message_key(message):
+    """Key of a queue message's vote in the tweeted votes index"""
+    return vote_key(
+        {"vote_date": message["date"], "vote_number": message["vote"]},
+        message["congress"],
+        message["session"],
+    )
+
+
+def first_vote(chamber_obj, tweeted, mark=0):
+    """Number of the first vote to list in a chamber. Chambers listed
+    vote by vote are listed from the first vote above `mark` that isn't
+    in `tweeted`, so votes that failed are listed again.
+    """
+    if not chamber_obj.LIST_INCREMENTALLY:
+        return 1
+    numbers = {int(key[3]) for key in tweeted}
+    vote = mark + 1
+    while vote in numbers:
+        vote += 1
+    return vote
+
+
+def process_votes(chamber_obj, votes, tweeted, failed=None):
+    """Computes the tweet text and history row of every vote in a
+    chamber's vote list that isn't in `tweeted`, a batch of fetched
+    votes at a time. Returns the new history rows and queue messages,
+    and adds the votes that failed to `failed` if given.
+    """
+    chamber = chamber_obj.name
+    congress = chamber_obj.congress_num
+    session = chamber_obj.session_num
+    # Only fetch details for votes that haven't been processed yet,
+    # once each
+    pending = {}
+    for item in votes:
+        key = vote_key(item, congress, session)
+        if key not in tweeted:
+            pending.setdefault(key, item)
+    rows = []
+    messages = []
+    for batch in chamber_obj.iter_vote_batches(pending.values()):
+        results = chamber_obj.process_batch(batch)
+        for (item, _), result in zip(batch, results):
+            if isinstance(result, cd.DoNotTweetException):
+                METRICS.count("votes_skipped")
+                continue
+            elif isinstance(result, Exception):
+                METRICS.count("votes_failed")
+                logging.error("Vote failed")
+                logging.error(item)
+                logging.error(result)
+                if failed is not None:
+                    failed.append(item)
+                continue
+            text, party_data, vote_data = result
+            row = VoteRecord(
+                chamber=chamber,
+                congress=congress,
+                session=session,
+                date=item["vote_date"],
+                vote=item["vote_number"],
+                question=chamber_obj.question_type(item),
+                result=item.get("result"),
+                methodology=chamber_obj.methodology,
+                **party_data,
+                **vote_data,
+            )
+            rows.append(row)
+            METRICS.count("votes_processed")
+            messages.append(
+                {
+                    "chamber": chamber,
+                    "congress": congress,
+                    "session": session,
+                    "date": item["vote_date"],
+                    "vote": item["vote_number"],
+                    "text": text,
+                    "row": row.to_dict(),
+                }
+            )
+            tweeted.add(vote_key(item, congress, session))
+    return rows, messages
+
+
+def list_backfill_votes(chamber_obj, tweeted, mark=0):
+    """Gets a chamber's vote list to backfill, from the warehouse if the
+    chamber has one. Returns an empty list if it can't be fetched.
+    """
+    start = first_vote(chamber_obj, tweeted, mark)
+    try:
+        if chamber_obj.warehouse is not None:
+            return chamber_obj.warehouse.vote_list(
+                chamber_obj.name,
+                chamber_obj.congress_num,
+                chamber_obj.session_num,
+                start,
+            )
+        return chamber_obj.get_vote_list(start)
+    except Exception as e:
+        logging.error(
+            f"Unable to get {chamber_obj.name} votes for "
+            f"{chamber_obj.congress_num}-{chamber_obj.session_num}"
+        )
+        logging.error(e)
+        return []
+
+
+# Chambers of a backfill, inherited by its forked worker processes
+WORKER_CHAMBERS = []
+
+
+def init_backfill_worker(chambers):
+    """Starts a backfill worker process with the backfill's chambers"""
+    global WORKER_CHAMBERS
+    WORKER_CHAMBERS = chambers
+    METRICS.reset()
+
+
+def backfill_shard(index, tweeted, mark):
+    """Backfills the chamber at `index` of WORKER_CHAMBERS in a worker
+    process. Returns the shard's history rows, queue messages and metrics
+    snapshot.
+    """
+    METRICS.reset()
+    chamber_obj = WORKER_CHAMBERS[index]
+    votes = list_backfill_votes(chamber_obj, tweeted, mark)
+    rows, messages = process_votes(chamber_obj, votes, tweeted)
+    return rows, messages, METRICS.snapshot()
+
+
+def parse_range(value):
+    """Expands a range like "113-117" into ["113", ..., "117"]"""
+    start, _, end = str(value).partition("-")
+    return [str(n) for n in range(int(start), int(end or start) + 1)]
 
 
 def lambda_handler(event, context):
+    RUNTIME.invocations += 1
+    METRICS.reset()
+    start = time.perf_counter()
     try:
-        repbot = Representabot(event["congress"], event["session"])
-        result = repbot.run()
+        action = event.get("action", "run")
+        congresses = parse_range(event["congress"])
+        sessions = parse_range(event["session"])
+        try:
+            check_congresses(Representabot.CHAMBERS, congresses)
+        except ValueError as e:
+            return {"statusCode": 400, "body": f"ValueError: {e}"}
+        if int(event.get("workers") or 1) > 1:
+            # Lambda has no /dev/shm for the process pool's semaphores
+            return {
+                "statusCode": 400,
+                "body": "Backfill workers are only supported on the "
+                "command line",
+            }
+        repbot = Representabot(congresses[0], sessions[0])
+        init = time.perf_counter()
+        if action == "backfill":
+            result = repbot.backfill(
+                congresses,
+                sessions,
+                offline=event.get("offline", False),
+            )
+        elif action == "ingest":
+            result = repbot.ingest(congresses, sessions)
+        elif action == "recompute":
+            result = repbot.recompute(congresses, sessions)
+        elif action == "post":
+            result = repbot.post_queued()
+        elif action == "compact":
+            result = repbot.compact(congresses, sessions)
+        elif action == "aggregate":
+            result = repbot.aggregate(congresses, sessions)
+        elif action == "report":
+            by = event.get("by", "congress")
+            result = repbot.report(
+                congresses, sessions, by=by.split(",") if by else []
+            ).to_json(orient="records")
+        else:
+            result = repbot.run()
+        end = time.perf_counter()
+        timings = {
+            "start": "cold" if RUNTIME.invocations == 1 else "warm",
+            "init_ms": round((init - start) * 1000, 1),
+            "run_ms": round((end - init) * 1000, 1),
+        }
+        logging.info(f"Invocation timings: {json.dumps(timings)}")
+        METRICS.log(Representabot.METRICS_FILE)
         return {"statusCode": 200, "body": json.dumps(result)}
     except KeyError as e:
         return {
@@ -231,14 +1289,126 @@ if __name__ == "__main__":
         "--congress",
         type=str,
         required=True,
-        help="Congress to process, e.g. 117",
+        help="Congress to process, e.g. 117, or a range with --backfill",
     )
     parser.add_argument(
         "--session",
         type=str,
         required=True,
-        help="Session of the Senate to process, e.g. 1",
+        help="Session of the Senate to process, e.g. 1, or 1-2 with --backfill",
+    )
+    action = parser.add_mutually_exclusive_group()
+    action.add_argument(
+        "--backfill",
+        action="store_true",
+        help="Store and queue votes for a range of congresses and sessions, e.g. --congress 113-117 --session 1-2, without tweeting",
+    )
+    action.add_argument(
+        "--ingest",
+        action="store_true",
+        help="Copy every roll call vote of the congresses and sessions into the warehouse in WAREHOUSE_DIR, member by member",
+    )
+    action.add_argument(
+        "--recompute",
+        action="store_true",
+        help="Recompute history rows of the congresses and sessions computed under an older methodology, from the warehouse",
+    )
+    action.add_argument(
+        "--post",
+        action="store_true",
+        help="Tweet up to MAX_TWEETS queued votes without checking for new votes",
+    )
+    action.add_argument(
+        "--watch",
+        action="store_true",
+        help="Keep polling for new votes and tweeting them until interrupted",
+    )
+    action.add_argument(
+        "--compact",
+        action="store_true",
+        help="Merge the tweet history segments of the congresses and sessions",
+    )
+    action.add_argument(
+        "--aggregate",
+        action="store_true",
+        help="Recount the vote aggregates of the congresses and sessions from the tweet history",
+    )
+    action.add_argument(
+        "--report",
+        action="store_true",
+        help="Print a summary of the votes of the congresses and sessions from the vote aggregates",
+    )
+    action.add_argument(
+        "--migrate",
+        action="store_true",
+        help="Import the tweet history from OBJ_FILENAME into the history store",
+    )
+    parser.add_argument(
+        "--offline",
+        action="store_true",
+        help="With --backfill, read votes from the warehouse in WAREHOUSE_DIR instead of senate.gov",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        help="With --backfill, worker processes to backfill shards in, defaults to BACKFILL_WORKERS",
+    )
+    parser.add_argument(
+        "--poll-interval",
+        type=float,
+        help="Seconds between polls with --watch, defaults to POLL_INTERVAL",
+    )
+    parser.add_argument(
+        "--by",
+        default="congress",
+        help="Comma-separated dimensions to group --report by: chamber, congress, session, month, question or party",
+    )
+    parser.add_argument(
+        "--profile",
+        choices=["cpu", "memory"],
+        help="Profile the run with cProfile or tracemalloc and log the top entries",
+    )
+    parser.add_argument(
+        "--profile-output",
+        help="File for the profile, pstats data for cpu or text for memory",
     )
     args = parser.parse_args()
-    repbot = Representabot(args.congress, args.session)
-    repbot.run()
+    congresses = parse_range(args.congress)
+    sessions = parse_range(args.session)
+    try:
+        check_congresses(Representabot.CHAMBERS, congresses)
+    except ValueError as e:
+        parser.error(str(e))
+    with metrics.profile(args.profile, args.profile_output):
+        repbot = Representabot(congresses[0], sessions[0])
+        if args.backfill:
+            repbot.backfill(
+                congresses,
+                sessions,
+                offline=args.offline,
+                workers=args.workers,
+            )
+        elif args.ingest:
+            repbot.ingest(congresses, sessions)
+        elif args.recompute:
+            repbot.recompute(congresses, sessions)
+        elif args.post:
+            repbot.post_queued()
+        elif args.watch:
+            stop = threading.Event()
+            for signum in [signal.SIGINT, signal.SIGTERM]:
+                signal.signal(signum, lambda signum, frame: stop.set())
+            repbot.watch(stop, args.poll_interval)
+        elif args.compact:
+            repbot.compact(congresses, sessions)
+        elif args.aggregate:
+            repbot.aggregate(congresses, sessions)
+        elif args.report:
+            by = [d for d in args.by.split(",") if d]
+            report = repbot.report(congresses, sessions, by)
+            print(report.to_string(index=False))
+        elif args.migrate:
+            repbot.migrate()
+        else:
+            repbot.run()
+    METRICS.log(Representabot.METRICS_FILE)
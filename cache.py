@@ -0,0 +1,201 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+
+from metrics import METRICS, CountingReader
+
+
+class TeeReader:
+    """File-like wrapper writing the bytes read from a stream to `out`"""
+
+    def __init__(self, raw, out):
+        self.raw = raw
+        self.out = out
+
+    def read(self, size=-1):
+        data = self.raw.read(size)
+        self.out.write(data)
+        return data
+
+
+class XMLCache:
+    """On-disk cache of XML documents from senate.gov, keyed by URL.
+
+    Documents are kept until evicted. Documents fetched with
+    `revalidate=True` (e.g. the vote menu, which grows during a session) are
+    revalidated with a conditional GET using the stored ETag/Last-Modified
+    validators, so an unchanged document costs a 304 and no parse. When the
+    cache grows past `max_bytes`, the least recently used documents are
+    removed. The cache's size is counted once when it is opened and kept up
+    to date as documents are stored, so the directory is only scanned when
+    it has to be evicted.
+    """
+
+    def __init__(self, directory, max_bytes=100 * 1024 * 1024):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        # Parsed copies of revalidated documents, keyed by URL
+        self.parsed = {}
+        self.lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        # Bytes of cached documents, as stored by this process
+        self.total = self.size()
+
+    def __path(self, url, ext):
+        name = hashlib.sha1(url.encode("utf-8")).hexdigest()
+        return os.path.join(self.directory, f"{name}.{ext}")
+
+    def __read_meta(self, url):
+        try:
+            with open(self.__path(url, "json")) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def __tmp(self, path):
+        return f"{path}.{threading.get_ident()}.tmp"
+
+    def __write_meta(self, url, headers):
+        """Stores a document's validators, replacing atomically"""
+        meta = {
+            "url": url,
+            "etag": headers.get("ETag"),
+            "last_modified": headers.get("Last-Modified"),
+        }
+        path = self.__path(url, "json")
+        tmp = self.__tmp(path)
+        with open(tmp, "w") as f:
+            json.dump(meta, f)
+        os.replace(tmp, path)
+
+    def __parse_and_write(self, url, resp_data, parse):
+        """Parses a document as it streams in, writing it to the cache at
+        the same time. The document replaces the cached one only once it
+        has been read in full and parsed.
+        """
+        path = self.__path(url, "xml")
+        tmp = self.__tmp(path)
+        reader = CountingReader(resp_data.raw, METRICS, "http_bytes")
+        try:
+            with open(tmp, "wb") as f:
+                tee = TeeReader(reader, f)
+                doc = parse(tee)
+                # Keep any of the document the parser didn't need
+                while tee.read(64 * 1024):
+                    pass
+            with self.lock:
+                try:
+                    replaced = os.path.getsize(path)
+                except FileNotFoundError:
+                    replaced = 0
+                os.replace(tmp, path)
+                self.total += os.path.getsize(path) - replaced
+        except BaseException:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            raise
+        self.__write_meta(url, resp_data.headers)
+        return doc
+
+    def __count(self, hit):
+        with self.lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+        METRICS.count("cache_hits" if hit else "cache_misses")
+
+    def get(self, http, url, parse, revalidate=False):
+        """Returns the document at `url` parsed by `parse`, which takes a
+        file-like object. The document is fetched with the requests session
+        `http` only if it isn't cached or has changed.
+        """
+        path = self.__path(url, "xml")
+        meta = self.__read_meta(url) if os.path.exists(path) else None
+
+        if meta is not None and not revalidate:
+            self.__count(hit=True)
+            os.utime(path)
+            with open(path, "rb") as f:
+                return parse(f)
+
+        headers = {}
+        if meta is not None:
+            if meta.get("etag"):
+                headers["If-None-Match"] = meta["etag"]
+            if meta.get("last_modified"):
+                headers["If-Modified-Since"] = meta["last_modified"]
+        with http.get(url, headers=headers, stream=True) as resp_data:
+            METRICS.count("http_requests")
+            resp_data.raw.decode_content = True
+
+            if resp_data.status_code == 304 and meta is not None:
+                self.__count(hit=True)
+                os.utime(path)
+                if url not in self.parsed:
+                    with open(path, "rb") as f:
+                        self.parsed[url] = parse(f)
+                return self.parsed[url]
+
+            self.__count(hit=False)
+            resp_data.raise_for_status()
+            if resp_data.status_code != 200:
+                return parse(
+                    CountingReader(resp_data.raw, METRICS, "http_bytes")
+                )
+            doc = self.__parse_and_write(url, resp_data, parse)
+        if revalidate:
+            self.parsed[url] = doc
+        self.evict()
+        return doc
+
+    def size(self):
+        """Total size in bytes of the cached documents"""
+        return sum(
+            entry.stat().st_size
+            for entry in os.scandir(self.directory)
+            if entry.name.endswith(".xml")
+        )
+
+    def evict(self):
+        """Removes least recently used documents until under max_bytes"""
+        with self.lock:
+            if self.total <= self.max_bytes:
+                return
+            entries = sorted(
+                (
+                    entry
+                    for entry in os.scandir(self.directory)
+                    if entry.name.endswith(".xml")
+                ),
+                key=lambda entry: entry.stat().st_mtime,
+            )
+            total = sum(entry.stat().st_size for entry in entries)
+            for entry in entries:
+                if total <= self.max_bytes:
+                    break
+                total -= entry.stat().st_size
+                meta_path = entry.path[: -len(".xml")] + ".json"
+                for path in [entry.path, meta_path]:
+                    try:
+                        os.remove(path)
+                    except FileNotFoundError:
+                        pass
+                self.evictions += 1
+            self.total = total
+
+    def stats(self):
+        """Hit/miss counters for logging"""
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+    def log_stats(self):
+        logging.info(f"XML cache: {json.dumps(self.stats())}")
@@ -1,19 +1,32 @@
+import abc
+import functools
 import json
 import logging
 import os
 import requests
 
+from concurrent.futures import ThreadPoolExecutor
+from xml.etree import ElementTree
+
 import dotenv
+import numpy as np
 import pandas as pd
-import xmltodict
 
-from census import Census
-from us import states
+from requests.adapters import HTTPAdapter
+
+from cache import XMLCache
+from metrics import METRICS, CountingReader
+from population import (
+    ACS_YEAR,
+    CENSUS_POPULATION_CODE,
+    first_house_congress,
+    get_house_seats,
+    get_state_population,
+)
+from renderer import MONTH_NAMES, Renderer
 
 
 dotenv.load_dotenv()
-CENSUS_API_KEY = os.environ.get("CENSUS_API_KEY")
-CENSUS_POPULATION_CODE = "B01003_001E"
 
 
 def flatten(current: dict, key: str = None, result: dict = {}):
@@ -31,7 +44,432 @@ class DoNotTweetException(Exception):
     pass
 
 
-class SenateData:
+# Member fields used from roll_call_vote documents
+MEMBER_FIELDS = ("lis_member_id", "party", "state", "vote_cast")
+
+
+def element_to_dict(element):
+    """Converts an element to the dict layout xmltodict.parse uses: leaves
+    become stripped text (or None), mixed content keeps its text under
+    "#text", and repeated children become lists
+    """
+    text = (element.text or "").strip() or None
+    if len(element) == 0 and not element.attrib:
+        return text
+    result = {f"@{k}": v for k, v in element.attrib.items()}
+    for child in element:
+        value = element_to_dict(child)
+        if child.tag in result:
+            if not isinstance(result[child.tag], list):
+                result[child.tag] = [result[child.tag]]
+            result[child.tag].append(value)
+        else:
+            result[child.tag] = value
+    if text:
+        result["#text"] = text
+    return result
+
+
+def iter_xml_records(source, record_tag, fields=None, convert=None):
+    """Streams an XML document from a file-like object, yielding
+    (tag, value) pairs without building the whole tree. Each `record_tag`
+    element is yielded as a dict (limited to `fields` if given, or made by
+    `convert` from the element) as soon as it has been read, and each
+    other child of the root element is yielded in xmltodict's layout.
+    Elements are discarded once yielded.
+    """
+    depth = 0
+    root = None
+    in_records = False
+    for event, element in ElementTree.iterparse(source, ("start", "end")):
+        if event == "start":
+            depth += 1
+            if depth == 1:
+                root = element
+            continue
+        depth -= 1
+        if element.tag == record_tag:
+            if convert:
+                record = convert(element)
+            elif fields:
+                record = {f: element.findtext(f) for f in fields}
+            else:
+                record = element_to_dict(element)
+            in_records = True
+            element.clear()
+            yield record_tag, record
+        elif depth == 1:
+            # Containers of records are already yielded record by record
+            if not in_records:
+                yield element.tag, element_to_dict(element)
+            in_records = False
+            root.remove(element)
+
+
+def iter_vote_menu(source):
+    """Yields the votes of a vote_menu document, in the same layout as
+    xmltodict.parse(...)["vote_summary"]["votes"]["vote"]
+    """
+    for tag, value in iter_xml_records(source, "vote"):
+        if tag == "vote":
+            yield value
+
+
+def parse_vote_menu(source):
+    """Parses a vote_menu document into xmltodict's layout"""
+    summary = {}
+    votes = []
+    for tag, value in iter_xml_records(source, "vote"):
+        if tag == "vote":
+            votes.append(value)
+        else:
+            summary[tag] = value
+    summary["votes"] = {"vote": votes}
+    return {"vote_summary": summary}
+
+
+def parse_roll_call_vote(source):
+    """Parses a roll_call_vote document into xmltodict's layout, keeping
+    only the MEMBER_FIELDS of each member
+    """
+    vote = {}
+    members = []
+    for tag, value in iter_xml_records(source, "member", MEMBER_FIELDS):
+        if tag == "member":
+            members.append(value)
+        else:
+            vote[tag] = value
+    vote["members"] = {"member": members}
+    return {"roll_call_vote": vote}
+
+
+# clerk.house.gov vote casts in senate.gov's terms
+HOUSE_VOTE_CASTS = {"Aye": "Yea", "No": "Nay"}
+HOUSE_RESULTS = {"Failed": "Rejected"}
+# Measure prefixes in clerk.house.gov's legis-num, as senate.gov writes them
+HOUSE_MEASURES = {
+    "H R": "H.R.",
+    "H RES": "H.Res.",
+    "H J RES": "H.J.Res.",
+    "H CON RES": "H.Con.Res.",
+    "S": "S.",
+    "S RES": "S.Res.",
+    "S J RES": "S.J.Res.",
+    "S CON RES": "S.Con.Res.",
+}
+
+
+def house_member(element):
+    """Converts a clerk.house.gov recorded-vote element to a member in the
+    layout of parse_roll_call_vote
+    """
+    legislator = element.find("legislator")
+    vote_cast = element.findtext("vote")
+    return {
+        "lis_member_id": legislator.get("name-id"),
+        "party": legislator.get("party"),
+        "state": legislator.get("state"),
+        "vote_cast": HOUSE_VOTE_CASTS.get(vote_cast, vote_cast),
+    }
+
+
+def house_measure(legis_num):
+    """Writes a measure like "H RES 24" as senate.gov does, H.Res. 24"""
+    prefix, _, number = (legis_num or "").rpartition(" ")
+    if prefix in HOUSE_MEASURES and number.isdigit():
+        return f"{HOUSE_MEASURES[prefix]} {number}"
+    return legis_num or ""
+
+
+def parse_house_vote(source):
+    """Parses a clerk.house.gov rollcall-vote document into the layout of
+    parse_roll_call_vote. The Clerk has no XML vote menu, so the vote's
+    vote_menu entry is added under "vote".
+    """
+    metadata = {}
+    members = []
+    for tag, value in iter_xml_records(
+        source, "recorded-vote", convert=house_member
+    ):
+        if tag == "recorded-vote":
+            members.append(value)
+        elif tag == "vote-metadata":
+            metadata = value
+
+    day, month, year = metadata["action-date"].split("-")
+    month = MONTH_NAMES[month.lower()]
+    time = metadata.get("action-time")
+    if isinstance(time, dict):
+        time = time.get("#text")
+    vote_number = f"{int(metadata['rollcall-num']):05d}"
+    question = metadata.get("vote-question")
+    if metadata.get("amendment-num"):
+        question = {
+            "#text": question,
+            "measure": f"Amdt. {metadata['amendment-num']}",
+        }
+    result = metadata.get("vote-result") or ""
+    description = metadata.get("vote-desc") or ""
+    vote = {
+        "vote_number": vote_number,
+        "vote_date": f"{int(day):02d}-{month[:3]}",
+        "issue": house_measure(metadata.get("legis-num")),
+        "question": question,
+        "result": HOUSE_RESULTS.get(result, result),
+        "title": description,
+    }
+    return {
+        "roll_call_vote": {
+            "congress": metadata.get("congress"),
+            "vote_number": vote_number,
+            "vote_date": f"{month} {int(day)}, {year}"
+            + (f", {time}" if time else ""),
+            "vote_title": description,
+            "vote_document_text": description,
+            "members": {"member": members},
+        },
+        "vote": vote,
+    }
+
+
+class MemberTable:
+    """Dimension table of the members seen in votes, keyed by
+    lis_member_id (the Clerk's name-id in the House), with each member's
+    state and party codes and the population they represent. Members
+    hardly change within a Congress, so the table is only refreshed when a
+    vote has a member that isn't in it yet (or whose state or party
+    changed, e.g. after switching parties). Encoding a vote is then a
+    lookup per member.
+    """
+
+    def __init__(self, population, state_codes, party_codes):
+        # Population represented by a member of each state code
+        self.population = population
+        self.state_codes = state_codes
+        self.party_codes = party_codes
+        self.unknown_state = len(state_codes)
+        self.unknown_party = len(party_codes)
+        # lis_member_id -> (row, state, party)
+        self.ids = {}
+        self.members = []
+        self.states = np.empty(0, dtype=np.intp)
+        self.parties = np.empty(0, dtype=np.intp)
+        self.refreshes = 0
+        self.__frame = None
+
+    def __refresh(self, members):
+        for m in members:
+            entry = self.ids.get(m["lis_member_id"])
+            if entry is not None and entry[1:] == (m["state"], m["party"]):
+                continue
+            row = entry[0] if entry is not None else len(self.members)
+            member = {
+                "lis_member_id": m["lis_member_id"],
+                "party": m["party"],
+                "state": m["state"],
+            }
+            if entry is None:
+                self.members.append(member)
+            else:
+                self.members[row] = member
+            self.ids[m["lis_member_id"]] = (row, m["state"], m["party"])
+        self.states = np.fromiter(
+            (
+                self.state_codes.get(m["state"], self.unknown_state)
+                for m in self.members
+            ),
+            dtype=np.intp,
+            count=len(self.members),
+        )
+        self.parties = np.fromiter(
+            (
+                self.party_codes.get(m["party"], self.unknown_party)
+                for m in self.members
+            ),
+            dtype=np.intp,
+            count=len(self.members),
+        )
+        self.refreshes += 1
+        METRICS.count("member_table_refreshes")
+        self.__frame = None
+
+    def lookup(self, members):
+        """Returns the table rows of a vote's members"""
+        ids = self.ids
+        entries = [ids.get(m["lis_member_id"]) for m in members]
+        if any(
+            entry is None or entry[1:] != (m["state"], m["party"])
+            for entry, m in zip(entries, members)
+        ):
+            self.__refresh(members)
+            entries = [ids[m["lis_member_id"]] for m in members]
+        return np.fromiter(
+            (entry[0] for entry in entries),
+            dtype=np.intp,
+            count=len(entries),
+        )
+
+    def frame(self):
+        """The table as a DataFrame with the population each member
+        represents
+        """
+        if self.__frame is None:
+            members = pd.DataFrame(
+                self.members, columns=["lis_member_id", "party", "state"]
+            )
+            members[CENSUS_POPULATION_CODE] = self.population[self.states]
+            self.__frame = members
+        return self.__frame
+
+
+class RepresentationEngine:
+    """Computes the representation shares and party counts of votes with
+    NumPy. Each member is mapped to integer state, party and vote cast
+    codes, and populations are summed with bincount against a fixed
+    population vector, giving the same results as get_vote_rep and
+    get_party_rep without building DataFrames.
+
+    Without `seats`, each member represents their whole state, as
+    senators do, and everyone is represented twice. With `seats` (House
+    seats per state), each member represents an equal share of their
+    state's population, as districts are drawn to, and everyone is
+    represented once.
+    """
+
+    VOTE_CASTS = ["Yea", "Nay", "Abstain"]
+    PARTIES = ["D", "R"]
+
+    def __init__(self, state_pop_data, us_pop_data, seats=None):
+        self.state_codes = {
+            state: i for i, state in enumerate(state_pop_data["state"])
+        }
+        population = state_pop_data[CENSUS_POPULATION_CODE].to_numpy(
+            dtype=float
+        )
+        if seats is None:
+            self.total = int(us_pop_data) * 2
+        else:
+            # States without seats (DC, PR) have no voting members
+            population = population / np.array(
+                [seats.get(state, np.inf) for state in self.state_codes]
+            )
+            self.total = int(us_pop_data)
+        # Members from states missing from the table add no population
+        self.population = np.append(population, 0.0)
+        self.party_codes = {p: i for i, p in enumerate(self.PARTIES)}
+        self.vote_codes = {"Yea": 0, "Nay": 1}
+        self.members = MemberTable(
+            self.population, self.state_codes, self.party_codes
+        )
+
+    def encode(self, members):
+        """Maps a list of vote members to state, party and vote cast codes.
+        Parties other than D and R, and votes other than Yea and Nay, all
+        share the last code.
+        """
+        if isinstance(members, dict):
+            members = [members]
+        rows = self.members.lookup(members)
+        casts = np.fromiter(
+            (self.vote_codes.get(m["vote_cast"], 2) for m in members),
+            dtype=np.intp,
+            count=len(members),
+        )
+        return self.members.states[rows], self.members.parties[rows], casts
+
+    def compute_batch(self, vote_members):
+        """Takes a list of member lists, one per vote, and returns a list
+        of (party_rep, vote_rep) tuples in the format of get_party_rep and
+        get_vote_rep
+        """
+        n = len(vote_members)
+        if n == 0:
+            return []
+        encoded = [self.encode(members) for members in vote_members]
+        sizes = [len(states) for states, _, _ in encoded]
+        vote_idx = np.repeat(np.arange(n), sizes)
+        states, parties, casts = (
+            np.concatenate(codes) for codes in zip(*encoded)
+        )
+
+        cast_idx = vote_idx * 3 + casts
+        populations = np.bincount(
+            cast_idx, weights=self.population[states], minlength=n * 3
+        ).reshape(n, 3)
+        cast_counts = np.bincount(cast_idx, minlength=n * 3).reshape(n, 3)
+        party_counts = np.bincount(
+            cast_idx * 3 + parties, minlength=n * 9
+        ).reshape(n, 3, 3)
+
+        results = []
+        for i in range(n):
+            results.append(
+                (
+                    self.__party_rep(party_counts[i]),
+                    self.__vote_rep(populations[i], cast_counts[i]),
+                )
+            )
+        return results
+
+    def compute(self, members):
+        """Returns (party_rep, vote_rep) for a single vote's members"""
+        return self.compute_batch([members])[0]
+
+    def __party_rep(self, counts):
+        vote_dict = {}
+        for c, v in enumerate(["yea_vote", "nay_vote", "abstain_vote"]):
+            vote_dict[v] = {"total": int(counts[c].sum())}
+            for p, party in enumerate(self.PARTIES):
+                vote_dict[v][party] = int(counts[c, p])
+        return vote_dict
+
+    def __vote_rep(self, populations, counts):
+        # Same key order as get_vote_rep: cast votes sorted by name,
+        # followed by the ones nobody cast
+        cast = sorted(v for c, v in enumerate(self.VOTE_CASTS) if counts[c])
+        votes = {
+            v: float(populations[self.VOTE_CASTS.index(v)]) / self.total
+            for v in cast
+        }
+        for v in self.VOTE_CASTS:
+            if v not in votes:
+                votes[v] = 0.0
+        return votes
+
+
+class Chamber(abc.ABC):
+    """Roll call votes of one chamber of Congress in a congress and
+    session, and their tweet text.
+
+    Subclasses fetch the chamber's vote list and roll call votes in the
+    layout of senate.gov's vote_menu and roll_call_vote documents, so
+    fetching in batches, the representation statistic and the tweet text
+    are shared between chambers.
+    """
+
+    name = None
+    HEADERS = {"user-agent": "representabot"}
+    # Number of roll call votes fetched at once
+    MAX_WORKERS = 8
+    # Whether the vote list is fetched vote by vote, so runs should only
+    # list votes newer than the ones already in the history
+    LIST_INCREMENTALLY = False
+    # Local directory for caching senate.gov XML, disabled if not set
+    # except on Lambda, where /tmp survives between warm invocations
+    CACHE_DIR = os.environ.get(
+        "CACHE_DIR",
+        "/tmp/representabot"
+        if os.environ.get("AWS_LAMBDA_FUNCTION_NAME")
+        else None,
+    )
+    CACHE_MAX_BYTES = int(os.environ.get("CACHE_MAX_BYTES", 100 * 1024**2))
+    # Representation results are stored with the methodology version,
+    # made of METHODOLOGY, to be bumped when the calculation changes, the
+    # ACS vintage and the states left out of the country's population
+    METHODOLOGY = "1"
+    ACS_YEAR = ACS_YEAR
+    EXCLUDED = ["DC", "PR"]
+
     QUESTIONS = [
         "motion",
         "bill",
@@ -42,61 +480,156 @@ class SenateData:
     ]
 
     def __init__(self, congress_num, session_num):
-        c = Census(CENSUS_API_KEY)
-        state_pop_data = c.acs5.state(
-            ("NAME", CENSUS_POPULATION_CODE), Census.ALL
-        )
-        state_pop_data = pd.DataFrame.from_dict(state_pop_data)
-        # will need the state abbreviation for the senate.gov data
-        state_pop_data.loc[:, "state"] = state_pop_data["NAME"].map(
-            lambda x: states.lookup(x).abbr
+        self.congress_num = congress_num
+        self.session_num = session_num
+        self.renderer = Renderer(self.QUESTIONS)
+
+        self.http = self.__create_session()
+        # VoteWarehouse to get roll call votes from instead of the network
+        self.warehouse = None
+        self.cache = (
+            XMLCache(self.CACHE_DIR, self.CACHE_MAX_BYTES)
+            if self.CACHE_DIR
+            else None
         )
+
+    # The population table and representation engine are only loaded once
+    # a vote is processed, so runs without new votes skip them
+    @functools.cached_property
+    def state_pop_data(self):
+        # shared by every Chamber in the process, not to be modified
+        with METRICS.span("population"):
+            return get_state_population(self.ACS_YEAR)
+
+    @functools.cached_property
+    def us_pop_data(self):
         # if we want to change back to including DC later for reasons
         # self.us_pop_data = c.acs5.us(("NAME", CENSUS_POPULATION_CODE))[0][CENSUS_POPULATION_CODE]
-        self.state_pop_data = state_pop_data
-        self.us_pop_data = self.state_pop_data.loc[
-            lambda x: ~x["state"].isin(["DC", "PR"]), CENSUS_POPULATION_CODE
+        return self.state_pop_data.loc[
+            lambda x: ~x["state"].isin(self.EXCLUDED), CENSUS_POPULATION_CODE
         ].sum()
 
-        self.congress_num = congress_num
-        self.session_num = session_num
-
-    def get_senate_list(self):
-        """Gets a list of all Senate roll call votes from senate.gov"""
-        url = (
-            "https://www.senate.gov/legislative/LIS/roll_call_lists/"
-            f"vote_menu_{self.congress_num}_{self.session_num}.xml"
+    @functools.cached_property
+    def engine(self):
+        return RepresentationEngine(
+            self.state_pop_data, self.us_pop_data, self.get_seats()
         )
-        headers = {"user-agent": "representabot"}
-        resp_data = requests.get(url, headers=headers)
-        return xmltodict.parse(resp_data.content)
 
-    def get_senate_vote(self, vote_num):
-        """Gets detailed data on a particular Senate vote"""
-        url = (
-            "https://www.senate.gov/legislative/LIS/roll_call_votes/"
-            f"vote{self.congress_num}{self.session_num}/"
-            f"vote_{self.congress_num}_{self.session_num}_{vote_num}.xml"
-        )
-        headers = {"user-agent": "representabot"}
-        resp_data = requests.get(url, headers=headers)
-        return xmltodict.parse(resp_data.content)
+    def __create_session(self):
+        """Creates a keep-alive HTTP session sized for concurrent fetches"""
+        http = requests.Session()
+        http.headers.update(self.HEADERS)
+        adapter = HTTPAdapter(pool_maxsize=self.MAX_WORKERS)
+        http.mount("https://", adapter)
+        http.mount("http://", adapter)
+        return http
+
+    @property
+    def methodology(self):
+        """Version of the representation results, like 1-acs2019-DC,PR"""
+        excluded = ",".join(sorted(self.EXCLUDED)) or "none"
+        return f"{self.METHODOLOGY}-acs{self.ACS_YEAR}-{excluded}"
+
+    def get_seats(self):
+        """Seats per state for the RepresentationEngine, None if each
+        member represents their whole state
+        """
+        return None
+
+    def get_xml(self, url, parse, revalidate=False):
+        """Gets an XML document and parses it as it streams in, through the
+        cache if enabled
+        """
+        if self.cache is not None:
+            return self.cache.get(self.http, url, parse, revalidate=revalidate)
+        with self.http.get(url, stream=True) as resp_data:
+            METRICS.count("http_requests")
+            resp_data.raise_for_status()
+            resp_data.raw.decode_content = True
+            return parse(CountingReader(resp_data.raw, METRICS, "http_bytes"))
+
+    @abc.abstractmethod
+    def get_vote_list(self, start=1):
+        """Gets the chamber's votes numbered `start` and up, newest first,
+        as vote_menu entries
+        """
+
+    def poll_votes(self, after=0, validators=None):
+        """Gets the votes numbered above `after` for a poll. `validators`
+        are from the previous poll, for chambers that can make conditional
+        requests. Returns the votes and the validators for the next poll.
+        """
+        return self.get_vote_list(after + 1), validators
+
+    @abc.abstractmethod
+    def get_vote(self, vote_num):
+        """Gets detailed data on a particular vote"""
+
+    def fetch_votes(self, vote_numbers):
+        """Gets detailed data on many votes at once, using up to
+        MAX_WORKERS concurrent requests, or from the warehouse if set.
+        Returns a dict of vote number to vote detail; votes that could not
+        be fetched are left out.
+        """
+        vote_numbers = list(vote_numbers)
+        if not vote_numbers:
+            return {}
+        if self.warehouse is not None:
+            stored = self.warehouse.details(
+                self.name, self.congress_num, self.session_num
+            )
+            return {n: stored[n][1] for n in vote_numbers if n in stored}
+
+        def fetch(vote_num):
+            try:
+                return self.get_vote(vote_num)
+            except Exception as e:
+                logging.error(f"Unable to fetch {self.name} vote {vote_num}")
+                logging.error(e)
+
+        workers = min(self.MAX_WORKERS, len(vote_numbers))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            details = executor.map(fetch, vote_numbers)
+            return {
+                vote_num: detail
+                for vote_num, detail in zip(vote_numbers, details)
+                if detail is not None
+            }
+
+    def iter_vote_batches(self, votes):
+        """Yields lists of (vote, vote_detail) pairs for items of the vote
+        list, fetching the details one batch of MAX_WORKERS votes at a
+        time. vote_detail is None if the vote could not be fetched.
+        """
+        votes = list(votes)
+        for start in range(0, len(votes), self.MAX_WORKERS):
+            batch = votes[start : start + self.MAX_WORKERS]
+            details = self.fetch_votes(v["vote_number"] for v in batch)
+            yield [(vote, details.get(vote["vote_number"])) for vote in batch]
+
+    def iter_vote_details(self, votes):
+        """Yields (vote, vote_detail) pairs for items of the vote list,
+        fetching the details one batch of MAX_WORKERS votes at a time.
+        vote_detail is None if the vote could not be fetched.
+        """
+        for batch in self.iter_vote_batches(votes):
+            yield from batch
 
     def get_voters(self, vote_members):
         """Takes a list of members from vote_detail JSON."""
-        voters = pd.json_normalize(vote_members, "member")
-        voters = voters.join(
-            self.state_pop_data.set_index("state")[[CENSUS_POPULATION_CODE]],
-            on="state",
-        )
+        members = vote_members["member"]
+        if isinstance(members, dict):
+            members = [members]
+        table = self.engine.members
+        rows = table.lookup(members)
+        voters = table.frame().iloc[rows].reset_index(drop=True)
+        voters["vote_cast"] = [m["vote_cast"] for m in members]
         return voters
 
     def get_vote_rep(self, voters):
         """Gets the % of the population represented in the vote."""
         votes = voters.groupby("vote_cast")[[CENSUS_POPULATION_CODE]].sum()
-        votes.loc[:, "rep"] = votes[CENSUS_POPULATION_CODE] / (
-            int(self.us_pop_data) * 2
-        )
+        votes.loc[:, "rep"] = votes[CENSUS_POPULATION_CODE] / self.engine.total
         votes = votes[["rep"]].to_dict()["rep"]
         for v in ["Yea", "Nay", "Abstain"]:
             if v not in votes:
@@ -138,153 +671,45 @@ class SenateData:
 
     def process_detail_text(self, vote_rep, party_rep):
         """Takes representation and party counts and cleans them for text."""
-        text = ""
-
-        for v in ["yea", "nay", "abstain"]:
-            p = "{0:.1%}".format(vote_rep[v.title()])
-            total_vote = party_rep[f"{v}_vote"]["total"]
-            d_vote = party_rep[f"{v}_vote"]["D"]
-            r_vote = party_rep[f"{v}_vote"]["R"]
-            i_vote = total_vote - (d_vote + r_vote)
-
-            if total_vote == 1:
-                votes = "vote"
-            else:
-                votes = "votes"
-
-            if v == "abstain":
-                li = f"😶 No vote: {p} ... {total_vote} {votes} ({d_vote}-D, {r_vote}-R, {i_vote}-I)"
-            elif v == "nay":
-                li = f"❎ {v.title()}s: {p} ... {total_vote} {votes} ({d_vote}-D, {r_vote}-R, {i_vote}-I)"
-            else:
-                li = f"✅ {v.title()}s: {p} of the country represented by {total_vote} {votes} ({d_vote}-D, {r_vote}-R, {i_vote}-I)"
-
-            text += f"{li}\n\n"
-
-        return text
+        return self.renderer.detail_text(vote_rep, party_rep)
 
     def process_link_text(self, vote_number):
         """Creates a source link to the senate.gov website."""
-        url = (
-            "https://www.senate.gov/legislative/LIS/roll_call_lists/roll_call_vote_cfm.cfm?"
-            f"congress={self.congress_num}&session={self.session_num}&vote={vote_number}"
+        return self.renderer.link(
+            self.congress_num, self.session_num, vote_number
         )
-        return url
 
     def process_vote_text(self, question, vote_question, vote, vote_detail):
         """Processes a vote into the relevant syntax for tweeting."""
+        return self.renderer.vote_text(
+            question, vote_question, vote, vote_detail
+        )
 
-        def process_name(name):
-            """Helper function for process_measure."""
-            name = name[: name.find(",")]
-            name = name.split()
-            return name[0][0] + ". " + name[-1]
-
-        def process_measure():
-            """Helper function for process_vote_text."""
-            text = ""
-            # TODO: make these separate functions?
-            if question == "motion":
-                if len(vote_question.split()) > 3:
-                    if "PN" in vote_issue:
-                        nominee = process_name(
-                            vote_detail["roll_call_vote"]["vote_document_text"]
-                        )
-                        text += f"{vote_question.capitalize()} the {nominee} nomination was {vote_result}"
-                    elif (
-                        "amdt"
-                        in vote_detail["roll_call_vote"]["vote_title"].lower()
-                    ):
-                        text += f"{vote_question.capitalize()} (an amendment to {vote_issue}) was {vote_result}"
-                    else:
-                        text += f"{vote_question.capitalize()} ({vote_issue}) was {vote_result}"
-                else:
-                    text += f"{vote_question.capitalize()}"
-                    if "PN" in vote_issue:
-                        nominee = process_name(
-                            vote_detail["roll_call_vote"]["vote_document_text"]
-                        )
-                        text += f" on nominating {nominee} "
-                    elif (
-                        "waive"
-                        in vote_detail["roll_call_vote"]["vote_title"].lower()
-                    ):
-                        text += " to waive "
-                        if (
-                            "amdt"
-                            in vote_detail["roll_call_vote"][
-                                "vote_title"
-                            ].lower()
-                        ):
-                            text += f"re: an Amdt. to {vote_issue} "
-                        else:
-                            text += f""
-                    else:
-                        text += f" for {vote_issue} "
-                    text += f"was {vote_result}"
-            elif question == "bill":
-                text += f"The bill {vote_issue} was {vote_result}"
-            elif question == "amendment":
-                amend = vote["question"]["measure"]
-                text += (
-                    f"The amendment {amend} for {vote_issue} was {vote_result}"
-                )
-            elif question == "resolution":
-                text += f"{vote_question.capitalize()} for {vote_issue} was {vote_result}"
-            elif question == "nomination":
-                nominee = process_name(
-                    vote_detail["roll_call_vote"]["vote_document_text"]
-                )
-                text += f"The nomination for {nominee} was {vote_result}"
-            elif question == "veto":
-                text += f"The veto on {vote_issue} was {vote_result[5:]}"
-
-            return text
-
-        vote_issue = vote["issue"]
-        vote_result = vote["result"].lower()
-        vote_number = vote["vote_number"]
-
-        return process_measure()
-
-    def process_vote(self, vote):
-        """Process a vote into tweet text form"""
-
-        def process_date(date_str):
-            date = pd.to_datetime(date_str)
-            return date.strftime("%B %d, %Y")
-
-        tweet_text = ""
-        vote_number = vote["vote_number"]
-        vote_tally = vote["vote_tally"]
+    def vote_question(self, vote):
+        """The question of a vote_menu entry, e.g. On the Cloture Motion"""
         vote_question = vote["question"]
-        vote_result = vote["result"]
-        vote_detail = self.get_senate_vote(vote_number)
-        voters = self.get_voters(vote_detail["roll_call_vote"]["members"])
-        voters.loc[
-            lambda x: ~x["vote_cast"].isin(["Yea", "Nay"]), "vote_cast"
-        ] = "Abstain"
-        date = process_date(vote_detail["roll_call_vote"]["vote_date"])
-
         if isinstance(vote_question, dict):
             vote_question = vote_question["#text"]
-        else:
-            vote_question = vote_question
+        return vote_question
+
+    def question_type(self, vote):
+        """The type of a vote_menu entry's question, one of QUESTIONS, or
+        None
+        """
+        vote_question = self.vote_question(vote)
+        if vote_question is None:
+            return None
+        return self.renderer.classify(vote_question)[0]
 
+    def __vote_text(self, vote, vote_detail):
+        """Classifies a vote and renders the sentence describing it, or
+        raises DoNotTweetException if it isn't to be tweeted
+        """
+        vote_question = self.vote_question(vote)
         if vote_question is None:
             raise DoNotTweetException
 
-        vote_question = vote_question.lower()[3:]
-        vote_question = (
-            vote_question[: vote_question.find("(") - 1]
-            if vote_question.find("(") > 0
-            else vote_question
-        )
-        vote_question = (
-            "the " + vote_question
-            if vote_question[:3] != "the"
-            else vote_question
-        )
+        question, vote_question = self.renderer.classify(vote_question)
 
         # votes without an "issue" don't have a subject
         # this was an odd edge case that's accounted for here
@@ -294,32 +719,276 @@ class SenateData:
             raise DoNotTweetException
         elif vote["issue"] == "n/a":
             raise DoNotTweetException
-        else:
-            q = [
-                question
-                for question in self.QUESTIONS
-                if (question in vote_question)
-            ]
-            if q:
-                # might change in future
-                # tweet_text += f"Vote #{int(vote_number)} on {date}: "
-                tweet_text += self.process_vote_text(
-                    q[0], vote_question, vote, vote_detail
+        elif question is None:
+            # Vote does not match any of the desired questions
+            raise DoNotTweetException
+
+        # might change in future
+        # tweet_text += f"Vote #{int(vote_number)} on {date}: "
+        with METRICS.span("text"):
+            return self.process_vote_text(
+                question, vote_question, vote, vote_detail
+            )
+
+    def process_batch(self, votes):
+        """Processes (vote, vote_detail) pairs into tweet text form,
+        computing the representation of all the votes at once. Vote details
+        that are None are fetched. Returns a list with (tweet_text,
+        party_rep, vote_rep) for each vote, or the exception raised for it,
+        e.g. DoNotTweetException.
+        """
+        results = [None] * len(votes)
+        pending = []
+        for i, (vote, vote_detail) in enumerate(votes):
+            try:
+                if vote_detail is None:
+                    vote_detail = self.get_vote(vote["vote_number"])
+                vote_text = self.__vote_text(vote, vote_detail)
+            except Exception as e:
+                results[i] = e
+                continue
+            pending.append((i, vote, vote_detail, vote_text))
+        if not pending:
+            return results
+
+        try:
+            with METRICS.span("representation"):
+                reps = self.engine.compute_batch(
+                    [
+                        vote_detail["roll_call_vote"]["members"]["member"]
+                        for _, _, vote_detail, _ in pending
+                    ]
                 )
-                tweet_text += ".\n\n"
+        except Exception as e:
+            for i, _, _, _ in pending:
+                results[i] = e
+            return results
 
-                party_rep = self.get_party_rep(voters)
-                vote_rep = self.get_vote_rep(voters)
-                tweet_text += self.process_detail_text(vote_rep, party_rep)
+        for (i, vote, _, vote_text), (party_rep, vote_rep) in zip(
+            pending, reps
+        ):
+            with METRICS.span("text"):
+                tweet_text = "".join(
+                    [
+                        vote_text,
+                        ".\n\n",
+                        self.process_detail_text(vote_rep, party_rep),
+                        "src: ",
+                        self.process_link_text(vote["vote_number"]),
+                    ]
+                )
+            results[i] = (
+                tweet_text,
+                flatten(party_rep, result={}),
+                flatten(vote_rep, result={}),
+            )
+        return results
 
-                link = self.process_link_text(vote_number)
-                tweet_text += f"src: {link}"
-                party_rep = flatten(party_rep, result={})
-                vote_rep = flatten(vote_rep, result={})
-                return tweet_text, party_rep, vote_rep
-            else:
-                # Vote does not match any of the desired questions
-                raise DoNotTweetException
+    def process_vote(self, vote, vote_detail=None):
+        """Process a vote into tweet text form. The vote detail is fetched
+        unless it has already been fetched, e.g. by fetch_votes.
+        """
+        result = self.process_batch([(vote, vote_detail)])[0]
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+
+class SenateData(Chamber):
+    name = "senate"
+    BASE_URL = "https://www.senate.gov/legislative/LIS"
+    # Number of roll call votes fetched from senate.gov at once
+    MAX_WORKERS = int(os.environ.get("SENATE_MAX_WORKERS", 8))
+
+    def get_senate_list(self):
+        """Gets a list of all Senate roll call votes from senate.gov"""
+        url = (
+            f"{self.BASE_URL}/roll_call_lists/"
+            f"vote_menu_{self.congress_num}_{self.session_num}.xml"
+        )
+        # The menu grows as votes are taken, so check it for changes
+        with METRICS.span("vote_menu"):
+            return self.get_xml(url, parse_vote_menu, revalidate=True)
+
+    def get_senate_vote(self, vote_num):
+        """Gets detailed data on a particular Senate vote"""
+        url = (
+            f"{self.BASE_URL}/roll_call_votes/"
+            f"vote{self.congress_num}{self.session_num}/"
+            f"vote_{self.congress_num}_{self.session_num}_{vote_num}.xml"
+        )
+        # Roll call votes don't change once published
+        with METRICS.span("roll_call_vote"):
+            return self.get_xml(url, parse_roll_call_vote)
+
+    def get_vote_list(self, start=1):
+        votes = self.get_senate_list()["vote_summary"]["votes"]["vote"]
+        if isinstance(votes, dict):
+            votes = [votes]
+        return [v for v in votes if int(v["vote_number"]) >= start]
+
+    def poll_votes(self, after=0, validators=None):
+        """Gets the votes numbered above `after` from the vote menu with a
+        conditional GET, so an unchanged menu costs a 304. The menu lists
+        the newest vote first, so it is only read up to the first vote at
+        or below `after`.
+        """
+        url = (
+            f"{self.BASE_URL}/roll_call_lists/"
+            f"vote_menu_{self.congress_num}_{self.session_num}.xml"
+        )
+        validators = validators or {}
+        headers = {}
+        if validators.get("etag"):
+            headers["If-None-Match"] = validators["etag"]
+        if validators.get("last_modified"):
+            headers["If-Modified-Since"] = validators["last_modified"]
+        votes = []
+        with METRICS.span("vote_menu"), self.http.get(
+            url, headers=headers, stream=True
+        ) as resp_data:
+            METRICS.count("http_requests")
+            if resp_data.status_code == 304:
+                return votes, validators
+            resp_data.raise_for_status()
+            resp_data.raw.decode_content = True
+            for vote in iter_vote_menu(
+                CountingReader(resp_data.raw, METRICS, "http_bytes")
+            ):
+                if int(vote["vote_number"]) <= after:
+                    break
+                votes.append(vote)
+        return votes, {
+            "etag": resp_data.headers.get("ETag"),
+            "last_modified": resp_data.headers.get("Last-Modified"),
+        }
+
+    def get_vote(self, vote_num):
+        return self.get_senate_vote(vote_num)
+
+
+class HouseData(Chamber):
+    """House roll call votes from clerk.house.gov. Each representative
+    stands for an equal share of their state's population, from the
+    apportionment in effect for the congress.
+    """
+
+    name = "house"
+    BASE_URL = "https://clerk.house.gov/evs"
+    LINK_URL = "https://clerk.house.gov/Votes"
+    # The House takes many more votes, so more are fetched at once
+    MAX_WORKERS = int(os.environ.get("HOUSE_MAX_WORKERS", 16))
+    LIST_INCREMENTALLY = True
+
+    # The House doesn't vote on nominations, and veto overrides are
+    # worded differently
+    QUESTIONS = [
+        "motion",
+        "bill",
+        "amendment",
+        "resolution",
+    ]
+    # House questions reworded like the Senate's, e.g. "On Agreeing to
+    # the Resolution" as "On the Resolution"
+    QUESTION_WORDING = {
+        "On Passage": "On Passage of the Bill",
+        "On Agreeing to the Resolution": "On the Resolution",
+        "On Agreeing to the Amendment": "On the Amendment",
+    }
+
+    def __init__(self, congress_num, session_num):
+        super().__init__(congress_num, session_num)
+        # Roll call votes fetched while listing votes, by vote number
+        self.details = {}
+
+    @property
+    def year(self):
+        """Calendar year of the session, which the Clerk files votes by"""
+        return (
+            1789 + 2 * (int(self.congress_num) - 1) + int(self.session_num) - 1
+        )
+
+    @classmethod
+    def check_congress(cls, congress):
+        """Raises ValueError if there are no House seats for `congress`"""
+        first = first_house_congress()
+        if int(congress) < first:
+            raise ValueError(
+                f"House seats are only known from the {first}th Congress, "
+                f"so House votes of congress {congress} can't be computed"
+            )
+
+    def get_seats(self):
+        return get_house_seats(self.congress_num)
+
+    def get_house_vote(self, vote_num):
+        """Gets detailed data on a particular House vote"""
+        url = f"{self.BASE_URL}/{self.year}/roll{int(vote_num):03d}.xml"
+        # Roll call votes don't change once published
+        with METRICS.span("roll_call_vote"):
+            return self.get_xml(url, parse_house_vote)
+
+    def __find_vote(self, vote_num):
+        """Gets a House vote, or None if it hasn't been taken yet"""
+        try:
+            return self.get_house_vote(vote_num)
+        except requests.HTTPError as e:
+            if e.response is not None and e.response.status_code == 404:
+                return None
+            raise e
+
+    def get_house_list(self, start=1):
+        """Gets the House roll call votes numbered `start` and up. The
+        Clerk publishes no XML vote list, so roll calls are fetched
+        MAX_WORKERS at a time until one isn't found, and kept for
+        fetch_votes. Returns vote_menu entries, newest first like
+        senate.gov's.
+        """
+        votes = []
+        number = start
+        # There is usually no new vote, so look for one before a batch
+        size = 1
+        with METRICS.span("vote_menu"), ThreadPoolExecutor(
+            max_workers=self.MAX_WORKERS
+        ) as executor:
+            while True:
+                batch = [f"{n:05d}" for n in range(number, number + size)]
+                found = 0
+                try:
+                    for vote_num, detail in zip(
+                        batch, executor.map(self.__find_vote, batch)
+                    ):
+                        if detail is None:
+                            break
+                        self.details[vote_num] = detail
+                        votes.append(detail["vote"])
+                        found += 1
+                except Exception as e:
+                    # Later votes are listed on the next run
+                    logging.error(f"Unable to list House votes from {number}")
+                    logging.error(e)
+                    break
+                if found < len(batch):
+                    break
+                number += len(batch)
+                size = self.MAX_WORKERS
+        return votes[::-1]
+
+    def get_vote_list(self, start=1):
+        return self.get_house_list(start)
+
+    def get_vote(self, vote_num):
+        if vote_num in self.details:
+            return self.details[vote_num]
+        return self.get_house_vote(vote_num)
+
+    def vote_question(self, vote):
+        vote_question = super().vote_question(vote)
+        return self.QUESTION_WORDING.get(vote_question, vote_question)
+
+    def process_link_text(self, vote_number):
+        """Creates a source link to the clerk.house.gov website."""
+        return f"{self.LINK_URL}/{self.year}{int(vote_number)}"
 
 
 if __name__ == "__main__":
@@ -328,9 +997,12 @@ if __name__ == "__main__":
     examples = []
     tweets = []
 
-    for item in senate_data["vote_summary"]["votes"]["vote"]:
+    votes = senate_data["vote_summary"]["votes"]["vote"]
+    for item, vote_detail in senate_obj.iter_vote_details(votes):
         try:
-            tweet, party_data, vote_data = senate_obj.process_vote(item)
+            tweet, party_data, vote_data = senate_obj.process_vote(
+                item, vote_detail
+            )
             if isinstance(item["question"], dict):
                 q = item["question"]["#text"]
             else:
@@ -0,0 +1,138 @@
+import contextlib
+import cProfile
+import io
+import json
+import logging
+import pstats
+import threading
+import time
+import tracemalloc
+
+
+class Metrics:
+    """Named timing spans and counters for a run.
+
+    Spans add up the wall time spent in a block of code, across threads,
+    so spans inside concurrent fetches can add up to more than the run.
+    `summary` gives the totals as a dict for logging or a metrics file.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.spans = {}
+            self.counters = {}
+            self.started = time.perf_counter()
+
+    @contextlib.contextmanager
+    def span(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            with self.lock:
+                count, total = self.spans.get(name, (0, 0.0))
+                self.spans[name] = (count + 1, total + elapsed)
+
+    def count(self, name, value=1):
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def snapshot(self):
+        """The spans and counters so far, e.g. to send from a worker
+        process to `merge`
+        """
+        with self.lock:
+            return dict(self.spans), dict(self.counters)
+
+    def merge(self, snapshot):
+        """Adds the spans and counters of another process's snapshot"""
+        spans, counters = snapshot
+        with self.lock:
+            for name, (count, total) in spans.items():
+                own_count, own_total = self.spans.get(name, (0, 0.0))
+                self.spans[name] = (own_count + count, own_total + total)
+            for name, value in counters.items():
+                self.counters[name] = self.counters.get(name, 0) + value
+
+    def summary(self):
+        with self.lock:
+            return {
+                "total_ms": round(
+                    (time.perf_counter() - self.started) * 1000, 1
+                ),
+                "spans": {
+                    name: {"count": count, "total_ms": round(total * 1000, 1)}
+                    for name, (count, total) in sorted(self.spans.items())
+                },
+                "counters": dict(sorted(self.counters.items())),
+            }
+
+    def log(self, path=None):
+        """Logs the summary as JSON, and writes it to `path` if given"""
+        summary = self.summary()
+        logging.info(f"Run summary: {json.dumps(summary)}")
+        if path:
+            with open(path, "w") as f:
+                json.dump(summary, f, indent=2)
+
+
+class CountingReader:
+    """File-like wrapper counting the bytes read from a stream"""
+
+    def __init__(self, raw, metrics, counter):
+        self.raw = raw
+        self.metrics = metrics
+        self.counter = counter
+
+    def read(self, size=-1):
+        data = self.raw.read(size)
+        self.metrics.count(self.counter, len(data))
+        return data
+
+
+# Shared by the modules instrumented for a run
+METRICS = Metrics()
+
+
+@contextlib.contextmanager
+def profile(mode, output=None, top=25):
+    """Profiles the block with cProfile ("cpu") or tracemalloc
+    ("memory"), logging the top entries. CPU stats are saved to `output`
+    for pstats/snakeviz, memory stats are written to it as text.
+    """
+    if mode == "cpu":
+        profiler = cProfile.Profile()
+        profiler.enable()
+        try:
+            yield
+        finally:
+            profiler.disable()
+            stream = io.StringIO()
+            stats = pstats.Stats(profiler, stream=stream)
+            stats.sort_stats("cumulative").print_stats(top)
+            logging.info(f"CPU profile:\n{stream.getvalue()}")
+            if output:
+                stats.dump_stats(output)
+    elif mode == "memory":
+        tracemalloc.start()
+        try:
+            yield
+        finally:
+            snapshot = tracemalloc.take_snapshot()
+            current, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            lines = [f"current: {current} bytes, peak: {peak} bytes"]
+            lines += [
+                str(stat) for stat in snapshot.statistics("lineno")[:top]
+            ]
+            logging.info("Memory profile:\n" + "\n".join(lines))
+            if output:
+                with open(output, "w") as f:
+                    f.write("\n".join(lines) + "\n")
+    else:
+        yield
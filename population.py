@@ -0,0 +1,162 @@
+import datetime
+import json
+import logging
+import os
+import threading
+
+import dotenv
+import pandas as pd
+
+
+dotenv.load_dotenv()
+CENSUS_API_KEY = os.environ.get("CENSUS_API_KEY")
+CENSUS_POPULATION_CODE = "B01003_001E"
+# ACS 5-year vintage used for state populations
+ACS_YEAR = int(os.environ.get("CENSUS_ACS_YEAR", 2019))
+# Refresh a table from the Census API once it is older than this many days.
+# ACS estimates for a vintage don't change, so by default tables never expire.
+POPULATION_MAX_AGE_DAYS = os.environ.get("POPULATION_MAX_AGE_DAYS")
+# Refreshed tables are written here, next to the senate.gov XML cache
+CACHE_DIR = os.environ.get("CACHE_DIR")
+
+BUNDLED_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
+# House seats per state from each census apportionment
+HOUSE_APPORTIONMENT_FILE = "house_apportionment.json"
+
+# Tables already loaded in this process, keyed by ACS year
+_tables = {}
+_lock = threading.Lock()
+
+
+def table_filename(year):
+    return f"state_population_acs5_{year}.json"
+
+
+def read_table(path):
+    """Reads a state population table file, returns (retrieved, DataFrame)"""
+    with open(path) as f:
+        table = json.load(f)
+    state_pop_data = pd.DataFrame(
+        {
+            "NAME": table["NAME"],
+            CENSUS_POPULATION_CODE: pd.Series(
+                table[CENSUS_POPULATION_CODE], dtype=float
+            ),
+            "state": table["state"],
+        }
+    )
+    retrieved = datetime.date.fromisoformat(table["retrieved"])
+    return retrieved, state_pop_data
+
+
+def write_table(path, year, retrieved, state_pop_data):
+    table = {
+        "source": "acs5",
+        "year": year,
+        "retrieved": retrieved.isoformat(),
+        "NAME": state_pop_data["NAME"].tolist(),
+        "state": state_pop_data["state"].tolist(),
+        CENSUS_POPULATION_CODE: [
+            int(p) for p in state_pop_data[CENSUS_POPULATION_CODE]
+        ],
+    }
+    tmp = f"{path}.tmp"
+    with open(tmp, "w") as f:
+        json.dump(table, f)
+    os.replace(tmp, path)
+
+
+def fetch_table(year):
+    """Gets state populations for an ACS 5-year vintage from the Census API"""
+    from census import Census
+    from us import states
+
+    c = Census(CENSUS_API_KEY, year=year)
+    state_pop_data = c.acs5.state(("NAME", CENSUS_POPULATION_CODE), Census.ALL)
+    state_pop_data = pd.DataFrame.from_dict(state_pop_data)
+    # will need the state abbreviation for the senate.gov data
+    state_pop_data.loc[:, "state"] = state_pop_data["NAME"].map(
+        lambda x: states.lookup(x).abbr
+    )
+    state_pop_data[CENSUS_POPULATION_CODE] = state_pop_data[
+        CENSUS_POPULATION_CODE
+    ].astype(float)
+    return state_pop_data[["NAME", CENSUS_POPULATION_CODE, "state"]]
+
+
+def is_stale(retrieved, today=None):
+    if not POPULATION_MAX_AGE_DAYS:
+        return False
+    today = today or datetime.date.today()
+    return (today - retrieved).days > int(POPULATION_MAX_AGE_DAYS)
+
+
+def load_table(year):
+    """Loads the table for `year` from the cache directory or the bundled
+    data, refreshing it from the Census API if it is missing or stale
+    """
+    filename = table_filename(year)
+    table = None
+    for directory in [CACHE_DIR, BUNDLED_DIR]:
+        if directory and os.path.exists(os.path.join(directory, filename)):
+            table = read_table(os.path.join(directory, filename))
+            break
+
+    if table is not None and not is_stale(table[0]):
+        return table[1]
+
+    try:
+        state_pop_data = fetch_table(year)
+    except Exception as e:
+        if table is None:
+            logging.error(f"Unable to get ACS {year} state populations")
+            raise e
+        logging.warning(f"Using stale ACS {year} state populations: {e}")
+        return table[1]
+
+    if CACHE_DIR:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        write_table(
+            os.path.join(CACHE_DIR, filename),
+            year,
+            datetime.date.today(),
+            state_pop_data,
+        )
+    return state_pop_data
+
+
+def get_state_population(year=None):
+    """Returns a DataFrame of state name, population and abbreviation for
+    an ACS 5-year vintage. The table is loaded once per process and shared,
+    so callers must not modify it.
+    """
+    year = year or ACS_YEAR
+    with _lock:
+        if year not in _tables:
+            _tables[year] = load_table(year)
+        return _tables[year]
+
+
+def get_house_apportionments():
+    """Returns the bundled House apportionments, latest first"""
+    with open(os.path.join(BUNDLED_DIR, HOUSE_APPORTIONMENT_FILE)) as f:
+        apportionments = json.load(f)["apportionments"]
+    return sorted(
+        apportionments, key=lambda a: a["first_congress"], reverse=True
+    )
+
+
+def first_house_congress():
+    """The first congress with a bundled House apportionment"""
+    return get_house_apportionments()[-1]["first_congress"]
+
+
+def get_house_seats(congress):
+    """Returns a dict of state abbreviation to number of House seats in
+    `congress`, from the apportionment after the latest census before it.
+    States not in the dict (DC, PR) have no voting members.
+    """
+    for apportionment in get_house_apportionments():
+        if int(congress) >= apportionment["first_congress"]:
+            return apportionment["seats"]
+    raise ValueError(f"No House apportionment for the {congress} Congress")
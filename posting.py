@@ -0,0 +1,329 @@
+import json
+import logging
+import time
+
+
+class RateLimited(Exception):
+    """The publisher is rate limited until `reset` (epoch seconds)"""
+
+    def __init__(self, reset=None):
+        super().__init__(f"Rate limited until {reset}")
+        self.reset = reset
+
+
+class PublishError(Exception):
+    """A message couldn't be published. Errors that won't go away by
+    trying again (e.g. a duplicate status) have `retry` set to False.
+    """
+
+    def __init__(self, message, retry=True):
+        super().__init__(message)
+        self.retry = retry
+
+
+class TwitterPublisher:
+    """Publishes messages as tweets with a tweepy API object. The API
+    should be created with `wait_on_rate_limit=False`, so rate limits are
+    reported to the scheduler instead of sleeping inside tweepy.
+    """
+
+    name = "twitter"
+
+    def __init__(self, api):
+        self.api = api
+
+    def limits(self):
+        """Returns (remaining, reset) from the rate-limit headers of the
+        last response, or (None, None) if they weren't sent
+        """
+        response = getattr(self.api, "last_response", None)
+        headers = getattr(response, "headers", None) or {}
+        remaining = headers.get("x-rate-limit-remaining")
+        reset = headers.get("x-rate-limit-reset")
+        return (
+            int(remaining) if remaining is not None else None,
+            int(reset) if reset is not None else None,
+        )
+
+    def publish(self, message):
+        """Tweets a message's text and returns the tweet id"""
+        # Imported with the API object, so runs that don't tweet skip it
+        import tweepy
+
+        try:
+            status = self.api.update_status(message["text"])
+        except tweepy.TweepError as e:
+            status_code = getattr(e.response, "status_code", None)
+            if isinstance(e, tweepy.RateLimitError) or status_code in (
+                420,
+                429,
+            ):
+                raise RateLimited(self.limits()[1]) from e
+            # Other client errors (duplicate or too long statuses) are
+            # permanent, server and network errors are worth retrying
+            retry = status_code is None or status_code >= 500
+            raise PublishError(str(e), retry=retry) from e
+        return status.id_str
+
+
+class TokenBucket:
+    """Token bucket spacing out posts. Tokens are added at `rate` per
+    second up to `capacity`, and each post takes one. The bucket is also
+    drained when the API reports no remaining calls, until its reset time.
+    """
+
+    def __init__(self, rate, capacity=1, clock=time.time, sleep=time.sleep):
+        self.rate = rate
+        self.capacity = capacity
+        self.clock = clock
+        self.sleep = sleep
+        self.tokens = capacity
+        self.updated = clock()
+        self.paused_until = 0
+
+    def __refill(self):
+        now = self.clock()
+        if self.rate > 0:
+            self.tokens = min(
+                self.capacity,
+                self.tokens + (now - self.updated) * self.rate,
+            )
+        else:
+            self.tokens = self.capacity
+        self.updated = now
+        return now
+
+    def pause_until(self, reset):
+        """Stops handing out tokens until `reset` (epoch seconds)"""
+        if reset:
+            self.paused_until = max(self.paused_until, reset)
+
+    def update(self, remaining, reset):
+        """Applies the API's rate-limit headers"""
+        if remaining is not None and remaining <= 0:
+            self.pause_until(reset)
+
+    def wait_time(self):
+        """Seconds until a token is available"""
+        now = self.__refill()
+        wait = max(0, self.paused_until - now)
+        if self.tokens < 1:
+            wait = max(wait, (1 - self.tokens) / self.rate)
+        return wait
+
+    def acquire(self, max_wait=None):
+        """Takes a token, sleeping until one is available. Returns False
+        without sleeping if that would take longer than `max_wait` seconds.
+        """
+        wait = self.wait_time()
+        if max_wait is not None and wait > max_wait:
+            return False
+        if wait > 0:
+            self.sleep(wait)
+            self.__refill()
+        self.tokens -= 1
+        return True
+
+
+def message_name(message, prefix):
+    """Object name of a vote's message under `prefix`, sorting oldest
+    vote first
+    """
+    chamber = message.get("chamber") or "senate"
+    suffix = "" if chamber == "senate" else f"-{chamber}"
+    return (
+        f"{prefix}{int(message['congress']):03d}-"
+        f"{int(message['session'])}-{int(message['vote']):05d}"
+        f"{suffix}.json"
+    )
+
+
+class MessageQueue:
+    """Durable queue of ready-to-post messages, kept in a history store
+    backend with one object per message, so producers and the posting
+    worker never overwrite each other's entries. Names sort oldest vote
+    first. Messages that keep failing are moved to `failed_prefix`.
+    """
+
+    def __init__(self, store, prefix="queue/", failed_prefix="queue-failed/"):
+        self.store = store
+        self.prefix = prefix
+        self.failed_prefix = failed_prefix
+
+    def name(self, message, prefix=None):
+        return message_name(message, prefix or self.prefix)
+
+    def put(self, messages):
+        for message in messages:
+            self.store.put(
+                self.name(message), json.dumps(message).encode("utf-8")
+            )
+
+    def list(self):
+        return self.store.list(self.prefix)
+
+    def failed(self):
+        return self.store.list(self.failed_prefix)
+
+    def get(self, name):
+        body = self.store.get(name)
+        return json.loads(body) if body else None
+
+    def ack(self, name):
+        self.store.delete(name)
+
+    def nack(self, name, message, max_attempts):
+        """Records a failed attempt, moving the message to the failed
+        prefix once it has been tried `max_attempts` times
+        """
+        message = {**message, "attempts": message.get("attempts", 0) + 1}
+        if message["attempts"] >= max_attempts:
+            target = self.name(message, self.failed_prefix)
+            self.store.put(target, json.dumps(message).encode("utf-8"))
+            self.store.delete(name)
+            logging.error(f"Giving up on {name}, moved to {target}")
+        else:
+            self.store.put(name, json.dumps(message).encode("utf-8"))
+
+
+class RunJournal:
+    """Write-ahead journal of the votes a run is working on, kept in a
+    history store backend with one object per vote like MessageQueue.
+
+    A vote is journaled as COMPUTED before it is queued and saved to the
+    history, and as POSTED with its tweet id as soon as it is tweeted.
+    Once its history row is persisted, its entry is removed, so the
+    journal only holds the work that a failed or crashed run left
+    unfinished.
+    """
+
+    COMPUTED = "computed"
+    POSTED = "posted"
+
+    def __init__(self, store, prefix="journal/"):
+        self.store = store
+        self.prefix = prefix
+
+    def name(self, message):
+        return message_name(message, self.prefix)
+
+    def __write(self, message, state, tweet_id=None):
+        entry = {"state": state, "tweet_id": tweet_id, "message": message}
+        self.store.put(self.name(message), json.dumps(entry).encode("utf-8"))
+
+    def computed(self, messages):
+        for message in messages:
+            self.__write(message, self.COMPUTED)
+
+    def posted(self, message, tweet_id):
+        self.__write(message, self.POSTED, tweet_id)
+
+    def persisted(self, messages):
+        for message in messages:
+            self.store.delete(self.name(message))
+
+    def entries(self):
+        """Returns the unfinished entries, oldest vote first, as dicts of
+        state, tweet_id and message
+        """
+        entries = []
+        for name in self.store.list(self.prefix):
+            body = self.store.get(name)
+            if body:
+                entries.append(json.loads(body))
+        return entries
+
+
+class Poster:
+    """Posting worker that drains a MessageQueue through a publisher,
+    taking a token from `bucket` for every post. Failed posts are retried
+    `retries` times with exponential backoff starting at `backoff` seconds.
+    Draining stops, leaving the rest of the queue for the next run, when
+    the publisher is rate limited for longer than `max_wait` seconds.
+    Posts are recorded in `journal`, if given, before they leave the queue.
+    """
+
+    def __init__(
+        self,
+        queue,
+        publisher,
+        bucket,
+        retries=2,
+        backoff=1.0,
+        max_wait=60,
+        max_attempts=5,
+        sleep=time.sleep,
+        journal=None,
+    ):
+        self.queue = queue
+        self.publisher = publisher
+        self.bucket = bucket
+        self.retries = retries
+        self.backoff = backoff
+        self.max_wait = max_wait
+        self.max_attempts = max_attempts
+        self.sleep = sleep
+        self.journal = journal
+
+    def __update_limits(self):
+        limits = getattr(self.publisher, "limits", None)
+        if limits is not None:
+            self.bucket.update(*limits())
+
+    def __publish(self, message):
+        """Publishes a message, retrying with backoff. Returns the id."""
+        for attempt in range(self.retries + 1):
+            try:
+                return self.publisher.publish(message)
+            except PublishError as e:
+                if not e.retry or attempt == self.retries:
+                    raise
+                logging.warning(f"Post failed, retrying: {e}")
+            except RateLimited:
+                raise
+            except Exception as e:
+                if attempt == self.retries:
+                    raise PublishError(str(e)) from e
+                logging.warning(f"Post failed, retrying: {e}")
+            self.sleep(self.backoff * 2**attempt)
+            if not self.bucket.acquire(self.max_wait):
+                raise RateLimited()
+
+    def drain(self, limit=None):
+        """Posts queued messages oldest first, up to `limit`. Returns a
+        list of (message, id) for the messages that were posted.
+        """
+        posted = []
+        for name in self.queue.list():
+            if limit is not None and len(posted) >= limit:
+                break
+            if not self.bucket.acquire(self.max_wait):
+                logging.info("Rate limited, leaving the rest queued")
+                break
+            message = self.queue.get(name)
+            if message is None:
+                continue  # Posted by another worker
+            try:
+                posted_id = self.__publish(message)
+            except RateLimited as e:
+                self.bucket.pause_until(e.reset)
+                logging.info("Rate limited, leaving the rest queued")
+                break
+            except PublishError as e:
+                logging.error("Tweet failed")
+                logging.error(message)
+                logging.error(e)
+                self.queue.nack(name, message, self.max_attempts)
+                continue
+            finally:
+                self.__update_limits()
+            if self.journal is not None:
+                try:
+                    self.journal.posted(message, posted_id)
+                except Exception as e:
+                    # Still saved with its tweet id by this run
+                    logging.error(f"Unable to journal {name} as posted")
+                    logging.error(e)
+            self.queue.ack(name)
+            posted.append((message, posted_id))
+        return posted
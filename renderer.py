@@ -0,0 +1,183 @@
+import functools
+import re
+
+MONTHS = [
+    "January",
+    "February",
+    "March",
+    "April",
+    "May",
+    "June",
+    "July",
+    "August",
+    "September",
+    "October",
+    "November",
+    "December",
+]
+MONTH_NAMES = {
+    **{month.lower(): month for month in MONTHS},
+    **{month[:3].lower(): month for month in MONTHS},
+}
+
+TEMPLATES = {
+    # Motions with a long question, e.g. "the motion to table"
+    "motion_nominee": "{Question} the {nominee} nomination was {result}",
+    "motion_amendment": "{Question} (an amendment to {issue}) was {result}",
+    "motion": "{Question} ({issue}) was {result}",
+    # Motions with a short question, e.g. "the cloture motion"
+    "short_motion_nominee": "{Question} on nominating {nominee} was {result}",
+    "short_motion_waive_amendment": (
+        "{Question} to waive re: an Amdt. to {issue} was {result}"
+    ),
+    "short_motion_waive": "{Question} to waive was {result}",
+    "short_motion": "{Question} for {issue} was {result}",
+    "bill": "The bill {issue} was {result}",
+    "amendment": "The amendment {amendment} for {issue} was {result}",
+    "resolution": "{Question} for {issue} was {result}",
+    "nomination": "The nomination for {nominee} was {result}",
+    "veto": "The veto on {issue} was {veto_result}",
+}
+
+DETAIL_LINES = [
+    (
+        "Yea",
+        "yea_vote",
+        "✅ Yeas: {share:.1%} of the country represented by {total} {votes} "
+        "({D}-D, {R}-R, {I}-I)\n\n",
+    ),
+    (
+        "Nay",
+        "nay_vote",
+        "❎ Nays: {share:.1%} ... {total} {votes} ({D}-D, {R}-R, {I}-I)\n\n",
+    ),
+    (
+        "Abstain",
+        "abstain_vote",
+        "😶 No vote: {share:.1%} ... {total} {votes} "
+        "({D}-D, {R}-R, {I}-I)\n\n",
+    ),
+]
+
+LINK_TEMPLATE = (
+    "https://www.senate.gov/legislative/LIS/roll_call_lists/"
+    "roll_call_vote_cfm.cfm?congress={congress}&session={session}"
+    "&vote={vote}"
+)
+
+
+@functools.lru_cache(maxsize=1024)
+def nominee_name(document_text):
+    """Shortens a nominee like "Antony John Blinken, of New York, ..." to
+    "A. Blinken"
+    """
+    name = document_text[: document_text.find(",")]
+    name = name.split()
+    return name[0][0] + ". " + name[-1]
+
+
+@functools.lru_cache(maxsize=1024)
+def is_long_question(vote_question):
+    """Long motions, e.g. "the motion to table", are worded differently
+    from short ones like "the cloture motion"
+    """
+    return len(vote_question.split()) > 3
+
+
+class Renderer:
+    """Renders tweet text for votes.
+
+    Questions are classified with a single compiled pattern over the
+    question types, and the classification of each question string is
+    cached, as senate.gov reuses a small set of questions. Text is built
+    from the templates above.
+    """
+
+    def __init__(self, questions):
+        self.questions = list(questions)
+        self.priority = {q: i for i, q in enumerate(self.questions)}
+        self.pattern = re.compile(
+            "|".join(re.escape(q) for q in self.questions)
+        )
+        self.classify = functools.lru_cache(maxsize=4096)(self.__classify)
+
+    def __classify(self, question_text):
+        """Returns (question type, vote question) for a vote menu
+        question like "On the Cloture Motion", where the vote question is
+        e.g. "the cloture motion". The question type is the first of
+        `questions` found in it, or None.
+        """
+        vote_question = question_text.lower()[3:]
+        paren = vote_question.find("(")
+        if paren > 0:
+            vote_question = vote_question[: paren - 1]
+        if vote_question[:3] != "the":
+            vote_question = "the " + vote_question
+        found = self.pattern.findall(vote_question)
+        question = min(found, key=self.priority.get) if found else None
+        return question, vote_question
+
+    def template(self, question, long_question, issue, vote_detail):
+        """Picks the template key for a vote"""
+        if question != "motion":
+            return question
+        if long_question:
+            if "PN" in issue:
+                return "motion_nominee"
+            if "amdt" in vote_detail["vote_title"].lower():
+                return "motion_amendment"
+            return "motion"
+        if "PN" in issue:
+            return "short_motion_nominee"
+        title = vote_detail["vote_title"].lower()
+        if "waive" in title:
+            if "amdt" in title:
+                return "short_motion_waive_amendment"
+            return "short_motion_waive"
+        return "short_motion"
+
+    def vote_text(self, question, vote_question, vote, vote_detail):
+        """Renders the sentence describing a vote and its result"""
+        if question not in TEMPLATES:
+            return ""
+        detail = vote_detail["roll_call_vote"]
+        issue = vote["issue"]
+        result = vote["result"].lower()
+        key = self.template(
+            question, is_long_question(vote_question), issue, detail
+        )
+        fields = {
+            "Question": vote_question.capitalize(),
+            "issue": issue,
+            "result": result,
+        }
+        if key.endswith("nominee") or key == "nomination":
+            fields["nominee"] = nominee_name(detail["vote_document_text"])
+        elif key == "amendment":
+            fields["amendment"] = vote["question"]["measure"]
+        elif key == "veto":
+            fields["veto_result"] = result[5:]
+        return TEMPLATES[key].format(**fields)
+
+    def detail_text(self, vote_rep, party_rep):
+        """Renders the representation and party count lines"""
+        lines = []
+        for cast, key, template in DETAIL_LINES:
+            counts = party_rep[key]
+            total = counts["total"]
+            lines.append(
+                template.format(
+                    share=vote_rep[cast],
+                    total=total,
+                    votes="vote" if total == 1 else "votes",
+                    D=counts["D"],
+                    R=counts["R"],
+                    I=total - (counts["D"] + counts["R"]),
+                )
+            )
+        return "".join(lines)
+
+    def link(self, congress, session, vote_number):
+        return LINK_TEMPLATE.format(
+            congress=congress, session=session, vote=vote_number
+        )
@@ -0,0 +1,199 @@
+import json
+import logging
+import threading
+import time
+
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from posting import MessageQueue
+
+
+def payload(message):
+    """The vote summary sent to sinks: the tweet text with the party and
+    representation data it was computed from
+    """
+    row = message.get("row") or {}
+    chamber = message.get("chamber") or "senate"
+    key = f"{message['congress']}-{message['session']}-{message['vote']}"
+    return {
+        "id": key if chamber == "senate" else f"{chamber}-{key}",
+        "chamber": chamber,
+        "congress": message["congress"],
+        "session": message["session"],
+        "date": message["date"],
+        "vote": message["vote"],
+        "text": message["text"],
+        "data": {
+            column: value
+            for column, value in row.items()
+            if column
+            not in [
+                "tweet_id",
+                "chamber",
+                "congress",
+                "session",
+                "date",
+                "vote",
+            ]
+        },
+    }
+
+
+class FileSink:
+    """Appends vote summaries to a local file as JSON lines"""
+
+    name = "file"
+
+    def __init__(self, path):
+        self.path = path
+
+    def publish(self, message):
+        with open(self.path, "a") as f:
+            f.write(json.dumps(payload(message)) + "\n")
+
+
+class WebhookSink:
+    """POSTs vote summaries as JSON to a webhook URL"""
+
+    name = "webhook"
+
+    def __init__(self, url, timeout=10):
+        self.url = url
+        self.timeout = timeout
+        self.http = requests.Session()
+
+    def publish(self, message):
+        response = self.http.post(
+            self.url, json=payload(message), timeout=self.timeout
+        )
+        response.raise_for_status()
+
+
+class JSONFeedSink:
+    """Keeps a JSON Feed (https://jsonfeed.org) of the latest vote
+    summaries as an object in the history store backend
+    """
+
+    name = "feed"
+
+    def __init__(self, store, object_name="feed.json", max_items=100):
+        self.store = store
+        self.object_name = object_name
+        self.max_items = max_items
+
+    def publish(self, message):
+        body = self.store.get(self.object_name)
+        feed = (
+            json.loads(body)
+            if body
+            else {
+                "version": "https://jsonfeed.org/version/1.1",
+                "title": "Representabot",
+                "items": [],
+            }
+        )
+        summary = payload(message)
+        items = [item for item in feed["items"] if item["id"] != summary["id"]]
+        item = {
+            "id": summary["id"],
+            "content_text": summary["text"],
+            "_representabot": summary,
+        }
+        feed["items"] = [item] + items[: self.max_items - 1]
+        self.store.put(self.object_name, json.dumps(feed).encode("utf-8"))
+
+
+class Fanout:
+    """Delivers vote summaries to any number of sinks, separately from
+    the tweets.
+
+    Each sink has its own durable MessageQueue in `store`, under
+    `sinks/<name>/`, so a sink gets each message once however often its
+    tweet is retried, and neither Twitter's credentials nor its rate
+    limits hold the sinks up. `deliver` drains the queues concurrently,
+    each sink on its own thread and in order, so a slow or failing sink
+    never delays or fails the others. A message a sink fails on stays
+    queued for the next run, and is moved to `sinks-failed/<name>/` after
+    `max_attempts`. `stats` has each sink's timings.
+    """
+
+    def __init__(self, sinks, store, max_attempts=5):
+        self.sinks = list(sinks)
+        self.queues = {
+            sink.name: MessageQueue(
+                store,
+                prefix=f"sinks/{sink.name}/",
+                failed_prefix=f"sinks-failed/{sink.name}/",
+            )
+            for sink in self.sinks
+        }
+        self.max_attempts = max_attempts
+        self.timings = {sink.name: [] for sink in self.sinks}
+        self.failures = {name: 0 for name in self.timings}
+        self.lock = threading.Lock()
+
+    def put(self, messages):
+        """Queues messages for every sink"""
+        for queue in self.queues.values():
+            queue.put(messages)
+
+    def __timed(self, sink, message):
+        start = time.perf_counter()
+        try:
+            sink.publish(message)
+        finally:
+            with self.lock:
+                self.timings[sink.name].append(time.perf_counter() - start)
+
+    def __drain(self, sink):
+        """Publishes a sink's queued messages oldest first, stopping at
+        the first failure so the rest keep their order. Returns the number
+        published.
+        """
+        queue = self.queues[sink.name]
+        published = 0
+        for name in queue.list():
+            message = queue.get(name)
+            if message is None:
+                continue  # Delivered by another run
+            try:
+                self.__timed(sink, message)
+            except Exception as e:
+                with self.lock:
+                    self.failures[sink.name] += 1
+                logging.error(f"Publishing to {sink.name} failed")
+                logging.error(e)
+                queue.nack(name, message, self.max_attempts)
+                break
+            queue.ack(name)
+            published += 1
+        return published
+
+    def deliver(self):
+        """Publishes every sink's queued messages. Returns the number of
+        messages published to each sink.
+        """
+        if not self.sinks:
+            return {}
+        with ThreadPoolExecutor(max_workers=len(self.sinks)) as executor:
+            published = list(executor.map(self.__drain, self.sinks))
+        return {
+            sink.name: count for sink, count in zip(self.sinks, published)
+        }
+
+    def stats(self):
+        with self.lock:
+            return {
+                name: {
+                    "count": len(timings),
+                    "failures": self.failures[name],
+                    "total_ms": round(sum(timings) * 1000, 1),
+                    "max_ms": round(max(timings, default=0) * 1000, 1),
+                }
+                for name, timings in self.timings.items()
+            }
+
+    def log_stats(self):
+        logging.info(f"Sinks: {json.dumps(self.stats())}")
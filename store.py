@@ -0,0 +1,343 @@
+import abc
+import io
+import os
+import time
+import uuid
+
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # Parquet support is optional
+    pa = None
+
+
+class CSVFormat:
+    """Serializes history segments as CSV"""
+
+    extension = "csv"
+
+    def __init__(self, dtypes=None):
+        self.dtypes = dtypes
+
+    def dumps(self, tweets):
+        with io.StringIO() as csv_buffer:
+            tweets.to_csv(csv_buffer, index=False)
+            return csv_buffer.getvalue().encode("utf-8")
+
+    def loads(self, body, columns=None):
+        usecols = (lambda c: c in columns) if columns else None
+        # Only empty fields are missing values, so text like "n/a" (the
+        # vote menu's issue of a procedural vote) reads back as written
+        return pd.read_csv(
+            io.BytesIO(body),
+            dtype=self.dtypes,
+            usecols=usecols,
+            keep_default_na=False,
+            na_values=[""],
+        )
+
+
+class ParquetFormat:
+    """Serializes history segments as Parquet, with a schema built from
+    the history dtypes. Needs pyarrow.
+    """
+
+    extension = "parquet"
+    TYPES = {str: "string", "Int64": "int64", float: "float64"}
+
+    def __init__(self, dtypes=None):
+        if pa is None:
+            raise ImportError("pyarrow is required for the Parquet format")
+        self.dtypes = dtypes or {}
+        self.schema = pa.schema(
+            [
+                (column, self.TYPES.get(dtype, "string"))
+                for column, dtype in self.dtypes.items()
+            ]
+        )
+
+    def dumps(self, tweets):
+        columns = list(self.dtypes) + [
+            c for c in tweets.columns if c not in self.dtypes
+        ]
+        tweets = tweets.reindex(columns=columns)
+        for column, dtype in self.dtypes.items():
+            if dtype is str:
+                # Keep missing values missing instead of "nan"
+                tweets[column] = tweets[column].map(
+                    lambda x: None if pd.isna(x) else str(x)
+                )
+        schema = pa.Schema.from_pandas(tweets, preserve_index=False)
+        for field in self.schema:
+            schema = schema.set(schema.get_field_index(field.name), field)
+        table = pa.Table.from_pandas(
+            tweets, schema=schema, preserve_index=False
+        )
+        with io.BytesIO() as buffer:
+            pq.write_table(table, buffer)
+            return buffer.getvalue()
+
+    def loads(self, body, columns=None):
+        source = pa.BufferReader(body)
+        if columns:
+            names = pq.read_schema(source).names
+            columns = [c for c in columns if c in names]
+        tweets = pq.read_table(source, columns=columns).to_pandas()
+        return tweets.astype(
+            {
+                column: dtype
+                for column, dtype in self.dtypes.items()
+                if column in tweets and dtype is not str
+            }
+        )
+
+
+FORMATS = {f.extension: f for f in [CSVFormat, ParquetFormat]}
+
+
+class HistoryStore(abc.ABC):
+    """Append-only tweet history, partitioned by chamber, congress and
+    session.
+
+    Every append writes the new rows as a new segment object under
+    `congress=<c>/session=<s>/` for the Senate, or
+    `chamber=<chamber>/congress=<c>/session=<s>/` for other chambers, so
+    existing history is never rewritten and concurrent runs can't
+    overwrite each other's rows. Reading a partition concatenates its
+    segments in the order they were written and keeps the latest row for
+    each vote and methodology version, so a row can be updated (e.g. to
+    fill in a tweet id) by appending it again, while rows recomputed under
+    a new version are kept next to the old. `compact` merges a partition's
+    segments into one.
+
+    Segments are written in `format` ("csv" or "parquet") and read in
+    whichever format they were written in, so compacting a partition also
+    migrates it to the current format.
+
+    Other datasets partitioned the same way pass their own `key`, the
+    columns identifying a row, which they are also sorted by.
+
+    Subclasses implement the object operations for a storage backend.
+    """
+
+    KEY = ["congress", "session", "date", "vote"]
+    SORT = ["congress", "session", "vote"]
+    # A vote keeps a row for each of these that it was written with
+    VERSION = ["methodology"]
+
+    def __init__(self, dtypes=None, format="csv", key=None):
+        self.dtypes = dtypes
+        if key is not None:
+            self.KEY = self.SORT = list(key)
+            self.VERSION = []
+        self.format = FORMATS[format](dtypes)
+        self.formats = {format: self.format}
+
+    @abc.abstractmethod
+    def list(self, prefix):
+        """Returns the names of the objects under `prefix`, sorted"""
+
+    @abc.abstractmethod
+    def get(self, name):
+        """Returns the contents of an object, or None if it doesn't exist"""
+
+    @abc.abstractmethod
+    def put(self, name, body):
+        """Writes an object, replacing it if it exists"""
+
+    @abc.abstractmethod
+    def delete(self, name):
+        """Removes an object, if it exists"""
+
+    def partition(self, congress, session, chamber=None):
+        # Senate partitions predate the House and keep their names, as do
+        # Senate queue names and sink ids. House ones add the chamber.
+        if chamber in (None, "senate"):
+            return f"congress={congress}/session={session}/"
+        return f"chamber={chamber}/congress={congress}/session={session}/"
+
+    def segments(self, congress, session, chamber=None):
+        return [
+            name
+            for name in self.list(self.partition(congress, session, chamber))
+            if name.rpartition(".")[2] in FORMATS
+        ]
+
+    def __segment_name(self, congress, session, chamber=None):
+        # Names sort in the order segments were written
+        return (
+            f"{self.partition(congress, session, chamber)}"
+            f"{time.time_ns():020d}-{uuid.uuid4().hex[:8]}."
+            f"{self.format.extension}"
+        )
+
+    def __format(self, name):
+        extension = name.rpartition(".")[2]
+        if extension not in self.formats:
+            self.formats[extension] = FORMATS[extension](self.dtypes)
+        return self.formats[extension]
+
+    def __read_segments(self, names, columns=None):
+        if columns:
+            columns = list(dict.fromkeys(self.KEY + list(columns)))
+        frames = []
+        for name in names:
+            body = self.get(name)
+            if body:
+                frames.append(self.__format(name).loads(body, columns))
+        if not frames:
+            return self.empty(columns)
+        tweets = pd.concat(frames, ignore_index=True)
+        # Segments written before versions were kept don't have them
+        versions = [c for c in self.VERSION if c in tweets]
+        tweets = tweets.drop_duplicates(
+            subset=self.KEY + versions, keep="last"
+        )
+        return tweets.reset_index(drop=True)
+
+    def empty(self, columns=None):
+        columns = columns or (list(self.dtypes) if self.dtypes else self.KEY)
+        return pd.DataFrame(columns=columns, dtype=str)
+
+    def read(self, congress, session, columns=None, chamber=None):
+        """Loads the tweet history for one congress and session. If
+        `columns` is given, only those columns (and the vote key) are read.
+        """
+        return self.__read_segments(
+            self.segments(congress, session, chamber), columns=columns
+        )
+
+    def append(self, rows):
+        """Writes rows as a new segment in each partition they belong to.
+        Rows without a chamber are Senate votes. Returns the names of the
+        new segments.
+        """
+        if "chamber" in rows:
+            chambers = rows["chamber"].fillna("senate")
+        else:
+            chambers = pd.Series("senate", index=rows.index)
+        names = []
+        for (chamber, congress, session), group in rows.groupby(
+            [chambers.rename(None), "congress", "session"], sort=False
+        ):
+            name = self.__segment_name(congress, session, chamber)
+            # Stable sorts keep rows of the same vote in the order written
+            group = group.sort_values(by=self.SORT, kind="stable")
+            self.put(name, self.format.dumps(group))
+            names.append(name)
+        return names
+
+    def compact(self, congress, session, min_segments=2, chamber=None):
+        """Merges a partition's segments into one if it has at least
+        `min_segments`, or if any segment is in another format. Returns
+        True if the partition was compacted.
+        """
+        names = self.segments(congress, session, chamber)
+        other_format = any(
+            not name.endswith(f".{self.format.extension}") for name in names
+        )
+        if len(names) < max(min_segments, 2) and not other_format:
+            return False
+        tweets = self.__read_segments(names)
+        self.put(
+            self.__segment_name(congress, session, chamber),
+            self.format.dumps(tweets.sort_values(by=self.SORT, kind="stable")),
+        )
+        # Only remove the segments that were merged, in case of appends
+        # made while compacting
+        for name in names:
+            self.delete(name)
+        return True
+
+
+class LocalHistoryStore(HistoryStore):
+    """History store in a local directory"""
+
+    def __init__(self, directory, dtypes=None, format="csv", key=None):
+        super().__init__(dtypes, format, key)
+        self.directory = directory
+
+    def list(self, prefix):
+        path = os.path.join(self.directory, prefix)
+        if not os.path.isdir(path):
+            return []
+        return sorted(
+            prefix + name
+            for name in os.listdir(path)
+            if os.path.isfile(os.path.join(path, name))
+        )
+
+    def get(self, name):
+        try:
+            with open(os.path.join(self.directory, name), "rb") as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def put(self, name, body):
+        if isinstance(body, str):
+            body = body.encode("utf-8")
+        path = os.path.join(self.directory, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(body)
+        os.replace(tmp, path)
+
+    def delete(self, name):
+        try:
+            os.remove(os.path.join(self.directory, name))
+        except FileNotFoundError:
+            pass
+
+
+class S3HistoryStore(HistoryStore):
+    """History store under a prefix of an S3 bucket"""
+
+    def __init__(
+        self,
+        s3_client,
+        bucket,
+        prefix="history",
+        dtypes=None,
+        format="csv",
+        key=None,
+    ):
+        super().__init__(dtypes, format, key)
+        self.s3_client = s3_client
+        self.bucket = bucket
+        self.prefix = prefix.rstrip("/") + "/" if prefix else ""
+
+    def list(self, prefix):
+        names = []
+        paginator = self.s3_client.get_paginator("list_objects_v2")
+        for page in paginator.paginate(
+            Bucket=self.bucket, Prefix=self.prefix + prefix
+        ):
+            for obj in page.get("Contents", []):
+                names.append(obj["Key"][len(self.prefix) :])
+        return sorted(names)
+
+    def get(self, name):
+        try:
+            response = self.s3_client.get_object(
+                Bucket=self.bucket, Key=self.prefix + name
+            )
+        except self.s3_client.exceptions.NoSuchKey:
+            return None
+        return response["Body"].read()
+
+    def put(self, name, body):
+        response = self.s3_client.put_object(
+            Bucket=self.bucket, Key=self.prefix + name, Body=body
+        )
+        status = response.get("ResponseMetadata", {}).get("HTTPStatusCode")
+        if status != 200:
+            raise Exception(f"Unable to save file {self.bucket}/{name}")
+
+    def delete(self, name):
+        self.s3_client.delete_object(
+            Bucket=self.bucket, Key=self.prefix + name
+        )
@@ -0,0 +1,237 @@
+import functools
+import io
+import json
+import os
+import threading
+import types
+
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+import bot
+import data as cd
+
+FIXTURES = os.path.join(os.path.dirname(__file__), "fixtures")
+
+
+class FakeS3:
+    """In-memory stand-in for the boto3 S3 client"""
+
+    class exceptions:
+        class NoSuchKey(Exception):
+            pass
+
+        class InvalidObjectState(Exception):
+            pass
+
+    def __init__(self, objects=None):
+        self.objects = dict(objects or {})
+        self.puts = 0
+
+    def get_object(self, Bucket, Key):
+        if Key not in self.objects:
+            raise self.exceptions.NoSuchKey(Key)
+        return {
+            "ResponseMetadata": {"HTTPStatusCode": 200},
+            "Body": io.BytesIO(self.objects[Key]),
+        }
+
+    def put_object(self, Bucket, Key, Body):
+        if isinstance(Body, str):
+            Body = Body.encode("utf-8")
+        self.objects[Key] = Body
+        self.puts += 1
+        return {"ResponseMetadata": {"HTTPStatusCode": 200}}
+
+    def delete_object(self, Bucket, Key):
+        self.objects.pop(Key, None)
+
+    def get_paginator(self, operation):
+        return self
+
+    def paginate(self, Bucket, Prefix):
+        keys = sorted(k for k in self.objects if k.startswith(Prefix))
+        yield {"Contents": [{"Key": k} for k in keys]}
+
+
+class FakeTwitter:
+    """Stand-in for tweepy.API that records posted statuses"""
+
+    def __init__(self):
+        self.posted = []
+
+    def update_status(self, text):
+        self.posted.append(text)
+        return types.SimpleNamespace(id_str=str(1000 + len(self.posted)))
+
+
+class FakePublisher:
+    """Publisher that fails or is rate limited on cue, for the posting
+    worker. `failures` is a list of exceptions raised by the next posts.
+    """
+
+    def __init__(self, failures=None, limits=(None, None)):
+        self.failures = list(failures or [])
+        self.posted = []
+        self.rate_limit = limits
+
+    def limits(self):
+        return self.rate_limit
+
+    name = "fake"
+
+    def publish(self, message):
+        if self.failures:
+            raise self.failures.pop(0)
+        self.posted.append(message["text"])
+        return str(1000 + len(self.posted))
+
+
+class FakeSenateData:
+    """Stand-in for SenateData that serves a canned vote menu"""
+
+    name = "senate"
+    LIST_INCREMENTALLY = False
+    methodology = "1-acs2019-DC,PR"
+
+    def __init__(self, votes, congress="117", session="1"):
+        self.votes = votes
+        self.congress_num = congress
+        self.session_num = session
+        self.processed = []
+        self.cache = None
+
+    def get_vote_list(self, start=1):
+        return self.votes
+
+    def iter_vote_batches(self, votes):
+        yield [(vote, None) for vote in votes]
+
+    def process_batch(self, votes):
+        return [self.process_vote(vote) for vote, _ in votes]
+
+    def question_type(self, vote):
+        return "bill"
+
+    def process_vote(self, vote, vote_detail=None):
+        self.processed.append(vote["vote_number"])
+        return f"Vote {vote['vote_number']}", {}, {}
+
+
+class FakeCensus:
+    """Stand-in for census.Census that serves recorded ACS5 state data"""
+
+    ALL = "*"
+
+    def __init__(self, key=None, year=None):
+        self.acs5 = self
+
+    def state(self, fields, geo):
+        with open(os.path.join(FIXTURES, "census_acs5_state.json")) as f:
+            return json.load(f)
+
+
+class SenateHandler(SimpleHTTPRequestHandler):
+    """Serves the recorded senate.gov XML and records requests and
+    response status codes
+    """
+
+    def log_message(self, format, *args):
+        pass
+
+    def log_request(self, code="-", size="-"):
+        self.server.statuses.append(int(code))
+
+    def do_GET(self):
+        self.server.requests.append(self.path)
+        super().do_GET()
+
+
+def serve_fixtures(directory):
+    """Starts a local HTTP server for a directory of recorded XML"""
+    handler = functools.partial(
+        SenateHandler, directory=os.path.join(FIXTURES, directory)
+    )
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    server.requests = []
+    server.statuses = []
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server
+
+
+@pytest.fixture
+def senate_server(monkeypatch):
+    """Local HTTP stand-in for senate.gov"""
+    server = serve_fixtures("senate")
+    monkeypatch.setattr(
+        cd.SenateData,
+        "BASE_URL",
+        f"http://127.0.0.1:{server.server_port}/legislative/LIS",
+    )
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def house_server(monkeypatch):
+    """Local HTTP stand-in for clerk.house.gov, with the first five roll
+    call votes of 2021
+    """
+    server = serve_fixtures("house")
+    monkeypatch.setattr(
+        cd.HouseData,
+        "BASE_URL",
+        f"http://127.0.0.1:{server.server_port}/evs",
+    )
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def senate(senate_server):
+    """SenateData for 117-1 backed by the recorded fixtures"""
+    return cd.SenateData("117", "1")
+
+
+@pytest.fixture
+def s3():
+    return FakeS3()
+
+
+@pytest.fixture
+def history(tmp_path):
+    """Local directory standing in for the S3 tweet history"""
+    return tmp_path / "history"
+
+
+@pytest.fixture
+def twitter():
+    return FakeTwitter()
+
+
+@pytest.fixture
+def make_bot(monkeypatch, history, twitter):
+    """Builds a Representabot wired to the fakes above, with its history
+    in a local directory
+    """
+
+    # Nothing is carried over from other tests' warm starts
+    bot.RUNTIME.clear()
+
+    def make(congress="117", session="1", senate=None):
+        monkeypatch.setattr(bot.Representabot, "OBJ_FILENAME", "tweets.csv")
+        monkeypatch.setattr(bot.Representabot, "HISTORY_DIR", str(history))
+        monkeypatch.setattr(
+            bot.Representabot,
+            "_Representabot__create_api",
+            lambda self: twitter,
+        )
+        if senate is not None:
+            monkeypatch.setattr(cd, "SenateData", lambda c, s: senate)
+        return bot.Representabot(congress, session)
+
+    return make
@@ -0,0 +1,158 @@
+import json
+import shutil
+
+import pandas as pd
+import pytest
+
+import analytics
+from store import LocalHistoryStore
+
+
+def vote(
+    number,
+    result,
+    yeas,
+    share,
+    congress="117",
+    session="1",
+    date="03-Feb",
+    question="motion",
+):
+    """A history row. `yeas` is (total, D, R), out of 100 senators."""
+    return {
+        "congress": congress,
+        "session": session,
+        "date": date,
+        "vote": number,
+        "question": question,
+        "result": result,
+        "yea_vote_total": yeas[0],
+        "yea_vote_D": yeas[1],
+        "yea_vote_R": yeas[2],
+        "nay_vote_total": 100 - yeas[0],
+        "Yea": share,
+        "Nay": 1 - share,
+    }
+
+
+def rows(*votes):
+    return pd.DataFrame(list(votes))
+
+
+def test_aggregates_count_minority_rule():
+    aggregates = analytics.Aggregates()
+    added = aggregates.add(
+        rows(
+            # Passed by senators representing less than half the country
+            vote("00010", "Passed", (51, 1, 50), 0.45, question="bill"),
+            vote("00011", "Agreed to", (60, 48, 12), 0.65),
+            vote(
+                "00001",
+                "Cloture Motion Rejected",
+                (55, 50, 5),
+                0.6,
+                session="2",
+                date="10-Mar",
+            ),
+            # Saved before the history had a result column
+            vote(
+                "00001",
+                None,
+                (51, 0, 51),
+                0.48,
+                congress="116",
+                date="10-Mar",
+                question=None,
+            ),
+        )
+    )
+    assert added == 4
+
+    report = aggregates.report(by=["congress"])
+    assert report["congress"].tolist() == ["116", "117"]
+    assert report["votes"].tolist() == [1, 3]
+    assert report["passed"].tolist() == [1, 2]
+    assert report["minority_passed"].tolist() == [1, 1]
+    assert report["minority_share"].tolist() == [1.0, 0.5]
+    assert report["mean_yea"].iloc[1] == pytest.approx(1.7 / 3)
+
+    by_party = aggregates.report(by=["party"], congress="117")
+    assert dict(zip(by_party["party"], by_party["votes"])) == {"D": 2, "R": 1}
+    by_month = aggregates.report(by=["month", "question"], session=["1"])
+    assert by_month["month"].tolist() == ["2019-03", "2021-02", "2021-02"]
+    assert by_month["question"].tolist() == ["unknown", "bill", "motion"]
+
+    with pytest.raises(ValueError):
+        aggregates.report(by=["state"])
+
+
+def test_aggregates_count_votes_once():
+    passed = vote("00010", "Passed", (51, 1, 50), 0.45, question="bill")
+    aggregates = analytics.Aggregates()
+    assert aggregates.add(rows(passed, passed)) == 1
+    assert aggregates.add(rows(passed)) == 0
+
+    aggregates = analytics.Aggregates.loads(aggregates.dumps())
+    assert aggregates.add(rows(passed)) == 0
+    assert aggregates.report(by=[])["votes"].tolist() == [1]
+
+    aggregates.drop("senate", "117", "1")
+    assert aggregates.add(rows(passed)) == 1
+
+
+def test_history_saves_update_aggregates(make_bot, senate_server, history):
+    repbot = make_bot()
+    repbot.backfill(["117"], ["1"])
+    report = repbot.report(["117"], ["1"], by=["question"])
+    assert report["question"].tolist() == [
+        "amendment",
+        "bill",
+        "motion",
+        "nomination",
+        "resolution",
+    ]
+    assert report["votes"].tolist() == [1] * 5
+    assert report["passed"].tolist() == [0, 1, 1, 1, 1]
+
+    # Posting saves the rows again with their tweet ids
+    repbot.post_queued()
+    assert repbot.report(["117"], ["1"], by=[])["votes"].tolist() == [5]
+
+    shutil.rmtree(history / "analytics")
+    assert repbot.aggregate(["117"], ["1"]) == 5
+    pd.testing.assert_frame_equal(
+        repbot.report(["117"], ["1"], by=["question"]), report
+    )
+
+
+def test_concurrent_updates_keep_counts(tmp_path):
+    store = LocalHistoryStore(tmp_path)
+    first = analytics.Analytics(store, compact_objects=3)
+    second = analytics.Analytics(store, compact_objects=3)
+    votes = [
+        vote(f"{n:05d}", "Passed", (51, 1, 50), 0.45) for n in range(1, 5)
+    ]
+    # Two runs save overlapping votes without reading each other's
+    assert first.update(rows(*votes[:3])) == 3
+    assert second.update(rows(*votes[1:])) == 3
+    assert len(store.list("analytics/")) == 2
+    assert first.report(by=[])["votes"].tolist() == [4]
+
+    assert first.update(rows(votes[0])) == 1
+    # The third object compacts them into one
+    [compacted] = store.list("analytics/")
+    assert compacted.endswith("~compacted.json")
+    assert second.report(by=[])["votes"].tolist() == [4]
+    assert second.report(by=[])["passed"].tolist() == [4]
+
+    # Compacted objects keep group totals, not each vote's measures
+    [partition] = json.loads(store.get(compacted))["partitions"]
+    assert partition["votes"] == []
+    assert len(partition["groups"]) == 1
+    assert first.update(rows(*votes)) == 4
+    assert first.report(by=[])["votes"].tolist() == [4]
+
+    # Recounting replaces the partition's totals
+    store.append(rows(votes[0]).assign(chamber="senate"))
+    assert first.rebuild([("senate", "117", "1")]) == 1
+    assert first.report(by=[])["votes"].tolist() == [1]
@@ -0,0 +1,479 @@
+import os
+import shutil
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+import pytest
+
+import bot
+import data as cd
+
+from conftest import FIXTURES, FakeSenateData, serve_fixtures
+
+
+def menu(*numbers):
+    return [{"vote_number": n, "vote_date": "03-Jan"} for n in numbers]
+
+
+def test_run_skips_tweeted_votes(make_bot, history, twitter):
+    segment = history / "congress=117" / "session=1" / "0.csv"
+    segment.parent.mkdir(parents=True)
+    segment.write_text(
+        "tweet_id,congress,session,date,vote\n1,117,1,03-Jan,00002\n"
+    )
+    senate = FakeSenateData(menu("00003", "00002", "00001"))
+    repbot = make_bot(senate=senate)
+    assert ("117", "1", "03-Jan", "00002") in repbot.tweeted["senate"]
+
+    repbot.run()
+    assert senate.processed == ["00003", "00001"]
+    assert len(twitter.posted) == 2
+    assert ("117", "1", "03-Jan", "00003") in repbot.tweeted["senate"]
+
+
+def test_run_skips_duplicate_menu_entries(make_bot, twitter):
+    senate = FakeSenateData(menu("00001", "00001"))
+    make_bot(senate=senate).run()
+    assert senate.processed == ["00001"]
+
+
+def test_backfill_then_post(
+    make_bot, senate_server, history, twitter, monkeypatch
+):
+    repbot = make_bot()
+    # Session 2 has no fixtures, and is skipped
+    assert repbot.backfill(["117"], ["1", "2"]) == "5"
+    assert twitter.posted == []
+    assert repbot.store.read("117", "1")["tweet_id"].isna().all()
+    queued = sorted(p.name for p in (history / "queue").iterdir())
+    assert queued[0] == "117-1-00002.json"
+    assert "S.Res. 27" in (history / "queue" / queued[0]).read_text()
+
+    monkeypatch.setattr(repbot, "MAX_TWEETS", 2)
+    monkeypatch.setattr(repbot.bucket, "rate", 0)
+    repbot.post_queued()
+    assert twitter.posted[0].startswith("The resolution for S.Res. 27")
+    assert twitter.posted[1].startswith("The bill H.R. 1319")
+    assert len(list((history / "queue").iterdir())) == 3
+
+    # A fresh run sees the backfilled votes as done, and keeps draining
+    # the queue
+    repbot = make_bot()
+    tweeted = repbot.store.read("117", "1").dropna(subset=["tweet_id"])
+    assert tweeted["vote"].tolist() == ["00002", "00003"]
+    repbot.run()
+    assert len(twitter.posted) == 5
+    assert len(set(twitter.posted)) == 5
+    assert list((history / "queue").iterdir()) == []
+    assert repbot.store.read("117", "1")["tweet_id"].notna().all()
+
+
+def test_parse_range():
+    assert bot.parse_range("113-115") == ["113", "114", "115"]
+    assert bot.parse_range(117) == ["117"]
+
+
+def test_warm_start_reuses_state(make_bot, twitter, monkeypatch, caplog):
+    senate = FakeSenateData(menu("00001"))
+    repbot = make_bot(senate=senate)
+    # The index is loaded on first use, and kept for the warm starts
+    assert repbot.tweeted["senate"] == set()
+    monkeypatch.setattr(bot.RUNTIME, "invocations", 1)
+    read = repbot.store.read
+    reads = []
+
+    def counted_read(*args, **kwargs):
+        reads.append(args)
+        return read(*args, **kwargs)
+
+    monkeypatch.setattr(repbot.store, "read", counted_read)
+    event = {"congress": "117", "session": "1"}
+
+    caplog.set_level("INFO")
+    bot.lambda_handler(event, None)
+    bot.lambda_handler(event, None)
+    assert len(twitter.posted) == 1
+    # The index was kept up to date with this run's own append
+    assert reads == []
+    assert '"start": "warm"' in caplog.text
+
+    # Another writer appends to the partition, so the index is reloaded
+    repbot.store.append(
+        pd.DataFrame(
+            [["1", "117", "1", "03-Jan", "00002"]],
+            columns=["tweet_id"] + repbot.store.KEY,
+        )
+    )
+    senate.votes.append({"vote_number": "00002", "vote_date": "03-Jan"})
+    bot.lambda_handler(event, None)
+    assert len(reads) == 1
+    assert len(twitter.posted) == 1
+
+
+def test_house_congresses_checked(monkeypatch):
+    bot.check_congresses(["senate", "house"], ["113", "117"])
+    bot.check_congresses(["senate"], ["101"])
+    with pytest.raises(ValueError, match="113th"):
+        bot.check_congresses(["senate", "house"], ["112", "113"])
+
+    monkeypatch.setattr(bot.Representabot, "CHAMBERS", ["senate", "house"])
+    response = bot.lambda_handler(
+        {"action": "backfill", "congress": "101-117", "session": "1"}, None
+    )
+    assert response["statusCode"] == 400
+
+    result = subprocess.run(
+        [
+            sys.executable,
+            "bot.py",
+            "--backfill",
+            "--congress",
+            "101-117",
+            "--session",
+            "1",
+        ],
+        cwd=os.path.dirname(bot.__file__),
+        env={**os.environ, "CHAMBERS": "senate,house"},
+        capture_output=True,
+        text=True,
+    )
+    assert result.returncode == 2
+    assert "only known from the 113th Congress" in result.stderr
+
+
+def test_tweeted_index_shared_by_threads(make_bot, monkeypatch):
+    monkeypatch.setattr(bot.Representabot, "CHAMBERS", ["senate", "house"])
+    repbot = make_bot()
+    read = repbot.store.read
+
+    def slow_read(*args, **kwargs):
+        time.sleep(0.05)
+        return read(*args, **kwargs)
+
+    monkeypatch.setattr(repbot.store, "read", slow_read)
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        indexes = list(executor.map(lambda _: repbot.tweeted, range(2)))
+    assert indexes[0] is indexes[1] is repbot.tweeted
+
+
+def test_lambda_backfills_serially(make_bot, senate_server, monkeypatch):
+    make_bot()
+    response = bot.lambda_handler(
+        {
+            "action": "backfill",
+            "congress": "117",
+            "session": "1",
+            "workers": 2,
+        },
+        None,
+    )
+    assert response["statusCode"] == 400
+
+    monkeypatch.setenv("AWS_LAMBDA_FUNCTION_NAME", "representabot")
+    monkeypatch.setattr(bot.Representabot, "BACKFILL_WORKERS", 2)
+    monkeypatch.setattr(bot, "ProcessPoolExecutor", None)
+    response = bot.lambda_handler(
+        {"action": "backfill", "congress": "117", "session": "1"}, None
+    )
+    assert response == {"statusCode": 200, "body": '"5"'}
+
+
+def test_import_skips_clients():
+    loaded = subprocess.run(
+        [
+            sys.executable,
+            "-c",
+            "import sys, bot; "
+            "print(*sorted(set(sys.modules) & {'tweepy', 'boto3', 'census', "
+            "'us'}))",
+        ],
+        cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    assert loaded.stdout.split() == []
+
+
+def test_nothing_new_run_skips_setup(make_bot, senate_server, monkeypatch):
+    repbot = make_bot()
+    repbot.backfill(["117"], ["1"])
+    monkeypatch.setattr(repbot, "MAX_TWEETS", 10)
+    monkeypatch.setattr(repbot.bucket, "rate", 0)
+    repbot.post_queued()
+
+    bot.RUNTIME.clear()
+    repbot = make_bot()
+
+    def fail(self):
+        raise AssertionError("Twitter client should not be created")
+
+    monkeypatch.setattr(bot.Representabot, "_Representabot__create_api", fail)
+    assert repbot.run() == "{}"
+    # The menu was checked against the history, without the population
+    assert len(repbot.tweeted["senate"]) == 5
+    assert "engine" not in vars(repbot.chambers[0])
+
+
+def test_run_resumes_from_journal(
+    make_bot, senate_server, twitter, monkeypatch
+):
+    repbot = make_bot()
+    monkeypatch.setattr(repbot, "MAX_TWEETS", 2)
+    monkeypatch.setattr(repbot.bucket, "rate", 0)
+
+    def fail(rows):
+        raise ConnectionError("History unavailable")
+
+    append = repbot.store.append
+    monkeypatch.setattr(repbot.store, "append", fail)
+    repbot.run()
+    assert len(twitter.posted) == 2
+    states = [e["state"] for e in repbot.journal.entries()]
+    assert states == ["posted", "posted", "computed", "computed", "computed"]
+
+    # A restarted run saves the journaled votes instead of fetching and
+    # tweeting them again
+    monkeypatch.setattr(repbot.store, "append", append)
+    bot.RUNTIME.clear()
+    senate_server.requests.clear()
+    repbot = make_bot()
+    monkeypatch.setattr(repbot, "MAX_TWEETS", 10)
+    repbot.run()
+    assert len(twitter.posted) == 5
+    assert len(set(twitter.posted)) == 5
+    # Only the untweetable vote 00001 is fetched again
+    assert senate_server.requests == [
+        "/legislative/LIS/roll_call_lists/vote_menu_117_1.xml",
+        "/legislative/LIS/roll_call_votes/vote1171/vote_117_1_00001.xml",
+    ]
+    tweets = repbot.store.read("117", "1")
+    assert tweets["vote"].tolist() == [
+        "00002",
+        "00003",
+        "00004",
+        "00005",
+        "00006",
+    ]
+    assert tweets["tweet_id"].notna().all()
+    assert repbot.journal.entries() == []
+
+
+def test_vote_records_frame():
+    records = [
+        bot.VoteRecord(congress="117", session="1", vote="00001", Yea=0.5),
+        bot.VoteRecord(congress="117", session="1", vote="00002"),
+    ]
+    tweets = bot.VoteRecord.frame(records)
+    assert list(tweets.columns) == list(bot.Representabot.DTYPES)
+    assert tweets["vote"].tolist() == ["00001", "00002"]
+    assert str(tweets["yea_vote_total"].dtype) == "Int64"
+    assert tweets["Yea"].iloc[0] == 0.5
+    assert tweets["tweet_id"].isna().all()
+
+    with pytest.raises(TypeError):
+        bot.VoteRecord(vote="00001", yea_votes=51)
+
+
+def test_run_processes_both_chambers(
+    make_bot, senate_server, house_server, history, twitter, monkeypatch
+):
+    monkeypatch.setattr(bot.Representabot, "CHAMBERS", ["senate", "house"])
+    monkeypatch.setattr(bot.Representabot, "MAX_TWEETS", 10)
+    monkeypatch.setattr(bot.Representabot, "POST_INTERVAL", 0)
+    make_bot().run()
+    assert len(twitter.posted) == 9
+    assert sum("clerk.house.gov" in text for text in twitter.posted) == 4
+
+    repbot = make_bot()
+    assert repbot.store.read("117", "1")["chamber"].tolist() == ["senate"] * 5
+    house = repbot.store.read("117", "1", chamber="house")
+    assert house["vote"].tolist() == ["00002", "00003", "00004", "00005"]
+    assert house["tweet_id"].notna().all()
+    assert (history / "chamber=house" / "congress=117").is_dir()
+
+    # The House is only listed from its first vote not yet saved or skipped
+    house_server.requests.clear()
+    repbot.run()
+    assert len(twitter.posted) == 9
+    assert min(house_server.requests).endswith("/2021/roll006.xml")
+
+
+def test_house_lists_failed_votes_again(
+    make_bot, senate_server, house_server, history, twitter, monkeypatch
+):
+    monkeypatch.setattr(bot.Representabot, "CHAMBERS", ["house"])
+    monkeypatch.setattr(bot.Representabot, "MAX_TWEETS", 10)
+    monkeypatch.setattr(bot.Representabot, "POST_INTERVAL", 0)
+    process_batch = cd.HouseData.process_batch
+
+    def fail_00003(self, votes):
+        return [
+            (
+                RuntimeError("Unavailable")
+                if vote["vote_number"] == "00003"
+                else r
+            )
+            for (vote, _), r in zip(votes, process_batch(self, votes))
+        ]
+
+    monkeypatch.setattr(cd.HouseData, "process_batch", fail_00003)
+    make_bot().run()
+    house = make_bot().store.read("117", "1", chamber="house")
+    assert house["vote"].tolist() == ["00002", "00004", "00005"]
+
+    # Listed again from the failed vote, past the skipped 00001
+    monkeypatch.setattr(cd.HouseData, "process_batch", process_batch)
+    house_server.requests.clear()
+    repbot = make_bot()
+    repbot.run()
+    assert min(house_server.requests).endswith("/2021/roll003.xml")
+    house = repbot.store.read("117", "1", chamber="house")
+    assert sorted(house["vote"]) == ["00002", "00003", "00004", "00005"]
+
+    # Once saved, neither is listed again
+    house_server.requests.clear()
+    make_bot().run()
+    assert min(house_server.requests).endswith("/2021/roll006.xml")
+
+
+def test_backfill_workers_match_serial(
+    make_bot, senate_server, house_server, history, monkeypatch
+):
+    monkeypatch.setattr(bot.Representabot, "CHAMBERS", ["senate", "house"])
+
+    def backfill(workers):
+        assert make_bot().backfill(["117"], ["1", "2"], workers=workers) == "9"
+        repbot = make_bot()
+        rows = {
+            chamber: repbot.store.read("117", "1", chamber=chamber)
+            for chamber in repbot.CHAMBERS
+        }
+        queue = {p.name: p.read_text() for p in (history / "queue").iterdir()}
+        shutil.rmtree(history)
+        history.mkdir()
+        return rows, queue
+
+    rows, queue = backfill(1)
+    bot.METRICS.reset()
+    sharded_rows, sharded_queue = backfill(2)
+    assert sharded_queue == queue
+    for chamber, tweets in rows.items():
+        pd.testing.assert_frame_equal(sharded_rows[chamber], tweets)
+    # Counted in the workers
+    assert bot.METRICS.summary()["counters"]["votes_processed"] == 9
+
+
+@pytest.fixture
+def live_menu(tmp_path, monkeypatch):
+    """senate.gov stand-in serving a copy of the fixtures, with the two
+    newest votes left out of the vote menu until `publish` is called
+    """
+    shutil.copytree(os.path.join(FIXTURES, "senate"), tmp_path / "senate")
+    path = (
+        tmp_path
+        / "senate"
+        / "legislative"
+        / "LIS"
+        / "roll_call_lists"
+        / "vote_menu_117_1.xml"
+    )
+    full = path.read_text()
+    head, _, rest = full.partition("<vote>")
+    path.write_text(head + "<vote>" + rest.split("<vote>", 2)[2])
+    server = serve_fixtures(str(tmp_path / "senate"))
+    monkeypatch.setattr(
+        cd.SenateData,
+        "BASE_URL",
+        f"http://127.0.0.1:{server.server_port}/legislative/LIS",
+    )
+
+    def publish():
+        path.write_text(full)
+        # Modified later than the validator of the last poll
+        mtime = path.stat().st_mtime + 10
+        os.utime(path, (mtime, mtime))
+
+    server.publish = publish
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def test_poll_reads_votes_above_high_water_mark(
+    make_bot, live_menu, twitter, monkeypatch
+):
+    monkeypatch.setattr(bot.Representabot, "MAX_TWEETS", 10)
+    monkeypatch.setattr(bot.Representabot, "POST_INTERVAL", 0)
+    repbot = make_bot()
+    repbot.poll()
+    assert len(twitter.posted) == 3
+    assert repbot.watermarks["senate"]["mark"] == 4
+
+    # Unchanged menu
+    live_menu.requests.clear()
+    repbot.poll()
+    assert live_menu.statuses[-1] == 304
+    assert len(live_menu.requests) == 1
+
+    # Only the new votes are fetched
+    live_menu.publish()
+    live_menu.requests.clear()
+    repbot.poll()
+    assert len(twitter.posted) == 5
+    assert sorted(live_menu.requests[1:]) == [
+        "/legislative/LIS/roll_call_votes/vote1171/vote_117_1_00005.xml",
+        "/legislative/LIS/roll_call_votes/vote1171/vote_117_1_00006.xml",
+    ]
+    assert repbot.watermarks["senate"]["mark"] == 6
+
+
+def test_watch_stops_gracefully(make_bot, live_menu, twitter, monkeypatch):
+    monkeypatch.setattr(bot.Representabot, "POST_INTERVAL", 0)
+    repbot = make_bot()
+    stop = threading.Event()
+    polls = []
+    watcher = threading.Thread(
+        target=lambda: polls.append(repbot.watch(stop, interval=0.01))
+    )
+    watcher.start()
+    live_menu.publish()
+    while len(twitter.posted) < 4:
+        stop.wait(0.01)
+    stop.set()
+    watcher.join(timeout=5)
+    assert not watcher.is_alive()
+    assert polls[0] >= 1
+
+
+def test_recompute_methodology_change(
+    make_bot, senate_server, tmp_path, monkeypatch
+):
+    monkeypatch.setattr(
+        bot.Representabot, "WAREHOUSE_DIR", str(tmp_path / "warehouse")
+    )
+    repbot = make_bot()
+    repbot.ingest(["117"], ["1"])
+    repbot.backfill(["117"], ["1"], offline=True)
+    old = repbot.store.read("117", "1")
+    assert set(old["methodology"]) == {"1-acs2019-DC,PR"}
+
+    # Count DC in the country's population
+    monkeypatch.setattr(cd.Chamber, "EXCLUDED", ["PR"])
+    senate_server.requests.clear()
+    assert repbot.recompute(["117"], ["1"]) == "5"
+    assert senate_server.requests == []
+    tweets = repbot.store.read("117", "1")
+    new = tweets[tweets["methodology"] == "1-acs2019-PR"]
+    assert len(tweets) == 10
+    assert new["vote"].tolist() == old["vote"].tolist()
+    assert (new["Yea"].values < old["Yea"].values).all()
+    assert new["yea_vote_total"].tolist() == old["yea_vote_total"].tolist()
+    report = repbot.report(["117"], ["1"], by=[])
+    assert report["mean_yea"].iloc[0] == pytest.approx(new["Yea"].mean())
+
+    assert repbot.recompute(["117"], ["1"]) == "0"
@@ -0,0 +1,97 @@
+import os
+
+import pytest
+
+import data as cd
+from cache import XMLCache
+
+from conftest import FIXTURES
+
+
+def test_vote_menu_revalidates(senate, senate_server, monkeypatch, tmp_path):
+    monkeypatch.setattr(cd.SenateData, "CACHE_DIR", str(tmp_path))
+    first = cd.SenateData("117", "1").get_senate_list()
+
+    senate_obj = cd.SenateData("117", "1")
+    assert senate_obj.get_senate_list() == first
+    assert senate_obj.get_senate_list() is senate_obj.get_senate_list()
+    assert senate_server.statuses == [200, 304, 304, 304]
+    assert senate_obj.cache.stats() == {
+        "hits": 3,
+        "misses": 0,
+        "evictions": 0,
+    }
+
+
+def test_votes_cached_forever(senate, senate_server, monkeypatch, tmp_path):
+    monkeypatch.setattr(cd.SenateData, "CACHE_DIR", str(tmp_path))
+    first = cd.SenateData("117", "1").fetch_votes(["00002", "00003"])
+    requests = len(senate_server.requests)
+
+    senate_obj = cd.SenateData("117", "1")
+    assert senate_obj.fetch_votes(["00002", "00003"]) == first
+    assert len(senate_server.requests) == requests
+    assert senate_obj.cache.hits == 2
+
+
+def test_eviction(senate, monkeypatch, tmp_path):
+    cache = XMLCache(str(tmp_path), max_bytes=25_000)
+    url = f"{senate.BASE_URL}/roll_call_votes/vote1171/vote_117_1_0000%s.xml"
+    for n in range(1, 7):
+        cache.get(senate.http, url % n, cd.parse_roll_call_vote)
+    assert cache.misses == 6
+    assert cache.evictions > 0
+    assert cache.size() <= 25_000
+
+    # The most recently fetched vote is still cached
+    cache.get(senate.http, url % 6, cd.parse_roll_call_vote)
+    assert cache.hits == 1
+
+
+def test_size_tracked_without_scanning(senate, monkeypatch, tmp_path):
+    cache = XMLCache(str(tmp_path), max_bytes=25_000)
+    scans = []
+    scandir = os.scandir
+    monkeypatch.setattr(
+        os, "scandir", lambda path: scans.append(path) or scandir(path)
+    )
+    url = f"{senate.BASE_URL}/roll_call_votes/vote1171/vote_117_1_0000%s.xml"
+    cache.get(senate.http, url % 2, cd.parse_roll_call_vote)
+    assert scans == []
+    assert cache.total == cache.size()
+
+    scans.clear()
+    for n in range(1, 7):
+        cache.get(senate.http, url % n, cd.parse_roll_call_vote)
+    assert scans
+    assert cache.total == cache.size() <= 25_000
+
+    # A reopened cache counts what is already there
+    assert XMLCache(str(tmp_path)).total == cache.total
+
+
+def test_streamed_document_cached(senate, tmp_path):
+    cache = XMLCache(str(tmp_path))
+    url = f"{senate.BASE_URL}/roll_call_votes/vote1171/vote_117_1_00002.xml"
+
+    def fail(source):
+        source.read(100)
+        raise ValueError("Bad document")
+
+    with pytest.raises(ValueError):
+        cache.get(senate.http, url, fail)
+    assert os.listdir(tmp_path) == []
+
+    cache.get(senate.http, url, cd.parse_roll_call_vote)
+    [cached] = [name for name in os.listdir(tmp_path) if name.endswith("xml")]
+    fixture = os.path.join(
+        FIXTURES,
+        "senate",
+        "legislative",
+        "LIS",
+        "roll_call_votes",
+        "vote1171",
+        "vote_117_1_00002.xml",
+    )
+    with open(tmp_path / cached, "rb") as a, open(fixture, "rb") as b:
+        assert a.read() == b.read()
@@ -1,7 +1,12 @@
+import os
+
 import pytest
+import xmltodict
 
 import data as cd
 
+from conftest import FIXTURES
+
 
 def test_senate_data():
     assert cd.SenateData("117", "1")
@@ -22,3 +27,172 @@ def test_process_votes():
         senate_data["vote_summary"]["votes"]["vote"][0]
     )
     assert tweet
+
+
+def test_fetch_votes(senate, senate_server):
+    details = senate.fetch_votes(["00003", "00002", "00099"])
+    assert list(details) == ["00003", "00002"]
+    assert details["00003"]["roll_call_vote"]["vote_number"] == "3"
+    assert len(senate_server.requests) == 3
+
+
+def test_iter_vote_details(senate, senate_server, monkeypatch):
+    monkeypatch.setattr(senate, "MAX_WORKERS", 4)
+    votes = senate.get_senate_list()["vote_summary"]["votes"]["vote"]
+    pairs = list(senate.iter_vote_details(votes))
+    assert [v["vote_number"] for v, _ in pairs] == [
+        v["vote_number"] for v in votes
+    ]
+    tweet, party_data, vote_data = senate.process_vote(*pairs[0])
+    assert tweet.startswith("The nomination for A. Blinken was confirmed")
+    # One menu request plus one request per vote, none repeated
+    assert len(senate_server.requests) == 1 + len(votes)
+
+
+def pandas_rep(senate_obj, vote_detail):
+    """Representation computed with the pandas functions"""
+    voters = senate_obj.get_voters(vote_detail["roll_call_vote"]["members"])
+    voters.loc[lambda x: ~x["vote_cast"].isin(["Yea", "Nay"]), "vote_cast"] = (
+        "Abstain"
+    )
+    return senate_obj.get_party_rep(voters), senate_obj.get_vote_rep(voters)
+
+
+def test_engine_matches_pandas(senate):
+    votes = senate.get_senate_list()["vote_summary"]["votes"]["vote"]
+    details = senate.fetch_votes(v["vote_number"] for v in votes)
+    # A member from a state without population data counts for nothing
+    details["00002"]["roll_call_vote"]["members"]["member"][0]["state"] = "GU"
+    expected = [pandas_rep(senate, d) for d in details.values()]
+    members = [
+        d["roll_call_vote"]["members"]["member"] for d in details.values()
+    ]
+
+    for (party_rep, vote_rep), (exp_party, exp_vote) in zip(
+        senate.engine.compute_batch(members), expected
+    ):
+        assert party_rep == exp_party
+        assert list(vote_rep.items()) == list(exp_vote.items())
+    assert senate.engine.compute(members[0]) == expected[0]
+
+
+def test_streaming_parsers_match_xmltodict():
+    lis = os.path.join(FIXTURES, "senate", "legislative", "LIS")
+    with open(
+        os.path.join(lis, "roll_call_lists", "vote_menu_117_1.xml"), "rb"
+    ) as f:
+        expected = xmltodict.parse(f.read())
+        f.seek(0)
+        assert cd.parse_vote_menu(f) == expected
+        f.seek(0)
+        assert (
+            list(cd.iter_vote_menu(f))
+            == expected["vote_summary"]["votes"]["vote"]
+        )
+
+    path = os.path.join(
+        lis, "roll_call_votes", "vote1171", "vote_117_1_00004.xml"
+    )
+    with open(path, "rb") as f:
+        expected = xmltodict.parse(f.read())["roll_call_vote"]
+        f.seek(0)
+        vote = cd.parse_roll_call_vote(f)["roll_call_vote"]
+    members = vote.pop("members")["member"]
+    assert members == [
+        {k: m[k] for k in cd.MEMBER_FIELDS}
+        for m in expected.pop("members")["member"]
+    ]
+    assert vote == expected
+
+
+def test_member_table_refreshes_on_new_members(senate):
+    votes = senate.get_senate_list()["vote_summary"]["votes"]["vote"]
+    details = senate.fetch_votes(v["vote_number"] for v in votes)
+    members = [
+        d["roll_call_vote"]["members"]["member"] for d in details.values()
+    ]
+    table = senate.engine.members
+    senate.engine.compute_batch(members)
+    assert table.refreshes == 1
+    assert len(table.ids) == 100
+
+    # A senator switching parties updates their row in place
+    switched = [dict(m) for m in members[0]]
+    switched[0]["party"] = "I"
+    party_rep, _ = senate.engine.compute(switched)
+    assert table.refreshes == 2
+    assert len(table.ids) == 100
+    assert (
+        party_rep
+        == pandas_rep(
+            senate, {"roll_call_vote": {"members": {"member": switched}}}
+        )[0]
+    )
+
+
+def test_house_data(house_server):
+    house = cd.HouseData("117", "1")
+    votes = house.get_vote_list()
+    assert [v["vote_number"] for v in votes] == [
+        "00005",
+        "00004",
+        "00003",
+        "00002",
+        "00001",
+    ]
+    assert votes[0]["issue"] == "H.R. 1"
+    # Listed votes aren't fetched again
+    requests = len(house_server.requests)
+    results = house.process_batch(list(house.iter_vote_details(votes)))
+    assert len(house_server.requests) == requests
+
+    tweet, party_data, vote_data = results[0]
+    assert tweet.startswith("The bill H.R. 1 was passed.")
+    assert tweet.endswith("src: https://clerk.house.gov/Votes/20215")
+    assert results[1][0].startswith("The amendment Amdt. 2 for H.R. 1")
+    assert isinstance(results[4], cd.DoNotTweetException)
+    detail = house.get_vote("00005")
+    party_rep, vote_rep = pandas_rep(house, detail)
+    assert party_data == cd.flatten(party_rep, result={})
+    assert vote_data == pytest.approx(vote_rep)
+    # 434 members voting, with one vacancy
+    assert sum(v for k, v in party_data.items() if k.endswith("total")) == 434
+    assert 0.99 < sum(vote_data.values()) < 1
+
+    assert [v["vote_number"] for v in house.get_vote_list(start=4)] == [
+        "00005",
+        "00004",
+    ]
+    # One request finds there is no new vote
+    requests = len(house_server.requests)
+    assert house.get_vote_list(start=6) == []
+    assert len(house_server.requests) == requests + 1
+
+
+def test_house_members_represent_districts():
+    house = cd.HouseData("117", "1")
+    senate = cd.SenateData("117", "1")
+    wy = senate.engine.state_codes["WY"]
+    ca = senate.engine.state_codes["CA"]
+    assert house.engine.population[wy] == senate.engine.population[wy]
+    assert house.engine.population[ca] == senate.engine.population[ca] / 53
+    assert house.engine.total * 2 == senate.engine.total
+
+
+def test_senate_poll_votes(senate, senate_server):
+    votes, validators = senate.poll_votes(4)
+    assert [v["vote_number"] for v in votes] == ["00006", "00005"]
+    assert validators["last_modified"]
+
+    votes, validators = senate.poll_votes(4, validators)
+    assert votes == []
+    assert senate_server.statuses[-1] == 304
+
+
+def test_incomplete_chamber_fails_when_created():
+    class UnlistedChamber(cd.Chamber):
+        def get_vote(self, vote_num):
+            return None
+
+    with pytest.raises(TypeError):
+        UnlistedChamber("117", "1")
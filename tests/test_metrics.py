@@ -0,0 +1,62 @@
+import json
+import logging
+
+import bot
+import metrics
+
+from metrics import METRICS
+
+
+def test_spans_and_counters():
+    m = metrics.Metrics()
+    for _ in range(2):
+        with m.span("fetch"):
+            pass
+    m.count("http_bytes", 100)
+    m.count("http_bytes", 20)
+    summary = m.summary()
+    assert summary["spans"]["fetch"]["count"] == 2
+    assert summary["counters"] == {"http_bytes": 120}
+
+
+def test_run_summary(make_bot, senate_server, tmp_path, monkeypatch, caplog):
+    path = tmp_path / "metrics.json"
+    monkeypatch.setattr(bot.Representabot, "METRICS_FILE", str(path))
+    monkeypatch.setattr(bot.Representabot, "POST_INTERVAL", 0)
+    make_bot()
+    caplog.set_level(logging.INFO)
+    bot.lambda_handler({"congress": "117", "session": "1"}, None)
+
+    summary = json.loads(path.read_text())
+    assert "Run summary" in caplog.text
+    counters = summary["counters"]
+    assert counters["votes_processed"] == 5
+    assert counters["votes_skipped"] == 1
+    assert counters["tweets_posted"] == 4
+    assert counters["http_requests"] == 7
+    assert counters["http_bytes"] > 0
+    for span in [
+        "vote_menu",
+        "roll_call_vote",
+        "representation",
+        "text",
+        "history_save",
+        "post",
+    ]:
+        assert span in summary["spans"]
+    assert summary["spans"]["roll_call_vote"]["count"] == 6
+
+
+def test_profile_modes(tmp_path, caplog):
+    caplog.set_level(logging.INFO)
+    output = tmp_path / "run.prof"
+    with metrics.profile("cpu", str(output)):
+        sorted(range(1000))
+    assert output.stat().st_size > 0
+    assert "CPU profile" in caplog.text
+
+    with metrics.profile("memory", str(tmp_path / "memory.txt")):
+        data = [str(n) for n in range(1000)]
+    assert data
+    assert "peak" in (tmp_path / "memory.txt").read_text()
+    METRICS.reset()
@@ -0,0 +1,49 @@
+import datetime
+
+import pytest
+
+import population
+from conftest import FakeCensus
+
+
+@pytest.fixture
+def tables(monkeypatch):
+    """Empties the per-process table cache for the test"""
+    monkeypatch.setattr(population, "_tables", {})
+
+
+def test_bundled_table(tables, monkeypatch):
+    def fail(*args, **kwargs):
+        raise AssertionError("Census API should not be called")
+
+    monkeypatch.setattr("census.Census", fail)
+    state_pop_data = population.get_state_population(2019)
+    assert len(state_pop_data) == 52
+    assert state_pop_data.set_index("state").loc["WY", "NAME"] == "Wyoming"
+    assert state_pop_data[population.CENSUS_POPULATION_CODE].dtype == float
+    # Loaded once and shared
+    assert population.get_state_population(2019) is state_pop_data
+
+
+def test_new_vintage_fetched_and_cached(tables, monkeypatch, tmp_path):
+    monkeypatch.setattr("census.Census", FakeCensus)
+    monkeypatch.setattr(population, "CACHE_DIR", str(tmp_path))
+    fetched = population.get_state_population(2020)
+    assert (tmp_path / population.table_filename(2020)).exists()
+
+    monkeypatch.setattr(population, "_tables", {})
+    monkeypatch.setattr("census.Census", None)
+    cached = population.get_state_population(2020)
+    assert cached.equals(fetched)
+    assert cached.equals(population.load_table(2019))
+
+
+def test_stale_table_falls_back(tables, monkeypatch):
+    monkeypatch.setattr(population, "POPULATION_MAX_AGE_DAYS", "30")
+    assert population.is_stale(datetime.date(2021, 1, 1))
+
+    def fail(*args, **kwargs):
+        raise ConnectionError("Census API unavailable")
+
+    monkeypatch.setattr("census.Census", fail)
+    assert len(population.get_state_population(2019)) == 52
@@ -0,0 +1,162 @@
+import types
+
+import pytest
+import tweepy
+
+import posting
+
+from conftest import FakePublisher
+from store import LocalHistoryStore
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+        self.slept = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.slept.append(seconds)
+        self.now += seconds
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+@pytest.fixture
+def queue(tmp_path):
+    queue = posting.MessageQueue(LocalHistoryStore(str(tmp_path)))
+    queue.put(
+        [
+            {
+                "congress": "117",
+                "session": "1",
+                "date": "03-Jan",
+                "vote": f"0000{n}",
+                "text": f"Vote {n}",
+            }
+            for n in [3, 1, 2]
+        ]
+    )
+    return queue
+
+
+def make_poster(queue, publisher, clock, **kwargs):
+    bucket = posting.TokenBucket(1 / 30, clock=clock, sleep=clock.sleep)
+    return posting.Poster(
+        queue, publisher, bucket, sleep=clock.sleep, **kwargs
+    )
+
+
+def test_token_bucket_spaces_posts(clock):
+    bucket = posting.TokenBucket(0.5, clock=clock, sleep=clock.sleep)
+    assert all(bucket.acquire() for _ in range(3))
+    assert clock.slept == [2.0, 2.0]
+
+    # Out of calls until the reset time in the rate-limit headers
+    bucket.update(0, clock.now + 100)
+    assert not bucket.acquire(max_wait=60)
+    assert bucket.acquire()
+    assert clock.now == 1104.0
+
+
+def test_drain_posts_oldest_first(queue, clock):
+    publisher = FakePublisher()
+    posted = make_poster(queue, publisher, clock).drain(limit=2)
+    assert publisher.posted == ["Vote 1", "Vote 2"]
+    assert [tweet_id for _, tweet_id in posted] == ["1001", "1002"]
+    assert queue.list() == ["queue/117-1-00003.json"]
+    assert clock.slept == [30.0]
+
+
+def test_drain_retries_with_backoff(queue, clock):
+    publisher = FakePublisher(
+        failures=[ConnectionError(), posting.PublishError("500")]
+    )
+    poster = make_poster(queue, publisher, clock, retries=2, backoff=1)
+    poster.drain(limit=1)
+    assert publisher.posted == ["Vote 1"]
+    # Backoff of 1 and 2 seconds, plus waits for the bucket
+    assert clock.slept == [1, 29.0, 2, 28.0]
+
+
+def test_drain_moves_failing_messages_aside(queue, clock):
+    duplicate = posting.PublishError("Duplicate", retry=False)
+    publisher = FakePublisher(failures=[duplicate])
+    poster = make_poster(queue, publisher, clock, max_attempts=2)
+    poster.drain(limit=1)
+    assert publisher.posted == ["Vote 2"]
+    assert queue.get("queue/117-1-00001.json")["attempts"] == 1
+
+    publisher.failures.append(duplicate)
+    poster.drain(limit=1)
+    assert queue.failed() == ["queue-failed/117-1-00001.json"]
+    assert publisher.posted == ["Vote 2", "Vote 3"]
+
+
+def test_drain_stops_when_rate_limited(queue, clock):
+    publisher = FakePublisher(failures=[posting.RateLimited(clock.now + 900)])
+    poster = make_poster(queue, publisher, clock, max_wait=60)
+    assert poster.drain() == []
+    assert len(queue.list()) == 3
+    assert clock.slept == []
+
+    # The rate-limit headers say calls are left again
+    clock.now += 900
+    assert len(poster.drain()) == 3
+
+
+def test_drain_journals_posts(queue, clock):
+    journal = posting.RunJournal(queue.store)
+    messages = [queue.get(name) for name in queue.list()]
+    journal.computed(messages)
+    make_poster(queue, FakePublisher(), clock, journal=journal).drain(1)
+    assert [(e["state"], e["tweet_id"]) for e in journal.entries()] == [
+        ("posted", "1001"),
+        ("computed", None),
+        ("computed", None),
+    ]
+    assert journal.entries()[0]["message"] == messages[0]
+
+    journal.persisted(messages)
+    assert journal.entries() == []
+
+
+def test_twitter_publisher_classifies_errors():
+    api = types.SimpleNamespace(
+        last_response=types.SimpleNamespace(
+            headers={
+                "x-rate-limit-remaining": "0",
+                "x-rate-limit-reset": "1700000000",
+            }
+        )
+    )
+    publisher = posting.TwitterPublisher(api)
+    assert publisher.limits() == (0, 1700000000)
+
+    def fail(status_code):
+        response = types.SimpleNamespace(status_code=status_code)
+
+        def update_status(text):
+            raise tweepy.TweepError("failed", response)
+
+        api.update_status = update_status
+
+    fail(429)
+    with pytest.raises(posting.RateLimited) as e:
+        publisher.publish({"text": "text"})
+    assert e.value.reset == 1700000000
+
+    fail(403)
+    with pytest.raises(posting.PublishError) as e:
+        publisher.publish({"text": "text"})
+    assert not e.value.retry
+
+    fail(503)
+    with pytest.raises(posting.PublishError) as e:
+        publisher.publish({"text": "text"})
+    assert e.value.retry
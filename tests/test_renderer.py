@@ -0,0 +1,52 @@
+import copy
+import json
+import os
+
+import data as cd
+import renderer
+
+from conftest import FIXTURES
+
+
+def load_corpus():
+    """Votes covering every wording branch, with the tweet text the
+    renderer must produce byte for byte (None for votes not tweeted)
+    """
+    with open(os.path.join(FIXTURES, "tweet_corpus.json")) as f:
+        corpus = json.load(f)
+    for case in corpus["cases"]:
+        members = case["vote_detail"]["roll_call_vote"]["members"]
+        members["member"] = copy.deepcopy(
+            corpus["members"][: members["member"]]
+        )
+        yield case
+
+
+def test_process_vote_matches_corpus():
+    senate_obj = cd.SenateData("117", "1")
+    for case in load_corpus():
+        try:
+            tweet, _, _ = senate_obj.process_vote(
+                case["vote"], case["vote_detail"]
+            )
+        except cd.DoNotTweetException:
+            tweet = None
+        assert tweet == case["expected"], case["vote"]
+
+
+def test_classify_prefers_question_order():
+    r = renderer.Renderer(cd.SenateData.QUESTIONS)
+    assert r.classify("On the Cloture Motion") == (
+        "motion",
+        "the cloture motion",
+    )
+    # "bill" comes before "amendment" in QUESTIONS
+    assert r.classify("On the Amendment to the Bill")[0] == "bill"
+    assert r.classify("On the Motion (Motion to Waive)") == (
+        "motion",
+        "the motion",
+    )
+    assert r.classify("On the Conference Report")[0] is None
+    assert r.classify.cache_info().hits == 0
+    r.classify("On the Cloture Motion")
+    assert r.classify.cache_info().hits == 1
@@ -0,0 +1,197 @@
+import json
+import threading
+import time
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+import bot
+import sinks
+
+from conftest import FakeSenateData
+from store import LocalHistoryStore
+
+MESSAGE = {
+    "congress": "117",
+    "session": "1",
+    "date": "03-Jan",
+    "vote": "00006",
+    "text": "The nomination of Antony Blinken passed",
+    "row": {"tweet_id": None, "vote": "00006", "yea_vote_total": 78},
+}
+
+
+class WebhookHandler(BaseHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers["Content-Length"]))
+        self.server.received.append(json.loads(body))
+        self.send_response(self.server.status)
+        self.end_headers()
+
+
+@pytest.fixture
+def webhook():
+    """Local HTTP server receiving webhook posts"""
+    server = ThreadingHTTPServer(("127.0.0.1", 0), WebhookHandler)
+    server.received = []
+    server.status = 200
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    server.url = f"http://127.0.0.1:{server.server_port}/hook"
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+class BlockingSink:
+    name = "slow"
+
+    def __init__(self):
+        self.release = threading.Event()
+        self.published = []
+
+    def publish(self, message):
+        self.release.wait(5)
+        self.published.append(message["vote"])
+
+
+class FailingSink:
+    name = "broken"
+
+    def publish(self, message):
+        raise ConnectionError("down")
+
+
+def test_file_and_webhook_sinks(tmp_path, webhook):
+    path = tmp_path / "votes.jsonl"
+    sinks.FileSink(str(path)).publish(MESSAGE)
+    sinks.WebhookSink(webhook.url).publish(MESSAGE)
+
+    summary = json.loads(path.read_text())
+    assert summary == webhook.received[0]
+    assert summary["id"] == "117-1-00006"
+    assert summary["data"] == {"yea_vote_total": 78}
+
+    webhook.status = 500
+    with pytest.raises(Exception):
+        sinks.WebhookSink(webhook.url).publish(MESSAGE)
+
+
+def test_feed_sink_keeps_latest_items(tmp_path):
+    store = LocalHistoryStore(str(tmp_path))
+    sink = sinks.JSONFeedSink(store, max_items=2)
+    for vote in ["00004", "00005", "00006", "00006"]:
+        sink.publish({**MESSAGE, "vote": vote})
+    feed = json.loads(store.get("feed.json"))
+    assert feed["version"] == "https://jsonfeed.org/version/1.1"
+    assert [item["id"] for item in feed["items"]] == [
+        "117-1-00006",
+        "117-1-00005",
+    ]
+
+
+def test_fanout_isolates_slow_and_failing_sinks(tmp_path):
+    store = LocalHistoryStore(str(tmp_path))
+    slow = BlockingSink()
+    path = tmp_path / "votes.jsonl"
+    fanout = sinks.Fanout(
+        [slow, FailingSink(), sinks.FileSink(str(path))], store
+    )
+    fanout.put([MESSAGE, {**MESSAGE, "vote": "00007"}])
+
+    # The slow sink doesn't hold up the others
+    delivery = threading.Thread(target=fanout.deliver)
+    delivery.start()
+    for _ in range(500):
+        if path.exists() and len(path.read_text().splitlines()) == 2:
+            break
+        time.sleep(0.01)
+    assert len(path.read_text().splitlines()) == 2
+    assert slow.published == []
+    slow.release.set()
+    delivery.join()
+    assert slow.published == ["00006", "00007"]
+
+    stats = fanout.stats()
+    assert stats["slow"]["count"] == 2
+    # The broken sink stops at its first message, keeping both queued
+    assert stats["broken"]["failures"] == 1
+    assert stats["file"]["failures"] == 0
+    assert len(fanout.queues["broken"].list()) == 2
+    assert fanout.queues["file"].list() == []
+
+
+def test_fanout_delivers_once_per_sink(tmp_path, webhook):
+    store = LocalHistoryStore(str(tmp_path))
+    path = tmp_path / "votes.jsonl"
+
+    def fanout():
+        return sinks.Fanout(
+            [sinks.FileSink(str(path)), sinks.WebhookSink(webhook.url)],
+            store,
+            max_attempts=2,
+        )
+
+    fanout().put([MESSAGE])
+    webhook.status = 500
+    assert fanout().deliver() == {"file": 1, "webhook": 0}
+
+    # Later runs only retry the sink that failed, up to max_attempts
+    webhook.status = 200
+    assert fanout().deliver() == {"file": 0, "webhook": 1}
+    assert fanout().deliver() == {"file": 0, "webhook": 0}
+    assert len(path.read_text().splitlines()) == 1
+    assert [summary["id"] for summary in webhook.received] == [
+        "117-1-00006",
+        "117-1-00006",
+    ]
+
+    fanout().put([{**MESSAGE, "vote": "00007"}])
+    webhook.status = 500
+    fanout().deliver()
+    fanout().deliver()
+    assert fanout().queues["webhook"].list() == []
+    assert len(fanout().queues["webhook"].failed()) == 1
+
+
+def test_run_publishes_to_sinks(make_bot, twitter, tmp_path, monkeypatch):
+    path = tmp_path / "votes.jsonl"
+    monkeypatch.setattr(bot.Representabot, "OUTPUT_FILE", str(path))
+    monkeypatch.setattr(bot.Representabot, "FEED_NAME", "feed.json")
+    senate = FakeSenateData([{"vote_number": "00001", "vote_date": "03-Jan"}])
+    repbot = make_bot(senate=senate)
+    repbot.run()
+    assert twitter.posted == ["Vote 00001"]
+    assert json.loads(path.read_text())["text"] == "Vote 00001"
+    feed = json.loads(repbot.store.get("feed.json"))
+    assert feed["items"][0]["content_text"] == "Vote 00001"
+
+
+def test_sinks_deliver_without_twitter(
+    make_bot, twitter, tmp_path, monkeypatch
+):
+    path = tmp_path / "votes.jsonl"
+    monkeypatch.setattr(bot.Representabot, "OUTPUT_FILE", str(path))
+    senate = FakeSenateData([{"vote_number": "00001", "vote_date": "03-Jan"}])
+    repbot = make_bot(senate=senate)
+
+    def fail(self):
+        raise ConnectionError("Bad credentials")
+
+    monkeypatch.setattr(bot.Representabot, "_Representabot__create_api", fail)
+    with pytest.raises(ConnectionError):
+        repbot.run()
+    assert twitter.posted == []
+    assert json.loads(path.read_text())["text"] == "Vote 00001"
+    assert len(repbot.queue.list()) == 1
+
+    # The tweet is still queued, but the file has it already
+    repbot = make_bot(senate=senate)
+    monkeypatch.setattr(bot.Representabot, "_Representabot__create_api", fail)
+    with pytest.raises(ConnectionError):
+        repbot.post_queued()
+    assert len(path.read_text().splitlines()) == 1
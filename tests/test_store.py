@@ -0,0 +1,106 @@
+import pandas as pd
+import pytest
+
+import bot
+
+from conftest import FakeS3, FakeSenateData
+from store import HistoryStore, LocalHistoryStore, S3HistoryStore
+
+
+def rows(*votes, tweet_id="1"):
+    return pd.DataFrame(
+        {
+            "tweet_id": [tweet_id] * len(votes),
+            "congress": [c for c, _, _ in votes],
+            "session": [s for _, s, _ in votes],
+            "date": ["03-Jan"] * len(votes),
+            "vote": [v for _, _, v in votes],
+            "Yea": [0.5] * len(votes),
+        }
+    )
+
+
+@pytest.fixture(params=["local", "s3", "parquet"])
+def store(request, tmp_path):
+    dtypes = bot.Representabot.DTYPES
+    if request.param == "local":
+        return LocalHistoryStore(str(tmp_path), dtypes=dtypes)
+    elif request.param == "parquet":
+        pytest.importorskip("pyarrow")
+        return LocalHistoryStore(
+            str(tmp_path), dtypes=dtypes, format="parquet"
+        )
+    return S3HistoryStore(FakeS3(), "bucket", prefix="history", dtypes=dtypes)
+
+
+def test_append_writes_only_new_rows(store):
+    store.append(rows(("117", "1", "00001"), ("116", "2", "00001")))
+    store.append(rows(("117", "1", "00002")))
+    assert len(store.segments("117", "1")) == 2
+    assert len(store.segments("116", "2")) == 1
+
+    tweets = store.read("117", "1")
+    assert tweets["vote"].tolist() == ["00001", "00002"]
+    assert tweets["Yea"].dtype == float
+    assert store.read("115", "1").empty
+
+    keys = store.read("117", "1", columns=store.KEY)
+    assert list(keys.columns) == store.KEY
+
+
+def test_latest_row_wins_and_compact(store):
+    store.append(rows(("117", "1", "00001"), ("117", "1", "00002")))
+    store.append(rows(("117", "1", "00002"), tweet_id="2"))
+    assert store.read("117", "1")["tweet_id"].tolist() == ["1", "2"]
+
+    assert not store.compact("117", "1", min_segments=3)
+    assert store.compact("117", "1")
+    assert len(store.segments("117", "1")) == 1
+    assert store.read("117", "1")["tweet_id"].tolist() == ["1", "2"]
+
+
+def test_migrate(make_bot, history, twitter, monkeypatch):
+    history.mkdir()
+    (history / "tweets.csv").write_text(
+        "tweet_id,congress,session,date,vote\n"
+        "1,116,1,03-Jan,00001\n"
+        "2,117,1,03-Jan,00001\n"
+    )
+    make_bot(senate=FakeSenateData([])).migrate()
+    store = LocalHistoryStore(str(history))
+    assert len(store.read("116", "1")) == 1
+    assert len(store.read("117", "1")) == 1
+
+
+def test_compact_migrates_format(tmp_path):
+    pytest.importorskip("pyarrow")
+    dtypes = bot.Representabot.DTYPES
+    csv_store = LocalHistoryStore(str(tmp_path), dtypes=dtypes)
+    csv_store.append(rows(("117", "1", "00001"), tweet_id=None))
+    csv_store.append(rows(("117", "1", "00002")))
+    expected = csv_store.read("117", "1")
+
+    store = LocalHistoryStore(str(tmp_path), dtypes=dtypes, format="parquet")
+    assert store.compact("117", "1", min_segments=10)
+    assert store.segments("117", "1")[0].endswith(".parquet")
+    tweets = store.read("117", "1")
+    assert tweets["tweet_id"].isna().tolist() == [True, False]
+    # Parquet segments carry every column of the schema
+    assert list(tweets.columns) == list(bot.Representabot.DTYPES)
+    pd.testing.assert_frame_equal(
+        tweets[expected.columns].drop(columns="tweet_id"),
+        expected.drop(columns="tweet_id"),
+        check_dtype=False,
+    )
+
+
+def test_incomplete_store_fails_when_created():
+    class ReadOnlyStore(HistoryStore):
+        def list(self, prefix):
+            return []
+
+        def get(self, name):
+            return None
+
+    with pytest.raises(TypeError):
+        ReadOnlyStore()
@@ -0,0 +1,104 @@
+import pytest
+
+import bot
+import data as cd
+import warehouse
+
+
+@pytest.fixture(params=["csv", "parquet"])
+def vote_warehouse(request, tmp_path):
+    if request.param == "parquet":
+        pytest.importorskip("pyarrow")
+    return warehouse.VoteWarehouse(
+        tmp_path / "warehouse", format=request.param, checkpoint=2
+    )
+
+
+def test_process_votes_from_warehouse(senate, senate_server, vote_warehouse):
+    assert vote_warehouse.ingest(senate) == 6
+    menu = senate.get_vote_list()
+    expected = senate.process_batch(list(senate.iter_vote_details(menu)))
+    members = vote_warehouse.members.read("117", "1")
+    assert set(members["vote_cast"]) == {"Yea", "Nay", "Not Voting"}
+    assert members.groupby("vote").size().tolist() == [100] * 6
+
+    requests = len(senate_server.requests)
+    offline = cd.SenateData("117", "1")
+    offline.warehouse = vote_warehouse
+    votes = vote_warehouse.vote_list("senate", "117", "1")
+    assert [v["vote_number"] for v in votes] == [
+        v["vote_number"] for v in menu
+    ]
+    results = offline.process_batch(list(offline.iter_vote_details(votes)))
+    assert len(senate_server.requests) == requests
+    for result, online in zip(results, expected):
+        if isinstance(online, Exception):
+            assert type(result) is type(online)
+        else:
+            assert result == online
+
+
+def test_ingest_resumes(house_server, vote_warehouse, monkeypatch):
+    house = cd.HouseData("117", "1")
+    get_house_vote = house.get_house_vote
+
+    def interrupted(vote_num):
+        if vote_num == "00004":
+            raise ConnectionError("Interrupted")
+        return get_house_vote(vote_num)
+
+    monkeypatch.setattr(house, "get_house_vote", interrupted)
+    assert vote_warehouse.ingest(house) == 3
+    assert vote_warehouse.ingested("house", "117", "1") == {
+        "00001",
+        "00002",
+        "00003",
+    }
+
+    house = cd.HouseData("117", "1")
+    house_server.requests.clear()
+    assert vote_warehouse.ingest(house) == 2
+    assert min(house_server.requests).endswith("/2021/roll004.xml")
+    assert len(vote_warehouse.ingested("house", "117", "1")) == 5
+    # Segments are compacted once a session is ingested
+    assert len(vote_warehouse.members.segments("117", "1", "house")) == 1
+    assert vote_warehouse.ingest(cd.HouseData("117", "1")) == 0
+
+
+def test_backfill_offline(
+    make_bot, senate_server, tmp_path, monkeypatch, twitter
+):
+    monkeypatch.setattr(
+        bot.Representabot, "WAREHOUSE_DIR", str(tmp_path / "warehouse")
+    )
+    repbot = make_bot()
+    assert repbot.ingest(["117"], ["1"]) == "6"
+
+    senate_server.requests.clear()
+    assert repbot.backfill(["117"], ["1"], offline=True) == "5"
+    assert senate_server.requests == []
+    assert repbot.store.read("117", "1")["vote"].tolist() == [
+        "00002",
+        "00003",
+        "00004",
+        "00005",
+        "00006",
+    ]
+
+
+def test_backfill_workers_share_member_tables(
+    make_bot, senate_server, tmp_path, monkeypatch
+):
+    monkeypatch.setattr(
+        bot.Representabot, "WAREHOUSE_DIR", str(tmp_path / "warehouse")
+    )
+    repbot = make_bot()
+    repbot.ingest(["117"], ["1", "2"])
+
+    bot.METRICS.reset()
+    assert repbot.backfill(["117"], ["1", "2"], offline=True, workers=2) == "5"
+    counters = bot.METRICS.summary()["counters"]
+    assert counters["votes_processed"] == 5
+    # The member table was filled from the warehouse before forking, once
+    # for both sessions, and none of the workers refreshed it
+    assert counters["member_table_refreshes"] == 1
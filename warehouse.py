@@ -0,0 +1,211 @@
+import logging
+import os
+
+import pandas as pd
+
+from metrics import METRICS
+from store import LocalHistoryStore
+
+# One row per member per roll call vote
+MEMBER_DTYPES = {
+    "chamber": str,
+    "congress": str,
+    "session": str,
+    "vote": str,
+    "lis_member_id": str,
+    "party": str,
+    "state": str,
+    "vote_cast": str,
+}
+# One row per roll call vote, with the vote_menu entry and the roll call
+# vote fields that tweet text is rendered from
+VOTE_DTYPES = {
+    "chamber": str,
+    "congress": str,
+    "session": str,
+    "vote": str,
+    "date": str,
+    "issue": str,
+    "question": str,
+    "measure": str,
+    "result": str,
+    "title": str,
+    "vote_date": str,
+    "vote_title": str,
+    "vote_document_text": str,
+}
+DETAIL_FIELDS = ["vote_date", "vote_title", "vote_document_text"]
+
+
+class VoteWarehouse:
+    """Local copy of roll call votes, member by member, in CSV or in
+    Parquet (with the `warehouse` extra).
+
+    Votes are kept in two datasets partitioned like the tweet history:
+    `votes/` with a row per roll call vote and `members/` with a row per
+    member per vote. `ingest` fetches a chamber's votes in batches of the
+    chamber's MAX_WORKERS and writes a segment to each dataset every
+    `checkpoint` votes. A vote is in the warehouse once its votes/ row is
+    written, so an interrupted ingest resumes after the last segment.
+
+    `vote_list` and `details` give the stored votes back in the layout of
+    the vote_menu and parse_roll_call_vote, so Chamber.process_batch can
+    run from the warehouse instead of the network.
+    """
+
+    def __init__(self, directory, format="csv", checkpoint=100):
+        self.members = LocalHistoryStore(
+            os.path.join(directory, "members"),
+            dtypes=MEMBER_DTYPES,
+            format=format,
+            key=["congress", "session", "vote", "lis_member_id"],
+        )
+        self.votes = LocalHistoryStore(
+            os.path.join(directory, "votes"),
+            dtypes=VOTE_DTYPES,
+            format=format,
+            key=["congress", "session", "vote"],
+        )
+        self.checkpoint = checkpoint
+        # Partitions read by `details`, by (chamber, congress, session)
+        self.partitions = {}
+
+    def ingested(self, chamber, congress, session):
+        """Vote numbers already in the warehouse"""
+        votes = self.votes.read(congress, session, ["vote"], chamber)
+        return set(votes["vote"])
+
+    def __flush(self, votes, members):
+        """Writes a checkpoint's members, then its votes"""
+        if not votes:
+            return
+        with METRICS.span("warehouse_write"):
+            self.members.append(pd.DataFrame(members, columns=MEMBER_DTYPES))
+            self.votes.append(pd.DataFrame(votes, columns=VOTE_DTYPES))
+
+    def ingest(self, chamber_obj):
+        """Fetches every vote of a chamber's congress and session that
+        isn't in the warehouse yet, oldest first. Returns the number of
+        votes ingested.
+        """
+        chamber = chamber_obj.name
+        congress = chamber_obj.congress_num
+        session = chamber_obj.session_num
+        done = self.ingested(chamber, congress, session)
+        start = 1
+        if chamber_obj.LIST_INCREMENTALLY and done:
+            start = max(int(vote) for vote in done) + 1
+        votes = [
+            vote
+            for vote in reversed(chamber_obj.get_vote_list(start))
+            if vote["vote_number"] not in done
+        ]
+        keys = {"chamber": chamber, "congress": congress, "session": session}
+        vote_rows = []
+        member_rows = []
+        ingested = 0
+        for batch in chamber_obj.iter_vote_batches(votes):
+            for vote, vote_detail in batch:
+                if vote_detail is None:
+                    # Not fetched, and tried again by the next ingest
+                    continue
+                detail = vote_detail["roll_call_vote"]
+                number = vote["vote_number"]
+                question = vote.get("question")
+                measure = None
+                if isinstance(question, dict):
+                    measure = question.get("measure")
+                    question = question.get("#text")
+                vote_rows.append(
+                    {
+                        **keys,
+                        "vote": number,
+                        "date": vote.get("vote_date"),
+                        "issue": vote.get("issue"),
+                        "question": question,
+                        "measure": measure,
+                        "result": vote.get("result"),
+                        "title": vote.get("title"),
+                        **{
+                            field: detail.get(field) for field in DETAIL_FIELDS
+                        },
+                    }
+                )
+                members = detail["members"]["member"]
+                if isinstance(members, dict):
+                    members = [members]
+                member_rows.extend(
+                    {**keys, "vote": number, **member} for member in members
+                )
+            if len(vote_rows) >= self.checkpoint:
+                self.__flush(vote_rows, member_rows)
+                ingested += len(vote_rows)
+                vote_rows, member_rows = [], []
+        self.__flush(vote_rows, member_rows)
+        ingested += len(vote_rows)
+        METRICS.count("votes_ingested", ingested)
+        for dataset in [self.votes, self.members]:
+            dataset.compact(congress, session, chamber=chamber)
+        self.partitions.pop((chamber, congress, session), None)
+        return ingested
+
+    def details(self, chamber, congress, session):
+        """Returns a dict of vote number to (vote_menu entry, roll call
+        vote) for every vote in a partition
+        """
+        key = (chamber, congress, session)
+        if key in self.partitions:
+            return self.partitions[key]
+        with METRICS.span("warehouse_read"):
+            votes = self.votes.read(congress, session, chamber=chamber)
+            members = self.members.read(congress, session, chamber=chamber)
+        votes = votes.astype(object).where(votes.notna(), None)
+        members = members.astype(object).where(members.notna(), None)
+        # Built column by column, as DataFrame.to_dict per vote is slow
+        fields = ["lis_member_id", "party", "state", "vote_cast"]
+        by_vote = {}
+        for number, *values in zip(
+            members["vote"], *(members[field] for field in fields)
+        ):
+            by_vote.setdefault(number, []).append(dict(zip(fields, values)))
+        details = {}
+        for vote in votes.to_dict("records"):
+            number = vote["vote"]
+            question = vote["question"]
+            if vote["measure"] is not None:
+                question = {"#text": question, "measure": vote["measure"]}
+            item = {
+                "vote_number": number,
+                "vote_date": vote["date"],
+                "issue": vote["issue"],
+                "question": question,
+                "result": vote["result"],
+                "title": vote["title"],
+            }
+            detail = {
+                "roll_call_vote": {
+                    "congress": congress,
+                    "session": session,
+                    "vote_number": number,
+                    **{field: vote[field] for field in DETAIL_FIELDS},
+                    "members": {"member": by_vote.get(number, [])},
+                }
+            }
+            details[number] = (item, detail)
+        logging.info(
+            f"Read {len(details)} {chamber} votes for {congress}-{session} "
+            "from the warehouse"
+        )
+        self.partitions[key] = details
+        return details
+
+    def vote_list(self, chamber, congress, session, start=1):
+        """The stored votes numbered `start` and up, newest first, as
+        vote_menu entries
+        """
+        details = self.details(chamber, congress, session)
+        return [
+            item
+            for number, (item, _) in sorted(details.items(), reverse=True)
+            if int(number) >= start
+        ]